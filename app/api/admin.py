@@ -2,13 +2,28 @@
 Admin endpoints for system management and monitoring.
 """
 
-from fastapi import APIRouter, Depends
-from typing import Dict, Any, Optional
-from app.core.config import Settings, get_settings
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Awaitable, Dict, Any, Optional
+from app.core.config import Settings
 from app.services.redis_integration import RedisServerClient
-from app.services.caching import GPTCacheService
 from app.services.history import HistoryService
-from app.core.monitoring import monitor
+from app.services.simple_caching import SimpleCacheService
+from app.api.dependencies import (
+    get_cache_service,
+    get_cache_warmer,
+    get_gptcache_service,
+    get_history_service,
+    get_llm_router,
+    get_redis_breaker,
+    get_redis_client,
+    get_settings,
+)
+from app.core.validation import URLValidator
+from app.schemas.models import WarmCacheRequest
+from app.services.cache_warmer import CacheWarmer
+from app.services.llm_router import LLMRouter
+from app.services.resilience import REDIS_ERRORS, CircuitBreaker, CircuitOpenError
+from app.core.monitoring import monitor, popularity
 import time
 import os
 import logging
@@ -17,19 +32,12 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-def get_redis_client(settings: Settings = Depends(get_settings)):
-    return RedisServerClient(settings)
-
-def get_cache_service(settings: Settings = Depends(get_settings)):
-    return GPTCacheService(settings)
-
-def get_history_service(settings: Settings = Depends(get_settings)):
-    return HistoryService(settings)
-
 @router.get("/health/detailed")
 async def detailed_health_check(
     settings: Settings = Depends(get_settings),
-    redis_client: RedisServerClient = Depends(get_redis_client)
+    redis_client: RedisServerClient = Depends(get_redis_client),
+    redis_breaker: CircuitBreaker = Depends(get_redis_breaker),
+    llm_router: LLMRouter = Depends(get_llm_router)
 ):
     """
     Comprehensive health check including all system components.
@@ -46,6 +54,18 @@ async def detailed_health_check(
     redis_health = await redis_client.health_check()
     health_data["components"]["redis_server"] = redis_health
     
+    # Redis circuit breaker: open or half-open means degraded mode
+    breaker_status = redis_breaker.snapshot()
+    breaker_status["status"] = "ok" if breaker_status["state"] == "closed" else "warning"
+    health_data["components"]["redis_circuit_breaker"] = breaker_status
+    
+    # LLM backends with their live latency and error rates
+    backends = llm_router.snapshot()
+    health_data["components"]["llm_backends"] = {
+        "status": "warning" if any(b["breaker_open"] for b in backends) else "ok",
+        "backends": backends,
+    }
+    
     # Check GPTCache data directory
     gptcache_status = {
         "status": "ok" if os.path.exists(settings.gptcache_data_dir) else "warning",
@@ -112,6 +132,123 @@ async def clear_cache(
     result = await redis_client.clear_cache(pattern)
     return result
 
+async def _invalidation(invalidate: Awaitable[Dict[str, int]]) -> Dict[str, int]:
+    """Await a cache invalidation, answering 503 while Redis is unavailable."""
+    try:
+        return await invalidate
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except REDIS_ERRORS as e:
+        logger.error("Cache invalidation failed: %s", e)
+        raise HTTPException(status_code=503, detail="Cache unavailable; invalidation may be incomplete")
+
+@router.post("/cache/invalidate/url")
+async def invalidate_url(
+    url: str,
+    cache: SimpleCacheService = Depends(get_gptcache_service)
+):
+    """
+    Invalidate the cached crawl of a URL and every LLM response derived from it.
+    """
+    return {"status": "success", "url": url, **await _invalidation(cache.invalidate_url(url))}
+
+@router.post("/cache/invalidate/domain")
+async def invalidate_domain(
+    domain: str,
+    cache: SimpleCacheService = Depends(get_gptcache_service)
+):
+    """
+    Invalidate every cached crawl of a domain and every LLM response derived from them.
+    """
+    return {"status": "success", "domain": domain, **await _invalidation(cache.invalidate_domain(domain))}
+
+@router.post("/cache/invalidate/prefix")
+async def invalidate_prefix(
+    prefix: str,
+    cache: SimpleCacheService = Depends(get_gptcache_service)
+):
+    """
+    Invalidate cached crawls under a URL prefix and every LLM response derived from them.
+    """
+    try:
+        result = await _invalidation(cache.invalidate_prefix(prefix))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", "prefix": prefix, **result}
+
+@router.get("/cache/ttl")
+async def get_crawl_ttl(
+    url: str,
+    cache: SimpleCacheService = Depends(get_gptcache_service)
+):
+    """
+    Change statistics of a URL and the crawl TTL learned from them.
+    """
+    return {"url": url, **await cache.get_change_stats(url)}
+
+@router.post("/cache/warm", status_code=202)
+async def warm_cache(
+    request: WarmCacheRequest,
+    warmer: CacheWarmer = Depends(get_cache_warmer)
+):
+    """
+    Register URLs as hot and pre-crawl them in the background.
+    
+    Registered URLs are then kept warm by the refresher like any popular URL.
+    """
+    accepted, rejected = [], []
+    for url in dict.fromkeys(request.urls):
+        is_valid, error = URLValidator.validate_url(url)
+        if is_valid:
+            accepted.append(url)
+        else:
+            rejected.append({"url": url, "error": error})
+    if accepted:
+        await warmer.register(accepted)
+    return {"status": "accepted", "registered": len(accepted), "rejected": rejected}
+
+@router.get("/cache/hot")
+async def get_hot_urls(
+    limit: int = 20,
+    cache: SimpleCacheService = Depends(get_gptcache_service)
+):
+    """
+    Most requested URLs with their hit counts and seconds until their cached crawl expires.
+    """
+    hot = await cache.hot_urls(max(1, min(limit, 1000)))
+    ttls = await cache.crawl_ttls([url for url, _ in hot]) if hot else []
+    return {
+        "urls": [
+            {"url": url, "hits": round(hits, 3), "ttl": ttl}
+            for (url, hits), ttl in zip(hot, ttls)
+        ]
+    }
+
+@router.get("/popularity/top")
+async def get_top_requested(
+    dimension: str = "url",
+    limit: int = 20,
+    cache: SimpleCacheService = Depends(get_gptcache_service),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Most requested URLs, domains or query hashes (approximate, per worker).
+    
+    URLs also report their approximate number of distinct users.
+    """
+    if dimension not in popularity.DIMENSIONS:
+        raise HTTPException(
+            status_code=400, detail=f"dimension must be one of {', '.join(popularity.DIMENSIONS)}"
+        )
+    items = [{"key": key, "count": count} for key, count in popularity.top(dimension, max(1, min(limit, 1000)))]
+    if dimension == "url" and items and settings.unique_users_tracking:
+        try:
+            for item, users in zip(items, await cache.unique_users([item["key"] for item in items])):
+                item["unique_users"] = users
+        except Exception as e:
+            logger.warning(f"Unique user counts unavailable: {e}")
+    return {"dimension": dimension, "items": items, **popularity.stats()[dimension]}
+
 @router.post("/backup/create")
 async def create_backup(
     redis_client: RedisServerClient = Depends(get_redis_client)
@@ -143,7 +280,7 @@ async def get_configuration(settings: Settings = Depends(get_settings)):
 
 @router.post("/test/cag")
 async def test_cag_pipeline(
-    cache_service: GPTCacheService = Depends(get_cache_service),
+    cache_service: Any = Depends(get_cache_service),
     history_service: HistoryService = Depends(get_history_service)
 ):
     """
@@ -194,12 +331,31 @@ async def test_cag_pipeline(
     return test_results
 
 @router.get("/metrics")
-async def get_application_metrics():
+async def get_application_metrics(percentiles: Optional[str] = None):
     """
     Get comprehensive application metrics and performance data.
+    
+    Latency percentiles default to p50/p95/p99; pass a comma-separated list
+    (e.g. ``?percentiles=50,90,99.9``) to query others.
     """
     logger.info("Application metrics requested")
-    return monitor.get_metrics()
+    if not percentiles:
+        return monitor.get_metrics()
+    try:
+        requested = [float(p) for p in percentiles.split(",") if p.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Percentiles must be comma-separated numbers")
+    if any(p < 0 or p > 100 for p in requested):
+        raise HTTPException(status_code=400, detail="Percentiles must be between 0 and 100")
+    return monitor.get_metrics(percentiles=requested)
+
+
+@router.get("/metrics/histograms")
+async def get_metric_histograms():
+    """
+    Export raw latency histograms so snapshots from several workers can be merged.
+    """
+    return monitor.get_histogram_snapshot()
 
 @router.post("/metrics/reset")
 async def reset_application_metrics():
@@ -208,4 +364,5 @@ async def reset_application_metrics():
     """
     logger.warning("Application metrics reset requested")
     monitor.reset_metrics()
+    popularity.reset()
     return {"status": "success", "message": "Metrics reset successfully"}
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""
+FastAPI dependencies resolving shared services from the application container.
+
+Each dependency is a plain function so tests can replace it through
+``app.dependency_overrides``.
+"""
+
+from fastapi import Depends
+
+from app.core.client_ip import TrustedProxies
+from app.core.config import Settings
+from app.core.container import ServiceContainer, get_container
+from app.services.cache_warmer import CacheWarmer
+from app.services.crawler import CrawlerService
+from app.services.digest import PageDigester
+from app.services.history import HistoryService
+from app.services.llm_provider import LLMProvider
+from app.services.llm_router import LLMRouter
+from app.services.redis_integration import RedisServerClient
+from app.services.resilience import CircuitBreaker
+from app.services.simple_caching import SimpleCacheService
+
+
+def get_settings(container: ServiceContainer = Depends(get_container)) -> Settings:
+    return container.settings
+
+def get_llm_provider(container: ServiceContainer = Depends(get_container)) -> LLMProvider:
+    return container.llm_provider
+
+def get_llm_router(
+    container: ServiceContainer = Depends(get_container),
+    provider: LLMProvider = Depends(get_llm_provider),
+) -> LLMRouter:
+    if isinstance(provider, LLMRouter):
+        return provider
+    # An overridden provider (tests, benchmarks) becomes the only backend
+    return LLMRouter.single(provider, container.settings.llm_model_name)
+
+def get_history_service(container: ServiceContainer = Depends(get_container)) -> HistoryService:
+    return container.history
+
+def get_gptcache_service(container: ServiceContainer = Depends(get_container)) -> SimpleCacheService:
+    return container.cache
+
+def get_crawler_service(
+    container: ServiceContainer = Depends(get_container),
+    cache: SimpleCacheService = Depends(get_gptcache_service),
+) -> CrawlerService:
+    # An overridden cache (tests) gets its own crawler wired to it
+    if cache is not container.cache:
+        return CrawlerService(cache_service=cache)
+    return container.crawler
+
+def get_page_digester(
+    container: ServiceContainer = Depends(get_container),
+    settings: Settings = Depends(get_settings),
+    cache: SimpleCacheService = Depends(get_gptcache_service),
+    llm_router: LLMRouter = Depends(get_llm_router),
+) -> PageDigester:
+    # Overridden services (tests) get a digester wired to them
+    if cache is not container.cache or llm_router is not container.llm_provider:
+        return PageDigester(settings, cache, llm_router)
+    return container.digester
+
+def get_cache_warmer(
+    container: ServiceContainer = Depends(get_container),
+    settings: Settings = Depends(get_settings),
+    cache: SimpleCacheService = Depends(get_gptcache_service),
+    crawler: CrawlerService = Depends(get_crawler_service),
+) -> CacheWarmer:
+    if cache is not container.cache:
+        return CacheWarmer(settings, cache, crawler)
+    return container.warmer
+
+def get_cache_service(container: ServiceContainer = Depends(get_container)):
+    return container.gptcache
+
+def get_redis_client(container: ServiceContainer = Depends(get_container)) -> RedisServerClient:
+    return container.redis_server
+
+def get_trusted_proxies(
+    container: ServiceContainer = Depends(get_container),
+    settings: Settings = Depends(get_settings),
+) -> TrustedProxies:
+    # Overridden settings (tests) get their own proxy list
+    if settings is not container.settings:
+        return TrustedProxies(settings.trusted_proxies)
+    return container.trusted_proxies
+
+def get_redis_breaker(container: ServiceContainer = Depends(get_container)) -> CircuitBreaker:
+    return container.redis_breaker
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+import asyncio
 import time
 import logging
+from typing import Any, Dict, Optional, Sequence, Set, Tuple
 from urllib.parse import urlparse
 from app.services.crawler import CrawlerService
-from app.services.llm_provider import LLMProvider
+from app.services.crawl_scheduler import CrawlDisallowedError, HostResolutionError
+from app.services.context_cache import PageContextCache
+from app.services.digest import PageDigester, build_digest_prompt
+from app.services.llm_router import Backend, LLMRouter
 from app.services.history import HistoryService
 from app.services.simple_caching import SimpleCacheService
+from common.cache_keys import content_hash, history_digest, llm_cache_key, normalize_query
+from app.services.resilience import LLMUnavailableError
 from app.schemas.models import (
     CrawlRequest,
     CrawlResponse,
@@ -17,26 +24,155 @@ from app.schemas.models import (
     CAGResponse,
 )
 from app.core.validation import ValidatedCrawlRequest, ValidatedGenerateRequest, ValidatedCAGRequest
-from app.core.monitoring import monitor, track_request
+from app.core.monitoring import monitor, popularity, track_request, track_stage
+from app.core.urls import canonicalize_url
 from app.core.config import Settings
+from app.core.client_ip import TrustedProxies
+from app.api.dependencies import (
+    get_crawler_service,
+    get_gptcache_service,
+    get_history_service,
+    get_llm_provider,
+    get_llm_router,
+    get_page_digester,
+    get_settings,
+    get_trusted_proxies,
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-def get_settings():
-    return Settings()
+# Metric handles are registered once so recording does no key formatting per request.
+crawl_cache_metrics = monitor.cache_handle("crawl")
+llm_cache_metrics = monitor.cache_handle("llm")
+llm_stale_metrics = monitor.counter_handle("llm.stale_served")
+
+# Chat turns included in /cag prompts when include_history is set
+CAG_HISTORY_TURNS = 5
+
+def _with_history(prompt: str, history_turns: Sequence[Dict[str, Any]]) -> str:
+    if not history_turns:
+        return prompt
+    history_context = "\n".join([f"{turn['role']}: {turn['message']}" for turn in history_turns])
+    return f"""Previous conversation context:
+{history_context}
+
+{prompt}"""
+
+def build_cag_prompt(url: str, markdown: str, query: str, history_turns: Sequence[Dict[str, Any]] = ()) -> str:
+    """
+    Assemble the /cag prompt from the page content, the query and recent chat turns.
+    
+    Args:
+        url: URL the content was crawled from
+        markdown: Page content
+        query: User query
+        history_turns: Chat turns to include as context, oldest first
+        
+    Returns:
+        The prompt sent to the LLM
+    """
+    return _with_history(f"""Based on the following content from {url}:
+
+{markdown}
+
+User Query: {query}
+
+Please provide a comprehensive answer based on the content above.""", history_turns)
 
-def get_llm_provider():
-    return LLMProvider()
+def build_cag_question(url: str, query: str, history_turns: Sequence[Dict[str, Any]] = ()) -> str:
+    """
+    Assemble the /cag prompt for a page held in a provider-side cached context.
+    
+    Same as :func:`build_cag_prompt` without the page content, which the
+    provider prepends from the cached context.
+    """
+    return _with_history(f"""Based on the cached content from {url}:
 
-def get_history_service(settings: Settings = Depends(get_settings)):
-    return HistoryService(settings)
+User Query: {query}
 
-def get_gptcache_service(settings: Settings = Depends(get_settings)):
-    return SimpleCacheService(settings)
+Please provide a comprehensive answer based on the cached content.""", history_turns)
+
+async def generate_or_stale(
+    llm_router: LLMRouter,
+    cache: SimpleCacheService,
+    prompt: str,
+    endpoint: str,
+    backend: Optional[Backend] = None,
+    cache_key: Optional[str] = None,
+    allow_stale: bool = True,
+) -> Tuple[str, Optional[Backend]]:
+    """
+    Generate a response, falling back to a stale cached answer when the LLM is unavailable.
+    
+    Args:
+        llm_router: Router choosing (and failing over between) LLM backends
+        cache: Cache holding stale answers
+        prompt: Prompt to send
+        endpoint: Endpoint name used by routing rules
+        backend: Backend to try first
+        cache_key: Key of the cached answer for ``backend``
+        allow_stale: Whether a stale cached answer may be returned
+    
+    Returns:
+        The response text and the backend that produced it (None for a stale cached answer)
+    
+    Raises:
+        HTTPException: 503 if the LLM is unavailable and no stale answer exists
+    """
+    try:
+        return await llm_router.generate(prompt, endpoint, backend)
+    except LLMUnavailableError as e:
+        stale = await cache.get_stale_llm_response(prompt, cache_key=cache_key) if allow_stale else None
+        if stale:
+            logger.warning("LLM unavailable (%s); serving stale cached answer", e)
+            llm_stale_metrics.increment()
+            return stale, None
+        logger.error("LLM unavailable and no cached answer to fall back on: %s", e)
+        raise HTTPException(status_code=503, detail="LLM service temporarily unavailable") from e
 
-def get_crawler_service(cache: SimpleCacheService = Depends(get_gptcache_service)):
-    return CrawlerService(cache_service=cache)
+# Unique-user writes still in flight (kept referenced until they finish)
+_demand_tasks: Set[asyncio.Task] = set()
+
+def record_demand(
+    http_request: Request,
+    settings: Settings,
+    proxies: TrustedProxies,
+    cache: Optional[SimpleCacheService],
+    url: str,
+    query: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> None:
+    """
+    Count a request in the popularity sketches and the URL's unique users.
+    
+    Anonymous requests are identified by client address (forwarding headers
+    are only believed from ``TRUSTED_PROXIES``). The unique-user write runs in
+    the background so requests do not wait on Redis.
+    """
+    popularity.record(canonicalize_url(url, merge_schemes=settings.cache_merge_url_schemes), query)
+    if settings.unique_users_tracking and cache is not None:
+        if user_id:
+            user = f"user:{user_id}"
+        else:
+            user = f"ip:{proxies.client_ip(http_request)}"
+        task = asyncio.ensure_future(cache.record_unique_user(url, user))
+        _demand_tasks.add(task)
+        task.add_done_callback(_demand_tasks.discard)
+
+async def crawl_page(crawler: CrawlerService, url: str, use_cache: bool) -> Dict[str, Any]:
+    """
+    Crawl a URL through the crawler's politeness checks.
+    
+    Raises:
+        HTTPException: 403 if robots.txt disallows the URL, 502 if its host does not resolve
+    """
+    try:
+        return await crawler.crawl_with_metadata(url, use_cache=use_cache)
+    except CrawlDisallowedError as e:
+        raise HTTPException(status_code=403, detail="Crawling this URL is disallowed by the site's robots.txt") from e
+    except HostResolutionError as e:
+        raise HTTPException(status_code=502, detail="The URL's host could not be resolved") from e
 
 def validate_url(url: str) -> bool:
     """Validate URL to prevent SSRF attacks."""
@@ -64,21 +200,25 @@ def validate_url(url: str) -> bool:
 @track_request("crawl")
 async def crawl(
     request: CrawlRequest, 
-    crawler: CrawlerService = Depends(get_crawler_service)
+    http_request: Request,
+    crawler: CrawlerService = Depends(get_crawler_service),
+    settings: Settings = Depends(get_settings),
+    proxies: TrustedProxies = Depends(get_trusted_proxies),
 ):
     # Validate URL to prevent SSRF attacks
     if not validate_url(request.url):
         logger.warning(f"Invalid or potentially dangerous URL blocked: {request.url}")
         raise HTTPException(status_code=400, detail="Invalid or unsafe URL provided")
     
-    logger.info(f"Crawling URL: {request.url}")
-    crawl_data = await crawler.crawl_with_metadata(request.url, use_cache=request.use_cache)
+    logger.info("Crawling URL: %s", request.url)
+    record_demand(http_request, settings, proxies, crawler.cache_service, request.url)
+    crawl_data = await crawl_page(crawler, request.url, request.use_cache)
     
     # Record cache metrics
     if crawl_data.get("cached_at"):
-        monitor.record_cache_hit("crawl")
+        crawl_cache_metrics.hit()
     else:
-        monitor.record_cache_miss("crawl")
+        crawl_cache_metrics.miss()
     return CrawlResponse(
         markdown=crawl_data["markdown"],
         cached=crawl_data.get("cached_at") is not None,
@@ -91,28 +231,45 @@ async def crawl(
 async def generate(
     request: GenerateRequest, 
     cache: SimpleCacheService = Depends(get_gptcache_service),
-    llm_provider: LLMProvider = Depends(get_llm_provider)
+    llm_router: LLMRouter = Depends(get_llm_router),
+    settings: Settings = Depends(get_settings)
 ):
+    backend = llm_router.select(request.prompt, endpoint="generate")
+    query_key = normalize_query(
+        request.prompt,
+        collapse_whitespace=settings.llm_cache_collapse_whitespace,
+        lowercase=settings.llm_cache_lowercase_query,
+    )
+    
+    def key_for(chosen: Backend) -> str:
+        # The answering model is part of the key
+        return llm_cache_key(chosen.model_name, "", query_key, "", chosen.generation_config)
+    
     # Check cache first if enabled
     cached_response = None
     if request.use_cache:
-        cached_response = await cache.get_llm_response(request.prompt)
+        cached_response = await cache.get_llm_response(request.prompt, cache_key=key_for(backend))
         if cached_response:
-            monitor.record_cache_hit("llm")
+            llm_cache_metrics.hit()
     
     if cached_response:
-        logger.info(f"Cache hit for LLM prompt: {request.prompt[:50]}...")
-        return GenerateResponse(text=cached_response, cached=True)
+        logger.info("Cache hit for LLM prompt: %.50s...", request.prompt)
+        return GenerateResponse(text=cached_response, cached=True, model=backend.model_name)
     
-    monitor.record_cache_miss("llm")
+    llm_cache_metrics.miss()
 
     # Generate new response
-    text = await llm_provider.generate_content(request.prompt)
+    text, used = await generate_or_stale(
+        llm_router, cache, request.prompt, "generate", backend,
+        cache_key=key_for(backend), allow_stale=request.use_cache,
+    )
+    if used is None:
+        return GenerateResponse(text=text, cached=True, stale=True, model=backend.model_name)
     
     # Cache the response
-    await cache.set_llm_response(request.prompt, text)
+    await cache.set_llm_response(request.prompt, text, cache_key=key_for(used))
     
-    return GenerateResponse(text=text, cached=False)
+    return GenerateResponse(text=text, cached=False, model=used.model_name)
 
 
 @router.post("/history/add")
@@ -135,10 +292,14 @@ async def get_chat_history(
 @track_request("cag")
 async def cache_augmented_generation(
     request: CAGRequest,
+    http_request: Request,
     crawler: CrawlerService = Depends(get_crawler_service),
     cache: SimpleCacheService = Depends(get_gptcache_service),
-    llm_provider: LLMProvider = Depends(get_llm_provider),
-    history_service: HistoryService = Depends(get_history_service)
+    llm_router: LLMRouter = Depends(get_llm_router),
+    history_service: HistoryService = Depends(get_history_service),
+    digester: PageDigester = Depends(get_page_digester),
+    settings: Settings = Depends(get_settings),
+    proxies: TrustedProxies = Depends(get_trusted_proxies),
 ):
     """
     Unified Cache-Augmented Generation endpoint.
@@ -154,47 +315,103 @@ async def cache_augmented_generation(
         logger.warning(f"Invalid or potentially dangerous URL blocked in CAG: {request.url}")
         raise HTTPException(status_code=400, detail="Invalid or unsafe URL provided")
     
-    logger.info(f"Starting CAG workflow for URL: {request.url}")
+    logger.info("Starting CAG workflow for URL: %s", request.url)
     start_time = time.time()
+    record_demand(http_request, settings, proxies, cache, request.url, request.query, request.user_id)
     
     # Step 1: Crawl the website with caching
-    crawl_data = await crawler.crawl_with_metadata(request.url, use_cache=request.use_cache)
+    with track_stage("cag.crawl"):
+        crawl_data = await crawl_page(crawler, request.url, request.use_cache)
     crawl_cached = crawl_data.get("cached_at") is not None
     
-    # Step 2: Prepare the prompt
-    base_prompt = f"""Based on the following content from {request.url}:
-
-{crawl_data['markdown']}
-
-User Query: {request.query}
-
-Please provide a comprehensive answer based on the content above."""
-    
-    # Step 3: Include chat history if requested
-    final_prompt = base_prompt
+    # Step 2: Include chat history if requested
+    recent_turns = []
     if request.include_history and request.user_id:
-        history = await history_service.get_history(request.user_id)
-        if history:
-            history_context = "\n".join([
-                f"{turn['role']}: {turn['message']}" for turn in history[-5:]  # Last 5 turns
-            ])
-            final_prompt = f"""Previous conversation context:
-{history_context}
-
-{base_prompt}"""
+        with track_stage("cag.history"):
+            history = await history_service.get_history(request.user_id)
+        recent_turns = history[-CAG_HISTORY_TURNS:] if history else []
+    
+    # Step 3: Prepare the prompt
+    # Keyed by page content rather than URL so duplicate pages share answers, contexts and digests
+    markdown = crawl_data["markdown"] or ""
+    page_hash = crawl_data.get("content_hash") or content_hash(markdown)
+    digest = None
+    with track_stage("cag.digest"):
+        try:
+            if request.prompt_mode == "digest" and digester.enabled:
+                digest = await digester.digest(request.url, page_hash, markdown)
+            elif request.prompt_mode == "auto" and digester.applies(markdown):
+                digest = await cache.get_page_digest(page_hash)
+                if digest is None:
+                    digester.schedule(request.url, page_hash, markdown)
+        except LLMUnavailableError as e:
+            logger.warning("Digest of %s unavailable, sending the full page: %s", request.url, e)
+    if digest:
+        prompt_mode = "digest"
+        final_prompt = _with_history(build_digest_prompt(
+            request.url, markdown, digest, request.query, settings.page_digest_top_sections
+        ), recent_turns)
+    else:
+        prompt_mode = "full"
+        final_prompt = build_cag_prompt(request.url, markdown, request.query, recent_turns)
     
     # Step 4: Generate response with caching
+    backend = llm_router.select(final_prompt, endpoint="cag")
+    model_name = backend.model_name
+    page_context = PageContextCache(cache, settings)
     llm_cached = False
+    llm_stale = False
+    llm_context_cached = False
+    
+    async def answer(cache_key: Optional[str] = None, allow_stale: bool = True) -> Tuple[str, Optional[Backend]]:
+        nonlocal llm_context_cached
+        if prompt_mode == "full" and page_context.applies(backend, markdown):
+            question = build_cag_question(request.url, request.query, recent_turns)
+            text = await page_context.generate(backend, page_hash, markdown, question)
+            if text is not None:
+                llm_context_cached = True
+                return text, backend
+        return await generate_or_stale(
+            llm_router, cache, final_prompt, "cag", backend, cache_key=cache_key, allow_stale=allow_stale
+        )
+    
     if request.use_cache:
-        cached_response = await cache.get_llm_response(final_prompt)
+        query_key = normalize_query(
+            request.query,
+            collapse_whitespace=settings.llm_cache_collapse_whitespace,
+            lowercase=settings.llm_cache_lowercase_query,
+        )
+        recent_digest = history_digest(recent_turns)
+        
+        def key_for(chosen: Backend) -> str:
+            # Digest prompts answer differently from full-page prompts
+            page_key = page_hash + ":digest" if prompt_mode == "digest" else page_hash
+            return llm_cache_key(
+                chosen.model_name, page_key, query_key, recent_digest, chosen.generation_config
+            )
+        
+        llm_key = key_for(backend)
+        with track_stage("cag.llm_cache_lookup"):
+            cached_response = await cache.get_llm_response(final_prompt, cache_key=llm_key)
         if cached_response:
             llm_response = cached_response
             llm_cached = True
         else:
-            llm_response = await llm_provider.generate_content(final_prompt)
-            await cache.set_llm_response(final_prompt, llm_response)
+            with track_stage("cag.llm_generate"):
+                llm_response, used = await answer(cache_key=llm_key)
+            if used is None:
+                llm_cached = llm_stale = True
+            else:
+                model_name = used.model_name
+                # Answers are keyed by page content, so they stay valid as long as the page is expected to
+                llm_ttl = crawl_data.get("ttl") if settings.crawl_ttl_adaptive else None
+                await cache.set_llm_response(
+                    final_prompt, llm_response, ttl=llm_ttl or 3600, source_url=request.url, cache_key=key_for(used)
+                )
     else:
-        llm_response = await llm_provider.generate_content(final_prompt)
+        with track_stage("cag.llm_generate"):
+            llm_response, used = await answer(allow_stale=False)
+        model_name = used.model_name
     
     # Step 5: Save to history if user_id provided
     if request.user_id:
@@ -209,6 +426,10 @@ Please provide a comprehensive answer based on the content above."""
         query=request.query,
         crawl_cached=crawl_cached,
         llm_cached=llm_cached,
+        llm_stale=llm_stale,
+        llm_context_cached=llm_context_cached,
+        prompt_mode=prompt_mode,
+        model=model_name,
         crawl_timestamp=crawl_data.get("timestamp"),
         processing_time=processing_time,
         sources={
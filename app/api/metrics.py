@@ -0,0 +1,27 @@
+"""
+Prometheus scrape endpoint.
+"""
+
+import asyncio
+from fastapi import APIRouter, Depends
+from fastapi.responses import Response
+from app.api.dependencies import get_settings
+from app.core.config import Settings
+from app.core.prometheus import CONTENT_TYPE_LATEST, SnapshotStore, collect_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(settings: Settings = Depends(get_settings)):
+    """
+    Expose application metrics in the Prometheus text format.
+    """
+    if settings.metrics_multiproc_dir:
+        store = SnapshotStore(settings.metrics_multiproc_dir)
+        body = await asyncio.to_thread(
+            collect_metrics, store, gauge_max_age=settings.metrics_flush_interval * 3
+        )
+    else:
+        body = collect_metrics()
+    return Response(content=body, media_type=CONTENT_TYPE_LATEST)
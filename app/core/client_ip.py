@@ -0,0 +1,72 @@
+"""
+Client address of a request behind reverse proxies.
+
+``X-Forwarded-For`` and ``X-Real-IP`` are set by whoever sends the request,
+so they are only believed when the direct peer is a trusted proxy
+(``TRUSTED_PROXIES``: addresses or CIDR ranges, ``*`` to trust any peer).
+The forwarded chain is then read from the right, skipping trusted proxies;
+the first address that is not one is the client.
+"""
+
+import ipaddress
+from typing import Iterable, Optional
+
+from fastapi import Request
+
+
+def _parse_address(value: str) -> Optional[ipaddress._BaseAddress]:
+    try:
+        return ipaddress.ip_address(value.strip())
+    except ValueError:
+        return None
+
+
+class TrustedProxies:
+    """
+    Set of proxy addresses whose forwarding headers are believed.
+
+    Parsing the entries is not free; build one instance per configuration
+    (see ``ServiceContainer.trusted_proxies``) and reuse it.
+    """
+
+    def __init__(self, entries: Iterable[str] = ()):
+        self.trust_all = False
+        self.names = set()
+        self.networks = []
+        for entry in entries:
+            entry = entry.strip()
+            if entry == "*":
+                self.trust_all = True
+                continue
+            try:
+                self.networks.append(ipaddress.ip_network(entry, strict=False))
+            except ValueError:
+                # Non-IP peers such as unix sockets or test clients
+                self.names.add(entry)
+
+    def trusts(self, host: str) -> bool:
+        if self.trust_all or host in self.names:
+            return True
+        address = _parse_address(host)
+        return address is not None and any(address in network for network in self.networks)
+
+    def client_ip(self, request: Request) -> str:
+        """
+        Address of the client that sent ``request``.
+
+        Returns:
+            The client address, or "unknown" if the request has no peer
+        """
+        peer = request.client.host if request.client else "unknown"
+        if not self.trusts(peer):
+            return peer
+        forwarded_for = request.headers.get("X-Forwarded-For")
+        if forwarded_for:
+            hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+            for hop in reversed(hops):
+                if not self.trusts(hop):
+                    return hop
+            if hops:
+                return hops[0]
+        real_ip = request.headers.get("X-Real-IP")
+        return real_ip.strip() if real_ip else peer
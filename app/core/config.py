@@ -1,7 +1,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from redis import from_url
 from pydantic import Field, model_validator
-from typing import Optional
+from typing import Any, Dict, List, Literal, Optional
 from dotenv import load_dotenv
 
 class Settings(BaseSettings):
@@ -13,20 +13,132 @@ class Settings(BaseSettings):
     redis_host: Optional[str] = Field(default=None)
     redis_port: Optional[int] = Field(default=None)
     redis_db: Optional[int] = Field(default=None)
+    # Fail fast instead of waiting on an unreachable Redis
+    redis_socket_timeout: float = Field(default=2.0)
+    # Skip Redis after this many failures in a row, probing again after the reset timeout
+    redis_breaker_failure_threshold: int = Field(default=3)
+    redis_breaker_reset_timeout: float = Field(default=10.0)
     
     # GPTCache Configuration
     gptcache_data_dir: str = Field(default="gptcache_data")
     gptcache_llm_prefix: str = Field(default="gptcache_llm")
     gptcache_crawl_prefix: str = Field(default="gptcache_crawl")
     
+    # Cache index configuration (secondary indexes used for invalidation)
+    cache_index_ttl: int = Field(default=86400)
+    # Treat http:// and https:// spellings of a URL as the same cached page
+    cache_merge_url_schemes: bool = Field(default=True)
+    # In-process copy of recent entries served while Redis is unavailable
+    cache_local_max_bytes: int = Field(default=64 * 1024 * 1024)
+    
+    # LLM Configuration
+    llm_model_name: str = Field(default="gemini-2.0-flash")
+    llm_temperature: Optional[float] = Field(default=None)
+    llm_max_output_tokens: Optional[int] = Field(default=None)
+    # Query normalization applied before computing LLM cache keys
+    llm_cache_collapse_whitespace: bool = Field(default=True)
+    llm_cache_lowercase_query: bool = Field(default=False)
+    # Routed backends as JSON (see app.services.llm_router); empty means llm_model_name only
+    llm_backends: List[Dict[str, Any]] = Field(default_factory=list)
+    llm_route_error_threshold: float = Field(default=0.5)
+    llm_route_slow_factor: float = Field(default=3.0)
+    
+    # LLM call resilience (see app.services.resilience)
+    llm_timeout: float = Field(default=30.0)
+    llm_max_retries: int = Field(default=2)
+    llm_retry_base_delay: float = Field(default=0.5)
+    llm_retry_max_delay: float = Field(default=8.0)
+    llm_hedge_enabled: bool = Field(default=False)
+    llm_hedge_min_delay: float = Field(default=1.0)
+    llm_hedge_percentile: float = Field(default=95.0)
+    llm_breaker_failure_threshold: int = Field(default=5)
+    llm_breaker_reset_timeout: float = Field(default=30.0)
+    # Expired LLM answers are kept this long to serve when the upstream is down
+    # (0 disables; entries stay in Redis and the local cache for ttl + this long)
+    llm_stale_ttl: int = Field(default=0)
+    # Provider-side context caching of large pages (see app.services.context_cache)
+    llm_context_cache_enabled: bool = Field(default=False)
+    llm_context_cache_min_tokens: int = Field(default=4096)
+    llm_context_cache_ttl: int = Field(default=3600)
+    # Map-reduce digests of long pages built after crawling (see app.services.digest)
+    page_digest_enabled: bool = Field(default=False)
+    page_digest_min_tokens: int = Field(default=8000)
+    page_digest_section_tokens: int = Field(default=2000)
+    page_digest_concurrency: int = Field(default=4)
+    # Raw sections sent alongside the digest in /cag digest prompts
+    page_digest_top_sections: int = Field(default=3)
+    page_digest_ttl: int = Field(default=86400)
+    # Background refresh of frequently requested URLs (see app.services.cache_warmer)
+    cache_warm_enabled: bool = Field(default=False)
+    cache_warm_interval: float = Field(default=60.0)
+    cache_warm_top_urls: int = Field(default=100)
+    # Refresh a hot URL when its cached crawl expires within this many seconds
+    cache_warm_refresh_before: int = Field(default=300)
+    cache_warm_concurrency: int = Field(default=4)
+    # URLs not requested for this long are no longer refreshed
+    cache_warm_idle_after: int = Field(default=86400)
+    # Hit counts are multiplied by this every cycle so popularity follows recent traffic
+    cache_warm_decay: float = Field(default=0.95)
+    cache_warm_max_tracked: int = Field(default=10000)
+    # Count distinct users per URL in Redis HyperLogLogs (see /admin/popularity/top)
+    unique_users_tracking: bool = Field(default=True)
+    unique_users_ttl: int = Field(default=7 * 86400)
+    # Peers (addresses, CIDR ranges or "*") whose X-Forwarded-For / X-Real-IP are believed
+    trusted_proxies: List[str] = Field(default_factory=lambda: ["127.0.0.1", "::1"])
+    # Crawl TTLs learned from each URL's change rate (see app.services.adaptive_ttl)
+    crawl_ttl_adaptive: bool = Field(default=True)
+    crawl_ttl_default: int = Field(default=7200)
+    crawl_ttl_min: int = Field(default=300)
+    crawl_ttl_max: int = Field(default=7 * 86400)
+    # TTL as a fraction of the estimated time between content changes
+    crawl_ttl_factor: float = Field(default=0.5)
+    # Per-domain {"min": .., "max": ..} bounds or a fixed {"ttl": ..}, as JSON
+    crawl_ttl_domain_overrides: Dict[str, Dict[str, int]] = Field(default_factory=dict)
+    # Per-host crawl politeness (see app.services.crawl_scheduler); off by default
+    # because it adds per-host delays and 403/502 rejections to /crawl
+    crawl_scheduler_enabled: bool = Field(default=False)
+    crawl_max_concurrency: int = Field(default=8)
+    crawl_per_host_concurrency: int = Field(default=2)
+    # Seconds between crawl starts on one host (raised to its robots.txt Crawl-delay)
+    crawl_per_host_delay: float = Field(default=1.0)
+    crawl_max_crawl_delay: float = Field(default=30.0)
+    crawl_respect_robots: bool = Field(default=False)
+    crawl_user_agent: str = Field(default="CAGBot")
+    crawl_robots_ttl: int = Field(default=3600)
+    crawl_dns_ttl: int = Field(default=300)
+    
     # Application Configuration
     app_name: str = Field(default="CAG System")
     app_version: str = Field(default="1.0.0")
     debug: bool = Field(default=False)
     
+    # Startup: when heavy SDKs are imported (lazy, background or eager)
+    startup_mode: Literal["lazy", "background", "eager"] = Field(default="lazy")
+    
+    # Logging Configuration
+    log_json: bool = Field(default=False)
+    access_log_burst: int = Field(default=100)
+    access_log_sample_rate: float = Field(default=0.1)
+    
     # Redis Server Integration
     redis_server_enabled: bool = Field(default=False)
     redis_server_url: Optional[str] = Field(default=None)
+    redis_server_timeout: float = Field(default=10.0)
+    redis_server_connect_timeout: float = Field(default=5.0)
+    redis_server_max_connections: int = Field(default=100)
+    redis_server_max_keepalive_connections: int = Field(default=20)
+    redis_server_keepalive_expiry: float = Field(default=30.0)
+    redis_server_http2: bool = Field(default=False)
+    
+    # Traffic capture for replay (opt-in)
+    traffic_capture_enabled: bool = Field(default=False)
+    traffic_capture_path: str = Field(default="logs/traffic_capture.jsonl")
+    traffic_capture_max_bytes: int = Field(default=50 * 1024 * 1024)
+    traffic_capture_backup_count: int = Field(default=5)
+    
+    # Metrics Configuration
+    metrics_multiproc_dir: Optional[str] = Field(default=None)
+    metrics_flush_interval: float = Field(default=5.0)
 
     model_config = SettingsConfigDict(
         env_file=".env", 
@@ -34,6 +146,14 @@ class Settings(BaseSettings):
         case_sensitive=False
     )
 
+    def llm_generation_config(self) -> Dict[str, Any]:
+        """Generation parameters that were explicitly configured."""
+        config = {
+            "temperature": self.llm_temperature,
+            "max_output_tokens": self.llm_max_output_tokens,
+        }
+        return {name: value for name, value in config.items() if value is not None}
+
     @model_validator(mode='after')
     def parse_redis_url(self) -> 'Settings':
         if self.redis_url:
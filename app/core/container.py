@@ -0,0 +1,130 @@
+"""
+Application-scoped service container.
+
+Settings and the long-lived services (Redis-backed caches, the LLM provider,
+the crawler, the Redis server client) are created once per application
+instead of on every request. The container is built in the lifespan and
+stored on ``app.state``; FastAPI dependencies in ``app.api.dependencies``
+read from it and can still be overridden in tests.
+
+Services are constructed on first use, so heavy SDKs keep loading lazily
+(see ``app.core.startup``).
+"""
+
+import logging
+from typing import Any, Dict
+
+from fastapi import Request
+
+from app.core.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """
+    Holds Settings and the services shared by all requests.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self._services: Dict[str, Any] = {}
+
+    def _get(self, name: str, factory) -> Any:
+        service = self._services.get(name)
+        if service is None:
+            service = self._services[name] = factory()
+        return service
+
+    @property
+    def redis_breaker(self):
+        """Circuit breaker shared by every service talking to Redis."""
+        from app.services.resilience import redis_breaker
+        return self._get("redis_breaker", lambda: redis_breaker(self.settings))
+
+    @property
+    def cache(self):
+        """Redis cache for crawled pages and LLM responses."""
+        from app.services.simple_caching import SimpleCacheService
+        return self._get("cache", lambda: SimpleCacheService(self.settings, breaker=self.redis_breaker))
+
+    @property
+    def history(self):
+        from app.services.history import HistoryService
+        return self._get("history", lambda: HistoryService(self.settings, breaker=self.redis_breaker))
+
+    @property
+    def llm_provider(self):
+        """Router over the configured LLM backends, each behind deadlines, retries and a breaker."""
+        from app.services.llm_router import LLMRouter
+        return self._get("llm_provider", lambda: LLMRouter.from_settings(self.settings))
+
+    @property
+    def digester(self):
+        """Background builder of long-page digests (idle unless ``page_digest_enabled``)."""
+        from app.services.digest import PageDigester
+        return self._get("digester", lambda: PageDigester(self.settings, self.cache, self.llm_provider))
+
+    @property
+    def crawler(self):
+        from app.services.crawler import CrawlerService
+        return self._get("crawler", lambda: CrawlerService(
+            cache_service=self.cache,
+            digester=self.digester if self.settings.page_digest_enabled else None,
+            track_access=self.settings.cache_warm_enabled,
+            scheduler=self.crawl_scheduler if self.settings.crawl_scheduler_enabled else None,
+        ))
+
+    @property
+    def crawl_scheduler(self):
+        """Per-host politeness limits, robots.txt rules and DNS answers shared by all crawls."""
+        from app.services.crawl_scheduler import CrawlScheduler
+        return self._get("crawl_scheduler", lambda: CrawlScheduler.from_settings(self.settings))
+
+    @property
+    def warmer(self):
+        """Refresher of hot URLs (its loop is started in the lifespan when enabled)."""
+        from app.services.cache_warmer import CacheWarmer
+        return self._get("warmer", lambda: CacheWarmer(self.settings, self.cache, self.crawler))
+
+    @property
+    def trusted_proxies(self):
+        """Proxies whose forwarding headers identify the client (parsed once)."""
+        from app.core.client_ip import TrustedProxies
+        return self._get("trusted_proxies", lambda: TrustedProxies(self.settings.trusted_proxies))
+
+    @property
+    def gptcache(self):
+        """GPTCache-backed cache used by the admin pipeline test."""
+        from app.services.caching import GPTCacheService
+        return self._get("gptcache", lambda: GPTCacheService(self.settings))
+
+    @property
+    def redis_server(self):
+        from app.services.redis_integration import RedisServerClient
+        return self._get("redis_server", lambda: RedisServerClient(self.settings))
+
+    async def aclose(self) -> None:
+        """Release connections held by the services that were created."""
+        services, self._services = self._services, {}
+        for name, service in services.items():
+            close = getattr(service, "aclose", None)
+            if close is None:
+                continue
+            try:
+                await close()
+            except Exception as e:
+                logger.warning("Closing %s failed: %s", name, e)
+
+
+def get_container(request: Request) -> ServiceContainer:
+    """
+    The application's container.
+
+    Falls back to building one on first use when the app runs without its
+    lifespan (for example under a bare ASGI transport).
+    """
+    container = getattr(request.app.state, "container", None)
+    if container is None:
+        container = request.app.state.container = ServiceContainer(get_settings())
+    return container
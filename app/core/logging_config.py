@@ -1,81 +1,239 @@
 """
 Logging configuration for the CAG System.
+
+Loggers never write to stdout or disk on the calling thread: records are put
+on a bounded queue by a non-blocking ``QueueHandler`` and a ``QueueListener``
+thread does the formatting and I/O. Per-request access logs go through the
+``app.access`` logger, which is sampled under high load.
 """
 
+import atexit
+import json
 import logging
 import logging.config
+import logging.handlers
+import os
+import queue
 import sys
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Optional
+
+DEFAULT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DETAILED_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+LOG_QUEUE_SIZE = 10000
+
+# Arguments of these types are safe to format later on the writer thread.
+_IMMUTABLE_ARG_TYPES = (str, int, float, bool, bytes, type(None))
+
+# Standard LogRecord attributes; anything else was passed via ``extra=``.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_atexit_registered = False
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "timestamp": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "function": record.funcName,
+            "line": record.lineno,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that never blocks and defers formatting to the writer thread.
+
+    Records are dropped (and counted) when the queue is full rather than
+    stalling the caller. Message formatting is left to the listener unless an
+    argument is mutable and could change before it is formatted.
+    """
+
+    def __init__(self, queue: "queue.Queue"):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args and not (isinstance(args, tuple) and all(isinstance(a, _IMMUTABLE_ARG_TYPES) for a in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class AccessLogSampler(logging.Filter):
+    """
+    Sample access log records once a per-second burst budget is exhausted.
+
+    The first ``burst`` records of every second pass; after that only one in
+    ``1 / sample_rate`` does. Warnings and errors always pass.
+    """
+
+    def __init__(self, burst: int = 100, sample_rate: float = 0.1):
+        super().__init__()
+        self.burst = burst
+        self.sample_every = max(1, round(1 / sample_rate)) if sample_rate > 0 else 0
+        self.sampled_out = 0
+        self._window = 0
+        self._seen = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        window = int(time.monotonic())
+        if window != self._window:
+            self._window = window
+            self._seen = 0
+        self._seen += 1
+        over_budget = self._seen - self.burst
+        if over_budget <= 0 or (self.sample_every and over_budget % self.sample_every == 0):
+            return True
+        self.sampled_out += 1
+        return False
+
 
+class _LoggerPrefixFilter(logging.Filter):
+    """Only pass records from loggers under the given prefix."""
 
-def setup_logging(debug: bool = False) -> None:
+    def __init__(self, prefix: str):
+        super().__init__()
+        self.prefix = prefix
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.name == self.prefix or record.name.startswith(self.prefix + ".")
+
+
+def setup_logging(
+    debug: bool = False,
+    json_logs: bool = False,
+    access_log_burst: int = 100,
+    access_log_sample_rate: float = 0.1,
+) -> None:
     """
     Setup logging configuration for the application.
-    
+
     Args:
         debug: Whether to enable debug logging
+        json_logs: Emit structured JSON lines instead of plain text
+        access_log_burst: Access log records per second written before sampling starts
+        access_log_sample_rate: Fraction of access log records kept beyond the burst
     """
+    global _listener, _atexit_registered
     log_level = "DEBUG" if debug else "INFO"
-    
+
+    # Reconfiguring replaces the previous writer thread
+    shutdown_logging()
+
+    # Create logs directory if it doesn't exist
+    os.makedirs("logs", exist_ok=True)
+
+    if json_logs:
+        console_formatter: logging.Formatter = JsonFormatter()
+        file_formatter: logging.Formatter = JsonFormatter()
+    else:
+        console_formatter = logging.Formatter(DEFAULT_FORMAT, datefmt=DATE_FORMAT)
+        file_formatter = logging.Formatter(DETAILED_FORMAT, datefmt=DATE_FORMAT)
+
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(log_level)
+    console_handler.setFormatter(console_formatter)
+
+    # Only application loggers go to the log file
+    file_handler = logging.handlers.RotatingFileHandler(
+        "logs/cag_system.log",
+        maxBytes=10485760,  # 10MB
+        backupCount=5,
+        encoding="utf8",
+    )
+    file_handler.setLevel(log_level)
+    file_handler.setFormatter(file_formatter)
+    file_handler.addFilter(_LoggerPrefixFilter("app"))
+
+    log_queue: "queue.Queue" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+
     logging_config: Dict[str, Any] = {
         "version": 1,
         "disable_existing_loggers": False,
-        "formatters": {
-            "default": {
-                "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-                "datefmt": "%Y-%m-%d %H:%M:%S"
-            },
-            "detailed": {
-                "format": "%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s",
-                "datefmt": "%Y-%m-%d %H:%M:%S"
+        "filters": {
+            "access_sampler": {
+                "()": AccessLogSampler,
+                "burst": access_log_burst,
+                "sample_rate": access_log_sample_rate,
             }
         },
         "handlers": {
-            "console": {
-                "class": "logging.StreamHandler",
-                "level": log_level,
-                "formatter": "default",
-                "stream": sys.stdout
-            },
-            "file": {
-                "class": "logging.handlers.RotatingFileHandler",
+            "queue": {
+                "()": NonBlockingQueueHandler,
+                "queue": log_queue,
                 "level": log_level,
-                "formatter": "detailed",
-                "filename": "logs/cag_system.log",
-                "maxBytes": 10485760,  # 10MB
-                "backupCount": 5,
-                "encoding": "utf8"
             }
         },
         "loggers": {
             "app": {
                 "level": log_level,
-                "handlers": ["console", "file"],
+                "handlers": ["queue"],
                 "propagate": False
             },
+            "app.access": {
+                "level": "INFO",
+                "filters": ["access_sampler"],
+            },
             "uvicorn": {
                 "level": "INFO",
-                "handlers": ["console"],
+                "handlers": ["queue"],
                 "propagate": False
             },
             "fastapi": {
                 "level": "INFO",
-                "handlers": ["console"],
+                "handlers": ["queue"],
                 "propagate": False
             }
         },
         "root": {
             "level": log_level,
-            "handlers": ["console"]
+            "handlers": ["queue"]
         }
     }
-    
-    # Create logs directory if it doesn't exist
-    import os
-    os.makedirs("logs", exist_ok=True)
-    
+
     logging.config.dictConfig(logging_config)
-    
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    _listener.start()
+    if not _atexit_registered:
+        atexit.register(shutdown_logging)
+        _atexit_registered = True
+
     # Log startup message
     logger = logging.getLogger("app.startup")
-    logger.info(f"Logging configured with level: {log_level}")
\ No newline at end of file
+    logger.info("Logging configured with level: %s", log_level)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
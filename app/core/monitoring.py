@@ -2,130 +2,579 @@
 Application monitoring and metrics for the CAG System.
 """
 
+import hashlib
+import math
+import os
 import time
 import logging
-from typing import Dict, Any, Optional
+from array import array
+from typing import Callable, Dict, Any, List, Optional, Sequence, Tuple
 from dataclasses import dataclass, field
-from collections import defaultdict, deque
+from collections import defaultdict
+from contextlib import contextmanager
 import threading
+import uuid
+from urllib.parse import urlsplit
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PERCENTILES = (50.0, 95.0, 99.0)
+
+_worker_ids: Dict[int, str] = {}
+
+
+def worker_id() -> str:
+    """
+    Identifier of this process, unique across restarts.
+
+    Forked workers inherit module state, so the id is keyed by PID; a PID
+    reused after a restart gets a new id.
+    """
+    pid = os.getpid()
+    if pid not in _worker_ids:
+        _worker_ids[pid] = f"{pid}-{uuid.uuid4().hex[:12]}"
+    return _worker_ids[pid]
+
+# Smoothing of the recent average, weighting roughly the last 100 samples
+RECENT_ALPHA = 2 / (100 + 1)
+
+
+def _percentile_label(percent: float) -> str:
+    """Format a percentile as a metric field name, e.g. 99.9 -> ``p99_9``."""
+    return "p" + f"{percent:g}".replace(".", "_")
+
+
+class LatencyHistogram:
+    """
+    Log-linear latency histogram with a fixed bucket layout.
+
+    Durations are recorded in microseconds. Values below ``SUB_BUCKET_COUNT``
+    get one bucket each; above that every power-of-two range is split into
+    ``SUB_BUCKET_COUNT`` linear sub-buckets, bounding the relative error of
+    any percentile to ``1 / SUB_BUCKET_COUNT`` (~3%). Recording is O(1),
+    memory is fixed per histogram, and two histograms can be merged by adding
+    their bucket counts, so snapshots from several workers can be combined.
+    ``recent`` is an exponentially weighted average of about the last 100
+    durations.
+    """
+
+    SUB_BUCKET_BITS = 5
+    SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+    MAX_VALUE_BITS = 32  # ~71 minutes expressed in microseconds
+    BUCKET_COUNT = (MAX_VALUE_BITS - SUB_BUCKET_BITS + 1) * SUB_BUCKET_COUNT
+
+    __slots__ = ("counts", "count", "total", "min", "max", "recent")
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.recent = 0.0
+
+    @classmethod
+    def bucket_index(cls, duration: float) -> int:
+        """Map a duration in seconds to its bucket index."""
+        micros = int(duration * 1_000_000)
+        if micros < cls.SUB_BUCKET_COUNT:
+            return max(micros, 0)
+        shift = micros.bit_length() - cls.SUB_BUCKET_BITS - 1
+        # Equivalent to (shift + 1) * SUB_BUCKET_COUNT + top - SUB_BUCKET_COUNT
+        index = (shift << cls.SUB_BUCKET_BITS) + (micros >> shift)
+        return min(index, cls.BUCKET_COUNT - 1)
+
+    @classmethod
+    def bucket_bounds(cls, index: int) -> Tuple[float, float]:
+        """Return the ``[lower, upper)`` bounds of a bucket in seconds."""
+        if index < 2 * cls.SUB_BUCKET_COUNT:
+            return index / 1_000_000, (index + 1) / 1_000_000
+        shift = index // cls.SUB_BUCKET_COUNT - 1
+        top = index % cls.SUB_BUCKET_COUNT + cls.SUB_BUCKET_COUNT
+        return (top << shift) / 1_000_000, ((top + 1) << shift) / 1_000_000
+
+    def record(self, duration: float):
+        """Record a single duration in seconds."""
+        # bucket_index() inlined: this runs for every recorded event
+        micros = int(duration * 1_000_000)
+        if micros < _SUB_BUCKET_COUNT:
+            index = micros if micros > 0 else 0
+        else:
+            shift = micros.bit_length() - _SUB_BUCKET_BITS - 1
+            index = (shift << _SUB_BUCKET_BITS) + (micros >> shift)
+            if index >= _BUCKET_COUNT:
+                index = _BUCKET_COUNT - 1
+        self.counts[index] += 1
+        self.recent = self.recent + RECENT_ALPHA * (duration - self.recent) if self.count else duration
+        self.count += 1
+        self.total += duration
+        if duration < self.min:
+            self.min = duration
+        if duration > self.max:
+            self.max = duration
+
+    def merge(self, other: "LatencyHistogram"):
+        """Add the contents of another histogram into this one."""
+        counts = self.counts
+        for index, bucket_count in enumerate(other.counts):
+            if bucket_count:
+                counts[index] += bucket_count
+        if other.count:
+            # Count-weighted mean of the two recent averages
+            self.recent = (self.recent * self.count + other.recent * other.count) / (self.count + other.count)
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent: float) -> float:
+        """
+        Estimate the duration at the given percentile (0-100).
+
+        Returns the midpoint of the bucket containing the requested rank,
+        clamped to the observed min/max.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(self.count * min(max(percent, 0.0), 100.0) / 100))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                lower, upper = self.bucket_bounds(index)
+                return min(max((lower + upper) / 2, self.min), self.max)
+        return self.max
+
+    def cumulative_counts(self, bounds: Sequence[float]) -> Sequence[int]:
+        """
+        Count observations at or below each of the given (ascending) bounds.
+
+        Fine buckets are attributed by their lower bound, which is how the
+        histogram is re-bucketed into coarse Prometheus ``le`` buckets.
+        """
+        result = []
+        seen = 0
+        index = 0
+        for bound in bounds:
+            while index < self.BUCKET_COUNT and self.bucket_bounds(index)[0] <= bound:
+                seen += self.counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the histogram sparsely (only non-empty buckets)."""
+        return {
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max,
+            "recent": self.recent,
+            "buckets": {str(i): c for i, c in enumerate(self.counts) if c},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        """Rebuild a histogram produced by :meth:`to_dict`."""
+        histogram = cls()
+        for index, bucket_count in data.get("buckets", {}).items():
+            histogram.counts[int(index)] = bucket_count
+        histogram.count = data.get("count", 0)
+        histogram.total = data.get("total", 0.0)
+        if data.get("min") is not None:
+            histogram.min = data["min"]
+        histogram.max = data.get("max", 0.0)
+        histogram.recent = data.get("recent", histogram.total / histogram.count if histogram.count else 0.0)
+        return histogram
+
+
+_SUB_BUCKET_BITS = LatencyHistogram.SUB_BUCKET_BITS
+_SUB_BUCKET_COUNT = LatencyHistogram.SUB_BUCKET_COUNT
+_BUCKET_COUNT = LatencyHistogram.BUCKET_COUNT
+
 
 @dataclass
 class MetricData:
     """Container for metric data."""
     count: int = 0
-    total_time: float = 0.0
-    min_time: float = float('inf')
-    max_time: float = 0.0
-    recent_times: deque = field(default_factory=lambda: deque(maxlen=100))
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
     
     def add_measurement(self, duration: float):
         """Add a new measurement."""
         self.count += 1
-        self.total_time += duration
-        self.min_time = min(self.min_time, duration)
-        self.max_time = max(self.max_time, duration)
-        self.recent_times.append(duration)
+        self.histogram.record(duration)
+    
+    def reset(self):
+        """Clear the metric in place (handles keep references to it)."""
+        self.count = 0
+        self.histogram = LatencyHistogram()
+    
+    def merge(self, other: "MetricData"):
+        """Add the contents of another metric into this one."""
+        self.count += other.count
+        if other.histogram.count:
+            self.histogram.merge(other.histogram)
+    
+    @property
+    def total_time(self) -> float:
+        return self.histogram.total
+    
+    @property
+    def min_time(self) -> float:
+        return self.histogram.min
+    
+    @property
+    def max_time(self) -> float:
+        return self.histogram.max
     
     @property
     def avg_time(self) -> float:
         """Calculate average time."""
-        return self.total_time / self.count if self.count > 0 else 0.0
-    
+        timed = self.histogram.count
+        return self.histogram.total / timed if timed > 0 else 0.0
+
+
+class _MetricShard:
+    """
+    Metrics recorded by a single thread.
+
+    Only the owning thread writes to a shard, so recording needs no lock;
+    readers aggregate all shards on demand.
+    """
+
+    __slots__ = ("metrics", "errors", "gauges")
+
+    def __init__(self):
+        self.metrics: Dict[str, MetricData] = {}
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.gauges: Dict[Tuple[str, str], float] = defaultdict(float)
+
+    def metric(self, key: str) -> MetricData:
+        metric = self.metrics.get(key)
+        if metric is None:
+            metric = self.metrics[key] = MetricData()
+        return metric
+
+
+class MetricHandle:
+    """
+    Pre-registered handle for a single metric key.
+
+    Resolving the key once at registration keeps string formatting out of the
+    per-event path; each thread caches its own ``MetricData`` for the key, so
+    ``record`` and ``increment`` touch no shared state.
+    """
+
+    __slots__ = ("_monitor", "_local", "key")
+
+    def __init__(self, monitor: "ApplicationMonitor", key: str):
+        self._monitor = monitor
+        self._local = threading.local()
+        self.key = key
+
+    def _metric(self) -> "MetricData":
+        metric = self._local.metric = self._monitor._shard().metric(self.key)
+        return metric
+
+    def record(self, duration: float):
+        """Record a timed measurement."""
+        try:
+            metric = self._local.metric
+        except AttributeError:
+            metric = self._metric()
+        metric.count += 1
+        metric.histogram.record(duration)
+
+    def increment(self):
+        """Count an event without timing."""
+        try:
+            metric = self._local.metric
+        except AttributeError:
+            metric = self._metric()
+        metric.count += 1
+
+
+class RequestHandle:
+    """Pre-registered handle recording an endpoint's latency and failures."""
+
+    __slots__ = ("_monitor", "endpoint", "latency", "error_key")
+
+    def __init__(self, monitor: "ApplicationMonitor", endpoint: str):
+        self._monitor = monitor
+        self.endpoint = endpoint
+        name = endpoint.replace('/', '_')
+        self.latency = MetricHandle(monitor, f"endpoint_{name}")
+        self.error_key = f"error_{name}"
+
     @property
-    def recent_avg_time(self) -> float:
-        """Calculate recent average time."""
-        if not self.recent_times:
-            return 0.0
-        return sum(self.recent_times) / len(self.recent_times)
+    def metric_key(self) -> str:
+        return self.latency.key
+
+    def record(self, duration: float, success: bool = True):
+        """Record a request with its duration and success status."""
+        self.latency.record(duration)
+        if not success:
+            self._monitor._shard().errors[self.error_key] += 1
+
+
+class CacheHandle:
+    """Pre-registered handle counting hits and misses of one cache type."""
+
+    __slots__ = ("hits", "misses")
+
+    def __init__(self, monitor: "ApplicationMonitor", cache_type: str):
+        self.hits = MetricHandle(monitor, f"cache_hit_{cache_type}")
+        self.misses = MetricHandle(monitor, f"cache_miss_{cache_type}")
+
+    def hit(self):
+        self.hits.increment()
+
+    def miss(self):
+        self.misses.increment()
 
 
 class ApplicationMonitor:
     """
     Application monitoring system to track performance and usage.
+    
+    Recording is lock-free: every thread writes to its own shard and reads
+    merge all shards. The lock only guards shard registration, handle
+    caches and gauge callbacks.
     """
     
     def __init__(self):
-        self._metrics: Dict[str, MetricData] = defaultdict(MetricData)
-        self._errors: Dict[str, int] = defaultdict(int)
+        self._local = threading.local()
+        self._shards: List[_MetricShard] = []
+        self._request_handles: Dict[str, RequestHandle] = {}
+        self._stage_handles: Dict[str, MetricHandle] = {}
+        self._cache_handles: Dict[str, CacheHandle] = {}
+        self._counter_handles: Dict[str, MetricHandle] = {}
+        self._gauge_callbacks: Dict[str, Callable[[], Dict[str, float]]] = {}
         self._start_time = time.time()
         self._lock = threading.Lock()
         
         logger.info("Application monitoring initialized")
     
+    def _shard(self) -> _MetricShard:
+        """Return the calling thread's shard, creating it on first use."""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = _MetricShard()
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+    
+    def request_handle(self, endpoint: str) -> RequestHandle:
+        """Get (or register) the handle for an endpoint."""
+        handle = self._request_handles.get(endpoint)
+        if handle is None:
+            with self._lock:
+                handle = self._request_handles.setdefault(endpoint, RequestHandle(self, endpoint))
+        return handle
+    
+    def stage_handle(self, stage: str) -> MetricHandle:
+        """Get (or register) the handle for a pipeline stage."""
+        handle = self._stage_handles.get(stage)
+        if handle is None:
+            with self._lock:
+                handle = self._stage_handles.setdefault(stage, MetricHandle(self, f"stage_{stage}"))
+        return handle
+    
+    def cache_handle(self, cache_type: str) -> CacheHandle:
+        """Get (or register) the hit/miss handle for a cache type."""
+        handle = self._cache_handles.get(cache_type)
+        if handle is None:
+            with self._lock:
+                handle = self._cache_handles.setdefault(cache_type, CacheHandle(self, cache_type))
+        return handle
+    
+    def counter_handle(self, event: str) -> MetricHandle:
+        """Get (or register) the handle counting an event (e.g. ``llm.retry``)."""
+        handle = self._counter_handles.get(event)
+        if handle is None:
+            with self._lock:
+                handle = self._counter_handles.setdefault(event, MetricHandle(self, f"event_{event}"))
+        return handle
+    
     def record_request(self, endpoint: str, duration: float, success: bool = True):
         """Record a request with its duration and success status."""
-        with self._lock:
-            metric_key = f"endpoint_{endpoint.replace('/', '_')}"
-            self._metrics[metric_key].add_measurement(duration)
-            
-            if not success:
-                error_key = f"error_{endpoint.replace('/', '_')}"
-                self._errors[error_key] += 1
-            
-            logger.debug(f"Recorded request: {endpoint} - {duration:.3f}s - {'success' if success else 'error'}")
+        self.request_handle(endpoint).record(duration, success)
+    
+    def record_stage(self, stage: str, duration: float):
+        """Record the duration of a pipeline stage (e.g. ``cag.crawl``)."""
+        self.stage_handle(stage).record(duration)
     
     def record_cache_hit(self, cache_type: str):
         """Record a cache hit."""
-        with self._lock:
-            metric_key = f"cache_hit_{cache_type}"
-            self._metrics[metric_key].count += 1
+        self.cache_handle(cache_type).hit()
     
     def record_cache_miss(self, cache_type: str):
         """Record a cache miss."""
-        with self._lock:
-            metric_key = f"cache_miss_{cache_type}"
-            self._metrics[metric_key].count += 1
+        self.cache_handle(cache_type).miss()
     
     def record_error(self, error_type: str, details: Optional[str] = None):
         """Record an error occurrence."""
+        self._shard().errors[error_type] += 1
+        if details:
+            logger.error("Error recorded: %s - %s", error_type, details)
+        else:
+            logger.error("Error recorded: %s", error_type)
+    
+    def increment_gauge(self, name: str, label: str = "", amount: float = 1.0):
+        """Adjust a gauge (e.g. requests in flight) by ``amount``."""
+        self._shard().gauges[(name, label)] += amount
+    
+    def decrement_gauge(self, name: str, label: str = "", amount: float = 1.0):
+        """Adjust a gauge down by ``amount``."""
+        self._shard().gauges[(name, label)] -= amount
+    
+    @contextmanager
+    def track_in_flight(self, name: str, label: str = ""):
+        """Context manager counting concurrent executions in a gauge."""
+        gauges = self._shard().gauges
+        key = (name, label)
+        gauges[key] += 1
+        try:
+            yield
+        finally:
+            # The context may finish on another thread; always use the current shard.
+            self._shard().gauges[key] -= 1
+    
+    def register_gauge_callback(self, name: str, callback: Callable[[], Dict[str, float]]):
+        """
+        Register a gauge whose values are computed on read.
+        
+        Args:
+            name: Gauge name
+            callback: Returns a mapping of label value to gauge value
+        """
         with self._lock:
-            self._errors[error_type] += 1
-            if details:
-                logger.error(f"Error recorded: {error_type} - {details}")
-            else:
-                logger.error(f"Error recorded: {error_type}")
-    
-    def get_metrics(self) -> Dict[str, Any]:
-        """Get current metrics summary."""
+            self._gauge_callbacks[name] = callback
+    
+    def _aggregate(self) -> Tuple[Dict[str, MetricData], Dict[str, int]]:
+        """Merge metrics and errors from every thread shard."""
+        with self._lock:
+            shards = list(self._shards)
+        metrics: Dict[str, MetricData] = defaultdict(MetricData)
+        errors: Dict[str, int] = defaultdict(int)
+        for shard in shards:
+            for key, metric in list(shard.metrics.items()):
+                metrics[key].merge(metric)
+            for key, count in list(shard.errors.items()):
+                errors[key] += count
+        return metrics, errors
+    
+    def get_gauges(self) -> Dict[str, Dict[str, float]]:
+        """Get current values of all gauges, including callback gauges."""
         with self._lock:
-            uptime = time.time() - self._start_time
-            
-            metrics_summary = {}
-            for key, metric in self._metrics.items():
-                if metric.count > 0:
-                    metrics_summary[key] = {
-                        "count": metric.count,
+            shards = list(self._shards)
+            callbacks = list(self._gauge_callbacks.items())
+        gauges: Dict[str, Dict[str, float]] = defaultdict(dict)
+        for shard in shards:
+            for (name, label), value in list(shard.gauges.items()):
+                gauges[name][label] = gauges[name].get(label, 0.0) + value
+        for name, callback in callbacks:
+            try:
+                gauges[name] = dict(callback())
+            except Exception as e:
+                logger.warning(f"Gauge callback {name} failed: {e}")
+        return dict(gauges)
+    
+    def get_metrics(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+        """
+        Get current metrics summary.
+        
+        Args:
+            percentiles: Latency percentiles (0-100) to report for every timed metric
+        """
+        metrics, errors = self._aggregate()
+        uptime = time.time() - self._start_time
+        
+        metrics_summary = {}
+        for key, metric in metrics.items():
+            if metric.count > 0:
+                summary: Dict[str, Any] = {"count": metric.count}
+                histogram = metric.histogram
+                if histogram.count > 0:
+                    summary.update({
                         "avg_time": round(metric.avg_time, 3),
                         "min_time": round(metric.min_time, 3),
                         "max_time": round(metric.max_time, 3),
-                        "recent_avg_time": round(metric.recent_avg_time, 3)
-                    }
-            
-            # Calculate cache hit rates
-            cache_stats = {}
-            for cache_type in ["llm", "crawl"]:
-                hits = self._metrics.get(f"cache_hit_{cache_type}", MetricData()).count
-                misses = self._metrics.get(f"cache_miss_{cache_type}", MetricData()).count
-                total = hits + misses
-                hit_rate = (hits / total * 100) if total > 0 else 0
-                cache_stats[f"{cache_type}_cache"] = {
-                    "hits": hits,
-                    "misses": misses,
-                    "hit_rate": round(hit_rate, 2)
-                }
-            
-            return {
-                "uptime_seconds": round(uptime, 2),
-                "uptime_formatted": self._format_uptime(uptime),
-                "metrics": metrics_summary,
-                "cache_stats": cache_stats,
-                "errors": dict(self._errors),
-                "total_requests": sum(m.count for m in self._metrics.values() if "endpoint_" in str(m)),
-                "timestamp": time.time()
+                        "recent_avg_time": round(histogram.recent, 3),
+                    })
+                    for percent in percentiles:
+                        summary[_percentile_label(percent)] = round(histogram.percentile(percent), 4)
+                metrics_summary[key] = summary
+        
+        # Calculate cache hit rates
+        cache_stats = {}
+        for cache_type in ["llm", "crawl"]:
+            hits = metrics.get(f"cache_hit_{cache_type}", MetricData()).count
+            misses = metrics.get(f"cache_miss_{cache_type}", MetricData()).count
+            total = hits + misses
+            hit_rate = (hits / total * 100) if total > 0 else 0
+            cache_stats[f"{cache_type}_cache"] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hit_rate, 2)
             }
+        
+        return {
+            "uptime_seconds": round(uptime, 2),
+            "uptime_formatted": self._format_uptime(uptime),
+            "metrics": metrics_summary,
+            "cache_stats": cache_stats,
+            "errors": dict(errors),
+            "total_requests": sum(m.count for key, m in metrics.items() if key.startswith("endpoint_")),
+            "timestamp": time.time()
+        }
+    
+    def get_histogram_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Export all latency histograms in a serializable form.
+        
+        Snapshots from several workers can be combined with
+        :meth:`merge_histogram_snapshot` to get fleet-wide percentiles.
+        """
+        metrics, _ = self._aggregate()
+        return {
+            key: metric.histogram.to_dict()
+            for key, metric in metrics.items()
+            if metric.histogram.count > 0
+        }
+    
+    def export_snapshot(self) -> Dict[str, Any]:
+        """
+        Export counters, errors, histograms and gauges of this process.
+        
+        Used for multi-worker aggregation: every worker writes its snapshot
+        and the worker serving a scrape merges all of them.
+        """
+        metrics, errors = self._aggregate()
+        return {
+            "pid": os.getpid(),
+            "worker_id": worker_id(),
+            "timestamp": time.time(),
+            "counts": {key: metric.count for key, metric in metrics.items() if metric.count},
+            "histograms": {
+                key: metric.histogram.to_dict()
+                for key, metric in metrics.items()
+                if metric.histogram.count > 0
+            },
+            "errors": dict(errors),
+            "gauges": self.get_gauges(),
+        }
+    
+    def merge_histogram_snapshot(self, snapshot: Dict[str, Dict[str, Any]]):
+        """Merge histograms exported by another worker into this monitor."""
+        shard = self._shard()
+        for key, data in snapshot.items():
+            histogram = LatencyHistogram.from_dict(data)
+            metric = shard.metric(key)
+            metric.count += histogram.count
+            metric.histogram.merge(histogram)
     
     def _format_uptime(self, uptime_seconds: float) -> str:
         """Format uptime in human-readable format."""
@@ -144,10 +593,12 @@ class ApplicationMonitor:
             return f"{seconds}s"
     
     def reset_metrics(self):
-        """Reset all metrics (useful for testing)."""
+        """Reset all metrics (useful for testing). Live gauges are kept."""
         with self._lock:
-            self._metrics.clear()
-            self._errors.clear()
+            for shard in self._shards:
+                for metric in list(shard.metrics.values()):
+                    metric.reset()
+                shard.errors.clear()
             self._start_time = time.time()
             logger.info("Metrics reset")
 
@@ -158,21 +609,170 @@ monitor = ApplicationMonitor()
 
 def track_request(endpoint: str):
     """Decorator to track request performance."""
+    handle = monitor.request_handle(endpoint)
+    error_type = f"endpoint_error_{endpoint}"
     def decorator(func):
         import functools
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            start_time = time.time()
+            start_time = time.perf_counter()
             success = True
             try:
                 result = await func(*args, **kwargs)
                 return result
             except Exception as e:
                 success = False
-                monitor.record_error(f"endpoint_error_{endpoint}", str(e))
+                monitor.record_error(error_type, str(e))
                 raise
             finally:
-                duration = time.time() - start_time
-                monitor.record_request(endpoint, duration, success)
+                handle.record(time.perf_counter() - start_time, success)
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Context manager timing a pipeline stage into the global monitor."""
+    handle = monitor.stage_handle(stage)
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        handle.record(time.perf_counter() - start_time)
+
+
+class CountMinSketch:
+    """
+    Count-min sketch: approximate counts of arbitrarily many keys in fixed memory.
+
+    Estimates never undercount; with ``width`` counters per row an estimate
+    exceeds the true count by more than ``e / width`` of all counted events
+    with probability at most ``exp(-depth)``. Updates are conservative (only
+    the minimal counters are raised), which tightens the overestimate.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self._counters = array("q", bytes(8 * width * depth))
+
+    def _cells(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Count ``key``; returns its new estimate."""
+        cells = self._cells(key)
+        counters = self._counters
+        estimate = min(counters[c] for c in cells) + count
+        for c in cells:
+            if counters[c] < estimate:
+                counters[c] = estimate
+        self.total += count
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(self._counters[c] for c in self._cells(key))
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._counters.itemsize * len(self._counters)
+
+
+class HeavyHitters:
+    """
+    Approximate top-K keys of a stream: a count-min sketch plus the ``k``
+    keys with the highest estimates seen so far.
+    """
+
+    def __init__(self, k: int = 50, width: int = 2048, depth: int = 4):
+        self.k = k
+        self.sketch = CountMinSketch(width, depth)
+        self._top: Dict[str, int] = {}
+
+    def add(self, key: str, count: int = 1):
+        estimate = self.sketch.add(key, count)
+        if key in self._top or len(self._top) < self.k:
+            self._top[key] = estimate
+            return
+        smallest = min(self._top, key=self._top.__getitem__)
+        if estimate > self._top[smallest]:
+            del self._top[smallest]
+            self._top[key] = estimate
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Tracked keys with their estimated counts, highest first."""
+        ranked = sorted(self._top.items(), key=lambda item: -item[1])
+        return ranked[:n] if n is not None else ranked
+
+
+class PopularityTracker:
+    """
+    Streaming frequencies of requested URLs, their domains and queries.
+
+    Queries are counted by hash so their text is not retained. Memory is
+    constant: one ``HeavyHitters`` per dimension. Counts are per process;
+    unique users per URL are counted in Redis (see
+    ``SimpleCacheService.record_unique_user``).
+    """
+
+    DIMENSIONS = ("url", "domain", "query")
+
+    def __init__(self, k: int = 50, width: int = 2048, depth: int = 4):
+        self._params = (k, width, depth)
+        self._lock = threading.Lock()
+        self.reset()
+
+    @staticmethod
+    def query_hash(query: str) -> str:
+        return hashlib.sha256(" ".join(query.lower().split()).encode()).hexdigest()[:16]
+
+    def record(self, url: Optional[str] = None, query: Optional[str] = None):
+        """
+        Count one request.
+
+        Args:
+            url: Canonical URL requested
+            query: Query text, counted by its hash
+        """
+        with self._lock:
+            if url:
+                self._hitters["url"].add(url)
+                domain = urlsplit(url).hostname
+                if domain:
+                    self._hitters["domain"].add(domain)
+            if query:
+                self._hitters["query"].add(self.query_hash(query))
+
+    def estimate(self, dimension: str, key: str) -> int:
+        with self._lock:
+            return self._hitters[dimension].sketch.estimate(key)
+
+    def top(self, dimension: str, n: int = 20) -> List[Tuple[str, int]]:
+        """
+        Heavy hitters of a dimension.
+
+        Raises:
+            KeyError: Unknown dimension
+        """
+        with self._lock:
+            return self._hitters[dimension].top(n)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Events counted and sketch memory per dimension."""
+        with self._lock:
+            return {
+                name: {"events": hitters.sketch.total, "memory_bytes": hitters.sketch.memory_bytes}
+                for name, hitters in self._hitters.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._hitters = {name: HeavyHitters(*self._params) for name in self.DIMENSIONS}
+
+
+# Global popularity tracker
+popularity = PopularityTracker()
@@ -0,0 +1,272 @@
+"""
+Prometheus text exposition for the CAG System.
+
+Renders the data collected by :mod:`app.core.monitoring` in the Prometheus
+text format (version 0.0.4). With multiple uvicorn workers each process
+periodically writes its snapshot to a shared directory and the worker
+serving a scrape merges every snapshot, so counters and histograms are
+reported for the whole deployment rather than for a random worker.
+Snapshots of processes that have exited are removed, so the totals reset
+(as Prometheus counters do) when workers restart.
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.monitoring import ApplicationMonitor, LatencyHistogram, monitor, worker_id
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+METRIC_PREFIX = "cag"
+
+# Coarse buckets exposed to Prometheus; the fine log-linear histogram is re-bucketed into these.
+PROMETHEUS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+GAUGE_DEFINITIONS = {
+    "http_requests_in_flight": ("endpoint", "Requests currently being processed."),
+    "crawler_active_crawls": ("", "Browser crawls currently running."),
+    "redis_pool_connections": ("state", "Redis connection pool connections by state."),
+    "circuit_breaker_state": ("breaker", "Circuit breaker state (0 closed, 1 half-open, 2 open)."),
+}
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError, OverflowError, ValueError):
+        # Exists under another user, or not a PID we can check
+        return pid > 0
+    return True
+
+
+class SnapshotStore:
+    """
+    Directory of per-worker metric snapshots used for multiprocess aggregation.
+
+    Files are named ``worker_<pid>-<id>.json`` with an id unique to each
+    process start, so a reused PID never overwrites an earlier process's
+    series.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, worker: str) -> str:
+        return os.path.join(self.directory, f"worker_{worker}.json")
+
+    def write(self, snapshot: Dict[str, Any]) -> None:
+        """Atomically replace this worker's snapshot file."""
+        path = self._path(snapshot.get("worker_id") or str(snapshot["pid"]))
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    def prune(self) -> int:
+        """
+        Remove snapshots of processes that have exited.
+
+        A file is stale when its PID is not running, or when the PID is this
+        process's but the id is not (an earlier process with the same PID).
+
+        Returns:
+            Number of files removed
+        """
+        own = worker_id()
+        own_pid = own.split("-", 1)[0]
+        removed = 0
+        for path in glob.glob(os.path.join(self.directory, "worker_*.json")):
+            worker = os.path.basename(path)[len("worker_"):-len(".json")]
+            pid = worker.split("-", 1)[0]
+            try:
+                alive = _process_alive(int(pid))
+            except ValueError:
+                continue
+            if alive and (pid != own_pid or worker == own):
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def read_all(self) -> List[Dict[str, Any]]:
+        """Read the snapshots of running workers, skipping unreadable files."""
+        self.prune()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, "worker_*.json")):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable metrics snapshot {path}: {e}")
+        return snapshots
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Any]], gauge_max_age: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Merge worker snapshots into one.
+
+    Counters, errors and histograms are summed across all snapshots. Gauges
+    describe live state and are only taken from snapshots younger than
+    ``gauge_max_age``.
+    """
+    counts: Dict[str, int] = defaultdict(int)
+    errors: Dict[str, int] = defaultdict(int)
+    histograms: Dict[str, LatencyHistogram] = {}
+    gauges: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    now = time.time()
+
+    for snapshot in snapshots:
+        for key, value in snapshot.get("counts", {}).items():
+            counts[key] += value
+        for key, value in snapshot.get("errors", {}).items():
+            errors[key] += value
+        for key, data in snapshot.get("histograms", {}).items():
+            histogram = LatencyHistogram.from_dict(data)
+            if key in histograms:
+                histograms[key].merge(histogram)
+            else:
+                histograms[key] = histogram
+        if gauge_max_age is None or now - snapshot.get("timestamp", 0) <= gauge_max_age:
+            for name, values in snapshot.get("gauges", {}).items():
+                for label, value in values.items():
+                    gauges[name][label] += value
+
+    return {"counts": counts, "errors": errors, "histograms": histograms, "gauges": gauges}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels: str) -> str:
+    rendered = ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items())
+    return f"{{{rendered}}}" if rendered else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _render_histogram(lines: List[str], name: str, label_name: str, label_value: str,
+                      histogram: LatencyHistogram) -> None:
+    cumulative = histogram.cumulative_counts(PROMETHEUS_BUCKETS)
+    for bound, bucket_count in zip(PROMETHEUS_BUCKETS, cumulative):
+        lines.append(f"{name}_bucket{_labels(**{label_name: label_value, 'le': _format_value(bound)})} {bucket_count}")
+    lines.append(f"{name}_bucket{_labels(**{label_name: label_value, 'le': '+Inf'})} {histogram.count}")
+    lines.append(f"{name}_sum{_labels(**{label_name: label_value})} {_format_value(histogram.total)}")
+    lines.append(f"{name}_count{_labels(**{label_name: label_value})} {histogram.count}")
+
+
+def render_prometheus(merged: Dict[str, Any]) -> str:
+    """Render a merged snapshot in the Prometheus text exposition format."""
+    counts = merged["counts"]
+    errors = merged["errors"]
+    histograms = merged["histograms"]
+    lines: List[str] = []
+
+    endpoints = sorted(key[len("endpoint_"):] for key in counts if key.startswith("endpoint_"))
+    requests_name = f"{METRIC_PREFIX}_requests_total"
+    lines.append(f"# HELP {requests_name} Requests handled per endpoint.")
+    lines.append(f"# TYPE {requests_name} counter")
+    for endpoint in endpoints:
+        total = counts[f"endpoint_{endpoint}"]
+        failed = errors.get(f"error_{endpoint}", 0)
+        lines.append(f"{requests_name}{_labels(endpoint=endpoint, status='success')} {total - failed}")
+        lines.append(f"{requests_name}{_labels(endpoint=endpoint, status='error')} {failed}")
+
+    duration_name = f"{METRIC_PREFIX}_request_duration_seconds"
+    lines.append(f"# HELP {duration_name} Request latency per endpoint.")
+    lines.append(f"# TYPE {duration_name} histogram")
+    for endpoint in endpoints:
+        histogram = histograms.get(f"endpoint_{endpoint}")
+        if histogram is not None:
+            _render_histogram(lines, duration_name, "endpoint", endpoint, histogram)
+
+    stage_name = f"{METRIC_PREFIX}_stage_duration_seconds"
+    lines.append(f"# HELP {stage_name} Latency of individual pipeline stages.")
+    lines.append(f"# TYPE {stage_name} histogram")
+    for key in sorted(k for k in histograms if k.startswith("stage_")):
+        _render_histogram(lines, stage_name, "stage", key[len("stage_"):], histograms[key])
+
+    cache_name = f"{METRIC_PREFIX}_cache_requests_total"
+    lines.append(f"# HELP {cache_name} Cache lookups by cache type and result.")
+    lines.append(f"# TYPE {cache_name} counter")
+    cache_types = sorted({key.split("_", 2)[2] for key in counts if key.startswith(("cache_hit_", "cache_miss_"))})
+    for cache_type in cache_types:
+        lines.append(f"{cache_name}{_labels(cache=cache_type, result='hit')} {counts.get(f'cache_hit_{cache_type}', 0)}")
+        lines.append(f"{cache_name}{_labels(cache=cache_type, result='miss')} {counts.get(f'cache_miss_{cache_type}', 0)}")
+
+    events_name = f"{METRIC_PREFIX}_events_total"
+    lines.append(f"# HELP {events_name} Counted events (retries, timeouts, circuit breaker decisions).")
+    lines.append(f"# TYPE {events_name} counter")
+    for key in sorted(k for k in counts if k.startswith("event_")):
+        lines.append(f"{events_name}{_labels(event=key[len('event_'):])} {counts[key]}")
+
+    errors_name = f"{METRIC_PREFIX}_errors_total"
+    lines.append(f"# HELP {errors_name} Recorded errors by type.")
+    lines.append(f"# TYPE {errors_name} counter")
+    for error_type in sorted(errors):
+        lines.append(f"{errors_name}{_labels(type=error_type)} {errors[error_type]}")
+
+    for gauge, values in sorted(merged["gauges"].items()):
+        label_name, help_text = GAUGE_DEFINITIONS.get(gauge, ("label", f"Gauge {gauge}."))
+        name = f"{METRIC_PREFIX}_{gauge}"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for label, value in sorted(values.items()):
+            labels = _labels(**{label_name: label}) if label_name and label else ""
+            lines.append(f"{name}{labels} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def collect_metrics(store: Optional[SnapshotStore] = None, app_monitor: ApplicationMonitor = monitor,
+                    gauge_max_age: Optional[float] = None) -> str:
+    """
+    Produce the exposition text for a scrape.
+
+    Without a store only this process is reported. With a store the current
+    process refreshes its own snapshot first and all workers are merged.
+    """
+    snapshot = app_monitor.export_snapshot()
+    if store is None:
+        return render_prometheus(merge_snapshots([snapshot]))
+    store.write(snapshot)
+    return render_prometheus(merge_snapshots(store.read_all(), gauge_max_age=gauge_max_age))
+
+
+async def run_snapshot_flusher(store: SnapshotStore, interval: float,
+                               app_monitor: ApplicationMonitor = monitor) -> None:
+    """Periodically write this worker's snapshot until cancelled."""
+    try:
+        while True:
+            try:
+                await asyncio.to_thread(store.write, app_monitor.export_snapshot())
+            except Exception as e:
+                logger.warning(f"Failed to write metrics snapshot: {e}")
+            await asyncio.sleep(interval)
+    finally:
+        # Stop reporting live gauges; the file is pruned once the process has exited.
+        final_snapshot = app_monitor.export_snapshot()
+        final_snapshot["gauges"] = {}
+        try:
+            store.write(final_snapshot)
+        except Exception as e:
+            logger.warning(f"Failed to write final metrics snapshot: {e}")
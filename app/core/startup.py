@@ -0,0 +1,146 @@
+"""
+Startup modes and import-time profiling.
+
+Heavy third-party SDKs (crawl4ai, gptcache with faiss, google.generativeai)
+are imported by the code that uses them rather than when ``app.main`` is
+loaded. ``STARTUP_MODE`` decides when they are loaded:
+
+- ``lazy``: on first use (fastest cold start; the first request that needs
+  a module pays for its import)
+- ``background``: warmed in a thread once the app has started
+- ``eager``: during import of ``app.main``, as before
+
+Profile what importing the entry point costs with:
+
+    python -m app.core.startup [--target api.index] [--top 20] [--mode eager]
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from importlib import import_module
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+STARTUP_MODES = ("lazy", "background", "eager")
+HEAVY_MODULES = (
+    "google.generativeai",
+    "crawl4ai.async_webcrawler",
+    "app.services.caching",
+)
+
+
+def preload_heavy_modules(modules: Sequence[str] = HEAVY_MODULES) -> Dict[str, float]:
+    """
+    Import heavy modules ahead of first use.
+
+    Modules that fail to import are logged and skipped; the route using them
+    reports the error when it is called.
+
+    Returns:
+        Seconds spent importing each module
+    """
+    timings: Dict[str, float] = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            import_module(name)
+        except Exception as e:
+            logger.warning("Preloading %s failed: %s", name, e)
+            continue
+        timings[name] = round(time.perf_counter() - start, 3)
+    if "google.generativeai" in timings:
+        from app.services.llm_provider import load_genai
+        load_genai()
+    logger.info("Preloaded heavy modules: %s", timings)
+    return timings
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse ``python -X importtime`` output into per-module timings (microseconds)."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # header line
+        name = parts[2].rstrip()
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_us": self_us,
+            "cumulative_us": cumulative_us,
+        })
+    return modules
+
+
+def import_profile(target: str = "api.index", top: int = 20, mode: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Import ``target`` in a fresh interpreter and report where the time goes.
+
+    Args:
+        target: Module to import (the serverless entry point by default)
+        top: Number of slowest packages and modules to list
+        mode: STARTUP_MODE for the child process (defaults to the environment)
+
+    Returns:
+        Wall time, total import time, slowest packages and modules, and which
+        heavy modules were loaded
+    """
+    env = dict(os.environ)
+    if mode:
+        env["STARTUP_MODE"] = mode
+    check = "import sys; print(' '.join(m for m in {!r} if m in sys.modules))".format(HEAVY_MODULES)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}; {check}"],
+        capture_output=True, text=True, env=env,
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{result.stderr[-2000:]}")
+
+    modules = parse_importtime(result.stderr)
+    top_level = [m for m in modules if m["depth"] == 0]
+    loaded = set(result.stdout.split())
+    packages: Dict[str, int] = {}
+    for m in modules:
+        root = m["module"].split(".", 1)[0]
+        packages[root] = packages.get(root, 0) + m["self_us"]
+    return {
+        "target": target,
+        "mode": env.get("STARTUP_MODE", "lazy"),
+        "wall_ms": round(wall * 1000, 1),
+        "import_ms": round(sum(m["cumulative_us"] for m in top_level) / 1000, 1),
+        "modules_imported": len(modules),
+        "slowest_packages": [
+            {"package": name, "self_ms": round(us / 1000, 1)}
+            for name, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        ],
+        "slowest_self": [
+            {"module": m["module"], "self_ms": round(m["self_us"] / 1000, 1)}
+            for m in sorted(modules, key=lambda m: m["self_us"], reverse=True)[:top]
+        ],
+        "heavy_modules_loaded": {name: name in loaded for name in HEAVY_MODULES},
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Profile import time of the app entry point")
+    parser.add_argument("--target", default="api.index")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--mode", choices=STARTUP_MODES, help="STARTUP_MODE for the profiled import")
+    args = parser.parse_args(argv)
+    print(json.dumps(import_profile(args.target, args.top, args.mode), indent=2))
+
+
+if __name__ == "__main__":
+    main()
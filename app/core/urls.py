@@ -0,0 +1,66 @@
+"""
+URL canonicalization for cache keys.
+
+Different spellings of the same page (tracking parameters, trailing slashes,
+default ports, ``http`` vs ``https``, fragment identifiers) are mapped to one
+canonical URL so they share a crawl cache entry.
+"""
+
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track the visitor and never change page content
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "igshid", "ref", "ref_src", "spm",
+}
+TRACKING_PARAM_PREFIXES = ("utm_",)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _is_tracking_param(name: str) -> bool:
+    lowered = name.lower()
+    return lowered in TRACKING_PARAMS or lowered.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def canonicalize_url(url: str, merge_schemes: bool = True) -> str:
+    """
+    Return the canonical form of a URL for caching purposes.
+
+    Args:
+        url: The URL to canonicalize
+        merge_schemes: Treat ``http`` and ``https`` as the same page
+
+    Returns:
+        The canonical URL; unparseable input is returned stripped but unchanged
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    hostname = (parts.hostname or "").lower().rstrip(".")
+    if not scheme or not hostname:
+        return url
+
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{hostname}:{port}"
+    else:
+        netloc = hostname
+    if merge_schemes and scheme == "http":
+        scheme = "https"
+
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/") or "/"
+
+    query_pairs = [
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(name)
+    ]
+    query = urlencode(sorted(query_pairs))
+
+    return urlunsplit((scheme, netloc, path, query, ""))
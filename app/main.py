@@ -3,11 +3,17 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.api import endpoints
 from app.api import admin
+from app.api import metrics
 from app.core.config import load_env, get_settings
+from app.core.container import ServiceContainer
 from app.core.logging_config import setup_logging
+from app.core.prometheus import SnapshotStore, run_snapshot_flusher
+from app.core.startup import preload_heavy_modules
+from app.middleware.capture import TrafficCaptureMiddleware, TrafficCaptureWriter
 from app.middleware.rate_limiting import RateLimitMiddleware
 from app.middleware.security import SecurityHeadersMiddleware, RequestLoggingMiddleware
 from app.services.llm_provider import configure_genai
+import asyncio
 import logging
 
 # Load environment and configure services
@@ -15,13 +21,30 @@ load_env()
 settings = get_settings()
 
 # Setup logging
-setup_logging(debug=settings.debug)
+setup_logging(
+    debug=settings.debug,
+    json_logs=settings.log_json,
+    access_log_burst=settings.access_log_burst,
+    access_log_sample_rate=settings.access_log_sample_rate,
+)
 logger = logging.getLogger("app.main")
 
-# Configure AI services
+# Configure AI services; the SDK itself is imported on first use unless eager
 configure_genai(settings)
+if settings.startup_mode == "eager":
+    preload_heavy_modules()
 logger.info("AI services configured successfully")
 
+# Opt-in traffic capture for replay testing
+traffic_capture = None
+if settings.traffic_capture_enabled:
+    traffic_capture = TrafficCaptureWriter(
+        settings.traffic_capture_path,
+        max_bytes=settings.traffic_capture_max_bytes,
+        backup_count=settings.traffic_capture_backup_count,
+    )
+    logger.info(f"Traffic capture enabled: {settings.traffic_capture_path}")
+
 # Create FastAPI app with lifespan
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -30,12 +53,51 @@ async def lifespan(app: FastAPI):
     logger.info(f"Application: {settings.app_name} v{settings.app_version}")
     logger.info(f"Debug mode: {settings.debug}")
     logger.info(f"Redis URL: {settings.redis_url}")
+    
+    # Settings and long-lived services are shared by all requests
+    app.state.container = ServiceContainer(settings)
+    
+    preload_task = None
+    if settings.startup_mode == "background":
+        preload_task = asyncio.create_task(asyncio.to_thread(preload_heavy_modules))
+    
+    metrics_flusher = None
+    if settings.metrics_multiproc_dir:
+        store = SnapshotStore(settings.metrics_multiproc_dir)
+        # Files left by workers of earlier runs would be summed forever
+        await asyncio.to_thread(store.prune)
+        metrics_flusher = asyncio.create_task(
+            run_snapshot_flusher(store, settings.metrics_flush_interval)
+        )
+        logger.info(f"Multiprocess metrics enabled in: {settings.metrics_multiproc_dir}")
+    
+    cache_warmer = None
+    if settings.cache_warm_enabled:
+        cache_warmer = asyncio.create_task(app.state.container.warmer.run())
+        logger.info("Cache warming enabled every %ss", settings.cache_warm_interval)
     logger.info("=== Startup Complete ===")
     
     yield
     
     # Shutdown
     logger.info("=== CAG System Shutting Down ===")
+    if cache_warmer:
+        cache_warmer.cancel()
+        try:
+            await cache_warmer
+        except asyncio.CancelledError:
+            pass
+    if metrics_flusher:
+        metrics_flusher.cancel()
+        try:
+            await metrics_flusher
+        except asyncio.CancelledError:
+            pass
+    if preload_task:
+        await preload_task
+    await app.state.container.aclose()
+    if traffic_capture:
+        traffic_capture.close()
     logger.info("Cleanup completed successfully")
     logger.info("=== Shutdown Complete ===")
 
@@ -55,7 +117,8 @@ app.add_middleware(RequestLoggingMiddleware)
 app.add_middleware(
     RateLimitMiddleware,
     calls_per_minute=30,  # General rate limit
-    expensive_calls_per_minute=5  # Limit for expensive endpoints
+    expensive_calls_per_minute=5,  # Limit for expensive endpoints
+    trusted_proxies=settings.trusted_proxies,
 )
 
 # Add CORS middleware
@@ -67,9 +130,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so captured traffic includes requests rejected by rate limiting
+if traffic_capture:
+    app.add_middleware(TrafficCaptureMiddleware, writer=traffic_capture)
+
 # Include routers
 app.include_router(endpoints.router, tags=["CAG System"])
 app.include_router(admin.router, prefix="/admin", tags=["Administration"])
+app.include_router(metrics.router, tags=["Monitoring"])
 
 logger.info(f"FastAPI application '{settings.app_name}' v{settings.app_version} initialized")
 
@@ -0,0 +1,147 @@
+"""
+Opt-in capture of API traffic for replay-based capacity testing.
+
+Bodies of /crawl, /generate and /cag requests are reduced to the fields the
+endpoints use, sanitized (URL credentials and fragments removed, user ids
+pseudonymized) and appended with their arrival time to a rotating JSONL
+file. Writing happens on a background thread through the same non-blocking
+queue used for logging, so capture never stalls a request.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import xxhash
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+
+from app.core.logging_config import NonBlockingQueueHandler
+
+# Fields kept per captured endpoint; everything else in the body is dropped
+CAPTURED_FIELDS = {
+    "/crawl": ("url", "use_cache"),
+    "/generate": ("prompt", "use_cache"),
+    "/cag": ("url", "query", "user_id", "use_cache", "include_history", "prompt_mode"),
+}
+CAPTURE_QUEUE_SIZE = 10000
+
+
+def _strip_url(url: Any) -> Any:
+    """Remove credentials and the fragment from a URL."""
+    if not isinstance(url, str):
+        return url
+    try:
+        parts = urlsplit(url)
+        netloc = parts.hostname or ""
+        if parts.port:
+            netloc = f"{netloc}:{parts.port}"
+    except ValueError:
+        return url
+    return urlunsplit((parts.scheme, netloc, parts.path, parts.query, ""))
+
+
+def pseudonymize_user_id(user_id: str) -> str:
+    """Stable pseudonym for a user id; keeps one user's turns grouped on replay."""
+    return "u_" + xxhash.xxh64_hexdigest(user_id)
+
+
+def sanitize_body(path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce a request body to the captured fields of its endpoint.
+
+    Args:
+        path: Request path (one of ``CAPTURED_FIELDS``)
+        body: Parsed JSON body
+
+    Returns:
+        Sanitized body safe to store
+    """
+    sanitized = {name: body[name] for name in CAPTURED_FIELDS[path] if name in body}
+    if "url" in sanitized:
+        sanitized["url"] = _strip_url(sanitized["url"])
+    if isinstance(sanitized.get("user_id"), str):
+        sanitized["user_id"] = pseudonymize_user_id(sanitized["user_id"])
+    return sanitized
+
+
+class TrafficCaptureWriter:
+    """
+    Appends capture entries to a size-rotated JSONL file from a writer thread.
+
+    Entries are dropped (and counted) rather than blocking when the writer
+    falls behind.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024, backup_count: int = 5):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf8"
+        )
+        self._file_handler.setFormatter(logging.Formatter("%(message)s"))
+        self._queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=CAPTURE_QUEUE_SIZE))
+        self._listener: Optional[logging.handlers.QueueListener] = logging.handlers.QueueListener(
+            self._queue_handler.queue, self._file_handler
+        )
+        self._listener.start()
+
+    @property
+    def dropped(self) -> int:
+        return self._queue_handler.dropped
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        record = logging.LogRecord("app.capture", logging.INFO, __file__, 0, json.dumps(entry), None, None)
+        self._queue_handler.enqueue(record)
+
+    def close(self) -> None:
+        """Flush pending entries and stop the writer thread."""
+        if self._listener is not None:
+            listener, self._listener = self._listener, None
+            listener.stop()
+            self._file_handler.close()
+
+
+class TrafficCaptureMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware recording sanitized bodies of captured endpoints.
+
+    Each entry holds the arrival time (``ts``, epoch seconds), the path, the
+    sanitized body, the response status and the handling time.
+    """
+
+    def __init__(self, app, writer: TrafficCaptureWriter):
+        super().__init__(app)
+        self.writer = writer
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        path = request.url.path
+        if request.method != "POST" or path not in CAPTURED_FIELDS:
+            return await call_next(request)
+
+        arrived = time.time()
+        start = time.perf_counter()
+        raw_body = await request.body()
+        response = await call_next(request)
+
+        try:
+            body = json.loads(raw_body)
+        except ValueError:
+            body = None
+        if isinstance(body, dict):
+            self.writer.write({
+                "ts": round(arrived, 6),
+                "path": path,
+                "body": sanitize_body(path, body),
+                "status": response.status_code,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+            })
+        return response
@@ -4,10 +4,11 @@ Rate limiting middleware for the CAG System.
 
 import time
 import logging
-from typing import Dict, Tuple
+from typing import Dict, Iterable, Tuple
 from fastapi import Request, HTTPException
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
+from app.core.client_ip import TrustedProxies
 
 logger = logging.getLogger(__name__)
 
@@ -17,10 +18,12 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     Rate limiting middleware to prevent abuse of expensive endpoints.
     """
     
-    def __init__(self, app, calls_per_minute: int = 10, expensive_calls_per_minute: int = 3):
+    def __init__(self, app, calls_per_minute: int = 10, expensive_calls_per_minute: int = 3,
+                 trusted_proxies: Iterable[str] = ("127.0.0.1", "::1")):
         super().__init__(app)
         self.calls_per_minute = calls_per_minute
         self.expensive_calls_per_minute = expensive_calls_per_minute
+        self.trusted_proxies = TrustedProxies(trusted_proxies)
         self.clients: Dict[str, Dict[str, list]] = {}
         
         # Define expensive endpoints that need stricter limits
@@ -30,18 +33,8 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         }
     
     def get_client_ip(self, request: Request) -> str:
-        """Get client IP address from request."""
-        # Check for forwarded headers first (for reverse proxy setups)
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
-        
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip
-        
-        # Fallback to direct client IP
-        return request.client.host if request.client else "unknown"
+        """Get client IP address from request (forwarding headers only from trusted proxies)."""
+        return self.trusted_proxies.client_ip(request)
     
     def is_rate_limited(self, client_ip: str, endpoint: str) -> Tuple[bool, str]:
         """
@@ -82,7 +75,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         endpoint = request.url.path
         
         # Skip rate limiting for health checks and admin endpoints
-        if endpoint.startswith(("/health", "/docs", "/openapi.json")):
+        if endpoint.startswith(("/health", "/docs", "/openapi.json", "/metrics")):
             return await call_next(request)
         
         # Check rate limits
@@ -101,6 +94,6 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         
         # Log expensive endpoint usage
         if endpoint in self.expensive_endpoints:
-            logger.info(f"Expensive endpoint accessed: {endpoint} by {client_ip}")
+            logger.info("Expensive endpoint accessed: %s by %s", endpoint, client_ip)
         
         return await call_next(request)
\ No newline at end of file
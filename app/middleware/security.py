@@ -4,10 +4,13 @@ Security middleware for the CAG System.
 
 import logging
 from fastapi import Request
+from app.core.monitoring import monitor
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
+from starlette.routing import Match
 
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("app.access")
 
 
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
@@ -41,32 +44,48 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
     Middleware to log all requests for monitoring and debugging.
     """
     
+    def __init__(self, app):
+        super().__init__(app)
+        # First path segments of the application's routes seen so far
+        self._labels = set()
+    
     async def dispatch(self, request: Request, call_next) -> Response:
         """Log request details."""
-        start_time = time.time()
-        
-        # Get client info
-        client_ip = request.client.host if request.client else "unknown"
-        user_agent = request.headers.get("user-agent", "unknown")
-        
-        # Log request
-        logger.info(
-            f"Request: {request.method} {request.url.path} "
-            f"from {client_ip} - {user_agent}"
-        )
+        start_time = time.perf_counter()
+        path = request.url.path
         
         # Process request
-        response = await call_next(request)
+        with monitor.track_in_flight("http_requests_in_flight", self._endpoint_label(request)):
+            response = await call_next(request)
         
-        # Log response
-        process_time = time.time() - start_time
-        logger.info(
-            f"Response: {response.status_code} "
-            f"for {request.method} {request.url.path} "
-            f"in {process_time:.3f}s"
-        )
+        # One access line per request; arguments are only formatted if the record is emitted
+        if access_logger.isEnabledFor(logging.INFO):
+            access_logger.info(
+                "%s %s %s %.3fs from %s - %s",
+                request.method,
+                path,
+                response.status_code,
+                time.perf_counter() - start_time,
+                request.client.host if request.client else "unknown",
+                request.headers.get("user-agent", "unknown"),
+            )
         
         return response
+    
+    def _endpoint_label(self, request: Request) -> str:
+        """
+        Reduce a request path to its first segment to keep gauge cardinality bounded.
+        
+        Only segments of the application's own routes become labels; any
+        other path is reported as ``other``.
+        """
+        label = "/" + request.url.path.lstrip("/").split("/", 1)[0]
+        if label in self._labels:
+            return label
+        if any(route.matches(request.scope)[0] is not Match.NONE for route in request.app.router.routes):
+            self._labels.add(label)
+            return label
+        return "other"
 
 
 import time
\ No newline at end of file
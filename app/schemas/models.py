@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Literal, Optional
 
 
 class CrawlRequest(BaseModel):
@@ -21,6 +21,8 @@ class GenerateRequest(BaseModel):
 class GenerateResponse(BaseModel):
     text: str
     cached: bool = False
+    stale: bool = False
+    model: Optional[str] = None
 
 
 class AddChatTurnRequest(BaseModel):
@@ -40,6 +42,10 @@ class CAGRequest(BaseModel):
     user_id: Optional[str] = None
     use_cache: bool = True
     include_history: bool = False
+    # full: whole page; digest: page digest plus the most relevant sections
+    # (built now if missing; full while digests are disabled); auto: digest
+    # when one is stored
+    prompt_mode: Literal["auto", "full", "digest"] = "auto"
 
 
 class CAGResponse(BaseModel):
@@ -49,6 +55,16 @@ class CAGResponse(BaseModel):
     query: str
     crawl_cached: bool = False
     llm_cached: bool = False
+    llm_stale: bool = False
+    # Answered against a provider-side cached context of the page
+    llm_context_cached: bool = False
+    prompt_mode: Optional[str] = None
+    model: Optional[str] = None
     crawl_timestamp: Optional[float] = None
     processing_time: Optional[float] = None
     sources: Optional[Dict[str, Any]] = None
+
+
+class WarmCacheRequest(BaseModel):
+    """URLs to register as hot and pre-crawl."""
+    urls: List[str] = Field(min_length=1, max_length=1000)
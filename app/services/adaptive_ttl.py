@@ -0,0 +1,104 @@
+"""
+Adaptive crawl TTLs learned from how often pages change.
+
+Every crawl stored through ``SimpleCacheService.set_crawled_data`` updates
+the URL's change statistics: the content hash last seen, how long the URL
+has been observed and how many times its content changed in that time. The
+TTL is a fraction (``crawl_ttl_factor``) of the estimated time between
+changes, bounded by ``crawl_ttl_min`` / ``crawl_ttl_max``:
+
+    rate = (changes + 1) / (observed + crawl_ttl_default / factor)
+    ttl  = factor / rate
+
+The prior makes a URL without history get ``crawl_ttl_default``; stable
+pages then drift towards the maximum and volatile ones towards the minimum.
+History older than ``CHANGE_HISTORY_HORIZON`` is scaled down so the estimate
+follows recent behaviour.
+
+Per-domain overrides (``CRAWL_TTL_DOMAIN_OVERRIDES``) can set other bounds or
+a fixed TTL, e.g. ``{"news.example.com": {"min": 60, "max": 900},
+"docs.python.org": {"ttl": 604800}}``; an entry also applies to subdomains.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping
+
+# Observation window of the change statistics
+CHANGE_HISTORY_HORIZON = 30 * 86400
+
+
+def update_change_stats(stats: Mapping[str, Any], page_hash: str, now: float) -> Dict[str, Any]:
+    """
+    Fold a crawl into a URL's change statistics.
+
+    Args:
+        stats: Previous statistics (empty for a URL crawled the first time)
+        page_hash: Content hash of the new crawl
+        now: Crawl time
+
+    Returns:
+        Updated ``hash``, ``seen_at``, ``observed``, ``changes`` and ``crawls``
+    """
+    observed = float(stats.get("observed", 0))
+    changes = float(stats.get("changes", 0))
+    if stats.get("hash"):
+        observed += max(0.0, now - float(stats.get("seen_at", now)))
+        if stats["hash"] != page_hash:
+            changes += 1
+        if observed > CHANGE_HISTORY_HORIZON:
+            changes *= CHANGE_HISTORY_HORIZON / observed
+            observed = CHANGE_HISTORY_HORIZON
+    return {
+        "hash": page_hash,
+        "seen_at": now,
+        "observed": observed,
+        "changes": changes,
+        "crawls": int(stats.get("crawls", 0)) + 1,
+    }
+
+
+@dataclass
+class TTLPolicy:
+    """Crawl TTL bounds, per-domain overrides and the change-rate estimate."""
+    default_ttl: int = 7200
+    min_ttl: int = 300
+    max_ttl: int = 7 * 86400
+    factor: float = 0.5
+    adaptive: bool = True
+    domain_overrides: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    @classmethod
+    def from_settings(cls, settings) -> "TTLPolicy":
+        return cls(
+            default_ttl=getattr(settings, "crawl_ttl_default", 7200),
+            min_ttl=getattr(settings, "crawl_ttl_min", 300),
+            max_ttl=getattr(settings, "crawl_ttl_max", 7 * 86400),
+            factor=getattr(settings, "crawl_ttl_factor", 0.5),
+            adaptive=getattr(settings, "crawl_ttl_adaptive", True),
+            domain_overrides={d.lower(): o for d, o in getattr(settings, "crawl_ttl_domain_overrides", {}).items()},
+        )
+
+    def override_for(self, domain: str) -> Dict[str, int]:
+        """Override of the domain or its closest configured parent domain."""
+        labels = domain.lower().split(".")
+        for i in range(len(labels)):
+            override = self.domain_overrides.get(".".join(labels[i:]))
+            if override is not None:
+                return override
+        return {}
+
+    def ttl_for(self, domain: str, stats: Mapping[str, Any]) -> int:
+        """
+        Crawl TTL for a URL of ``domain`` with the given change statistics.
+        """
+        override = self.override_for(domain)
+        if "ttl" in override:
+            return int(override["ttl"])
+        low = override.get("min", self.min_ttl)
+        high = override.get("max", self.max_ttl)
+        ttl = self.default_ttl
+        if self.adaptive and self.factor > 0:
+            prior = self.default_ttl / self.factor
+            rate = (float(stats.get("changes", 0)) + 1) / (float(stats.get("observed", 0)) + prior)
+            ttl = self.factor / rate
+        return int(min(max(ttl, low), high))
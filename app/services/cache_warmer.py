@@ -0,0 +1,129 @@
+"""
+Cache warming and scheduled refresh of frequently requested URLs.
+
+Every crawl request counts towards its URL in Redis sorted sets (decayed hit
+count and last access, see ``SimpleCacheService.record_access``).
+``CacheWarmer.run`` periodically re-crawls the most requested URLs whose
+cached crawl expires within ``cache_warm_refresh_before`` seconds (or has
+already expired), a few at a time, so popular pages are not crawled on the
+request path. One worker per interval does the refresh (a Redis marker
+that expires after the interval), holding a Redis lock for the cycle so a
+slow cycle never overlaps the next one.
+
+URL lists can also be registered for pre-crawling through
+``POST /admin/cache/warm``.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Set
+
+from app.core.monitoring import monitor, track_stage
+
+logger = logging.getLogger(__name__)
+
+WARM_LOCK = "cache_warm"
+WARM_SCHEDULE = "cache_warm:next"
+
+warm_refreshed_metrics = monitor.counter_handle("cache_warm.refreshed")
+warm_failed_metrics = monitor.counter_handle("cache_warm.failed")
+
+
+class CacheWarmer:
+    """
+    Re-crawls hot URLs before their cached crawl expires.
+
+    Args:
+        settings: Application settings (``cache_warm_*``)
+        cache: Cache service holding crawls and access counts
+        crawler: Crawler used for refreshes
+    """
+
+    def __init__(self, settings, cache, crawler):
+        self.cache = cache
+        self.crawler = crawler
+        self.interval = settings.cache_warm_interval
+        self.top_urls = settings.cache_warm_top_urls
+        self.refresh_before = settings.cache_warm_refresh_before
+        self.idle_after = settings.cache_warm_idle_after
+        self.decay = settings.cache_warm_decay
+        self.max_tracked = settings.cache_warm_max_tracked
+        self._semaphore = asyncio.Semaphore(max(1, settings.cache_warm_concurrency))
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def refresh(self, url: str) -> bool:
+        """Re-crawl one URL into the cache; False if the crawl failed."""
+        async with self._semaphore:
+            try:
+                await self.crawler.crawl_with_metadata(url, use_cache=False, record_access=False)
+            except Exception as e:
+                warm_failed_metrics.increment()
+                logger.warning("Refreshing %s failed: %s", url, e)
+                return False
+        warm_refreshed_metrics.increment()
+        return True
+
+    async def warm(self, urls: Iterable[str]) -> Dict[str, int]:
+        """
+        Re-crawl URLs with bounded concurrency.
+
+        Returns:
+            Counts of ``refreshed`` and ``failed`` URLs
+        """
+        results = await asyncio.gather(*(self.refresh(url) for url in urls))
+        return {"refreshed": sum(results), "failed": len(results) - sum(results)}
+
+    async def due(self) -> List[str]:
+        """Hot URLs, most requested first, whose cached crawl expires soon or is gone."""
+        hot = await self.cache.hot_urls(self.top_urls, since=time.time() - self.idle_after)
+        urls = [url for url, _ in hot]
+        ttls = await self.cache.crawl_ttls(urls) if urls else []
+        return [url for url, ttl in zip(urls, ttls) if ttl < self.refresh_before]
+
+    async def run_once(self) -> Dict[str, int]:
+        """
+        One refresh cycle: age the hit counts and refresh the due URLs.
+
+        Skipped (empty result) while another worker runs a cycle or when a
+        cycle already ran in this interval.
+        """
+        async with self.cache.hold_lock(WARM_LOCK) as held:
+            if not held or await self.cache.acquire_lock(WARM_SCHEDULE, int(self.interval)) is None:
+                return {}
+            with track_stage("cache_warm.cycle"):
+                await self.cache.decay_access(self.decay, self.max_tracked)
+                urls = await self.due()
+                result = await self.warm(urls)
+        if urls:
+            logger.info("Cache warming refreshed %d of %d hot URLs", result["refreshed"], len(urls))
+        return result
+
+    async def run(self) -> None:
+        """Refresh hot URLs every ``interval`` seconds until cancelled."""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.warning("Cache warming cycle failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    async def register(self, urls: List[str]) -> asyncio.Task:
+        """
+        Mark URLs as hot and pre-crawl them in the background.
+
+        Returns:
+            The background pre-crawl task
+        """
+        await self.cache.record_access(*urls)
+        task = asyncio.ensure_future(self.warm(urls))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def aclose(self) -> None:
+        """Cancel pre-crawls still running."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
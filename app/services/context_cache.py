@@ -0,0 +1,256 @@
+"""
+Provider-side context caching of crawled pages.
+
+Large pages are registered once with the LLM provider as a cached context
+(Gemini explicit context caching); later questions about the same content
+send only the question and reference the context by its handle, so the page
+is not uploaded and billed as input on every call.
+
+Handles are keyed by model and content hash and stored in Redis next to the
+crawl entry (``SimpleCacheService.get_context_handle``) until shortly
+before they expire. ``LocalContextCache`` is an offline stand-in used with
+local backends.
+
+Enabled with ``LLM_CONTEXT_CACHE_ENABLED``; pages smaller than
+``LLM_CONTEXT_CACHE_MIN_TOKENS`` are sent inline as before. Any failure
+falls back to the full prompt.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from app.core.monitoring import monitor
+from app.services.llm_router import Backend, estimate_tokens
+from app.services.resilience import LLMUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# Handles this close to expiry are replaced rather than used
+CONTEXT_REFRESH_MARGIN = 60.0
+# Compiled models kept per Gemini context cache (each costs an API lookup to build)
+MODEL_CACHE_SIZE = 32
+
+context_hit_metrics = monitor.counter_handle("context_cache.hit")
+context_create_metrics = monitor.counter_handle("context_cache.create")
+context_fallback_metrics = monitor.counter_handle("context_cache.fallback")
+
+# Context creations in progress, so concurrent requests for a page share one upload
+_inflight: Dict[Tuple[str, str], "asyncio.Task"] = {}
+# Deletions of contexts whose upload finished after the caller gave up
+_orphan_deletions: Set["asyncio.Task"] = set()
+
+
+class ContextNotFoundError(Exception):
+    """The provider no longer knows the cached context (expired or deleted)."""
+
+
+class GeminiContextCache:
+    """Gemini explicit context caching for one model."""
+
+    provider = "gemini"
+
+    def __init__(self, model_name: str, generation_config: Optional[Dict[str, Any]] = None, ttl: int = 3600):
+        self.model_name = model_name
+        self.generation_config = generation_config or {}
+        self.ttl = ttl
+        self._models: Dict[str, Any] = {}
+
+    async def create(self, content: str, display_name: str) -> Dict[str, Any]:
+        """
+        Upload ``content`` as a cached context and return its handle.
+
+        The upload thread cannot be interrupted; if the caller is cancelled
+        (e.g. by its deadline) the context is deleted once the upload
+        finishes, so it is not left behind unused and billed.
+        """
+        from app.services.llm_provider import load_genai
+        genai = load_genai()
+
+        def create():
+            return genai.caching.CachedContent.create(
+                model=self.model_name,
+                display_name=display_name,
+                contents=[content],
+                ttl=timedelta(seconds=self.ttl),
+            )
+        upload = asyncio.ensure_future(asyncio.to_thread(create))
+        try:
+            cached = await asyncio.shield(upload)
+        except asyncio.CancelledError:
+            upload.add_done_callback(_delete_orphan)
+            raise
+        return {"name": cached.name, "model": self.model_name, "expires_at": cached.expire_time.timestamp()}
+
+    async def _model(self, name: str):
+        model = self._models.get(name)
+        if model is None:
+            from app.services.llm_provider import load_genai
+            genai = load_genai()
+            # from_cached_content looks the context up synchronously
+            model = await asyncio.to_thread(
+                genai.GenerativeModel.from_cached_content,
+                name,
+                generation_config=self.generation_config or None,
+            )
+            if len(self._models) >= MODEL_CACHE_SIZE:
+                self._models.pop(next(iter(self._models)))
+            self._models[name] = model
+        return model
+
+    async def generate(self, handle: Dict[str, Any], prompt: str) -> str:
+        try:
+            model = await self._model(handle["name"])
+            response = await model.generate_content_async(prompt)
+        except Exception as e:
+            if getattr(e, "code", None) in (403, 404):
+                self._models.pop(handle["name"], None)
+                raise ContextNotFoundError(handle["name"]) from e
+            raise
+        return response.text
+
+
+def _delete_orphan(upload: "asyncio.Future"):
+    """Delete the context of an upload nobody waited for."""
+    if upload.cancelled() or upload.exception() is not None:
+        return
+    cached = upload.result()
+
+    async def delete():
+        try:
+            await asyncio.to_thread(cached.delete)
+            logger.info("Deleted context %s created after its caller gave up", cached.name)
+        except Exception as e:
+            logger.warning("Failed to delete orphaned context %s: %s", cached.name, e)
+
+    task = asyncio.ensure_future(delete())
+    _orphan_deletions.add(task)
+    task.add_done_callback(_orphan_deletions.discard)
+
+
+class LocalContextCache:
+    """
+    Offline stand-in for provider-side context caching.
+
+    Contents live in this process only; a handle created elsewhere raises
+    ``ContextNotFoundError`` like an expired Gemini context would.
+    """
+
+    provider = "local"
+
+    def __init__(self, model_name: str, ttl: int = 3600, clock: Callable[[], float] = time.time):
+        self.model_name = model_name
+        self.ttl = ttl
+        self._clock = clock
+        self._contents: Dict[str, Tuple[str, float]] = {}
+        self.uploaded_characters = 0
+
+    async def create(self, content: str, display_name: str) -> Dict[str, Any]:
+        name = "cachedContents/local-" + hashlib.sha256(content.encode()).hexdigest()[:16]
+        expires_at = self._clock() + self.ttl
+        self._contents[name] = (content, expires_at)
+        self.uploaded_characters += len(content)
+        return {"name": name, "model": self.model_name, "expires_at": expires_at}
+
+    async def generate(self, handle: Dict[str, Any], prompt: str) -> str:
+        entry = self._contents.get(handle["name"])
+        if entry is None or entry[1] <= self._clock():
+            raise ContextNotFoundError(handle["name"])
+        from app.services.llm_provider import LocalLLMProvider
+        answer = await LocalLLMProvider(self.model_name).generate_content(prompt)
+        return f"{answer} [cached context: {len(entry[0])} characters]"
+
+
+class PageContextCache:
+    """
+    Answers /cag prompts against provider-side cached page contexts.
+
+    Args:
+        cache: Cache service storing the context handles
+        settings: Application settings (``llm_context_cache_*``)
+    """
+
+    def __init__(self, cache, settings):
+        self.cache = cache
+        self.enabled = getattr(settings, "llm_context_cache_enabled", False)
+        self.min_tokens = getattr(settings, "llm_context_cache_min_tokens", 4096)
+
+    def applies(self, backend: Backend, markdown: str) -> bool:
+        """Whether the page is large enough and the backend supports context caching."""
+        return (
+            self.enabled
+            and getattr(backend, "context_cache", None) is not None
+            and estimate_tokens(markdown) >= self.min_tokens
+        )
+
+    async def _create(self, backend: Backend, page_hash: str, markdown: str) -> Dict[str, Any]:
+        context_cache = backend.context_cache
+        # The upload runs under the backend's deadline and breaker but is not a model
+        # call, and is never retried: each attempt creates a billed context
+        handle = await self._call(
+            backend, lambda: context_cache.create(markdown, display_name=f"page-{page_hash[:16]}"),
+            sampled=False, retry=False,
+        )
+        context_create_metrics.increment()
+        logger.info("Created %s context %s for page %.12s", context_cache.provider, handle["name"], page_hash)
+        ttl = int(handle["expires_at"] - time.time() - CONTEXT_REFRESH_MARGIN)
+        if ttl > 0:
+            await self.cache.set_context_handle(page_hash, context_cache.model_name, handle, ttl=ttl)
+        return handle
+
+    async def handle_for(self, backend: Backend, page_hash: str, markdown: str, refresh: bool = False) -> Dict[str, Any]:
+        """Stored handle for the page, creating the context if there is none (or ``refresh``)."""
+        context_cache = backend.context_cache
+        if not refresh:
+            handle = await self.cache.get_context_handle(page_hash, context_cache.model_name)
+            if handle and handle.get("expires_at", 0) - time.time() > CONTEXT_REFRESH_MARGIN:
+                return handle
+        key = (context_cache.model_name, page_hash)
+        task = _inflight.get(key)
+        if task is None:
+            task = _inflight[key] = asyncio.ensure_future(self._create(backend, page_hash, markdown))
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _call(self, backend: Backend, factory: Callable[[], Awaitable[Any]], sampled: bool = True,
+                    retry: bool = True) -> Any:
+        caller = getattr(backend.provider, "caller", None)
+        return await (caller.call(factory, sampled=sampled, retry=retry) if caller is not None else factory())
+
+    async def generate(self, backend: Backend, page_hash: str, markdown: str, prompt: str) -> Optional[str]:
+        """
+        Answer ``prompt`` against the cached context of the page.
+
+        Args:
+            backend: Backend chosen by the router (must have a ``context_cache``)
+            page_hash: Content hash of the page
+            markdown: Page content, uploaded when no context exists yet
+            prompt: Prompt without the page content
+
+        Returns:
+            The answer, or None if the context path failed and the caller
+            should send the full prompt instead
+        """
+        context_cache = backend.context_cache
+        try:
+            handle = await self.handle_for(backend, page_hash, markdown)
+            # Only the model call counts towards the backend's latency, not the upload
+            start = time.perf_counter()
+            try:
+                text = await self._call(backend, lambda: context_cache.generate(handle, prompt))
+            except ContextNotFoundError:
+                handle = await self.handle_for(backend, page_hash, markdown, refresh=True)
+                start = time.perf_counter()
+                text = await self._call(backend, lambda: context_cache.generate(handle, prompt))
+        except Exception as e:
+            if isinstance(e, LLMUnavailableError):
+                backend.stats.record(None, ok=False)
+            context_fallback_metrics.increment()
+            logger.warning("Context cache failed for page %.12s, sending full prompt: %s", page_hash, e)
+            return None
+        backend.stats.record(time.perf_counter() - start, ok=True)
+        context_hit_metrics.increment()
+        return text
@@ -0,0 +1,358 @@
+"""
+Politeness scheduling of crawls.
+
+``CrawlScheduler`` sits in front of ``CrawlerService``'s browser loads:
+
+- at most ``crawl_per_host_concurrency`` crawls of one host run at once,
+  and consecutive crawl starts on a host are ``crawl_per_host_delay``
+  seconds apart (or the host's robots.txt ``Crawl-delay``, up to
+  ``crawl_max_crawl_delay``);
+- ``crawl_max_concurrency`` bounds all crawls, and free slots go to waiting
+  hosts in round-robin order, so one busy origin cannot starve the others;
+- robots.txt rules are fetched once per host and cached for
+  ``crawl_robots_ttl`` seconds; disallowed URLs raise ``CrawlDisallowedError``;
+- hosts that do not resolve fail fast with ``HostResolutionError`` instead
+  of starting a browser load; the check's answers are cached for
+  ``crawl_dns_ttl`` seconds. The browser still resolves the host itself, so
+  this is only a pre-check, not a DNS cache for the crawl.
+"""
+
+import asyncio
+import logging
+import socket
+import time
+import weakref
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+from app.core.monitoring import monitor
+from app.core.validation import URLValidator
+
+logger = logging.getLogger(__name__)
+
+# Hosts whose robots.txt and DNS answers are kept
+HOST_CACHE_SIZE = 10000
+# Failed lookups are retried sooner than successful ones expire
+NEGATIVE_TTL = 60.0
+# Hosts tracked before idle ones are swept (then twice the number still in use)
+HOST_SWEEP_THRESHOLD = 1024
+# Redirects followed when fetching robots.txt, each re-validated like a crawl URL
+MAX_ROBOTS_REDIRECTS = 5
+
+robots_blocked_metrics = monitor.counter_handle("crawl.robots_blocked")
+dns_failed_metrics = monitor.counter_handle("crawl.dns_failed")
+
+# Live schedulers, reported as the crawl_scheduler gauge
+_schedulers: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def _scheduler_stats() -> Dict[str, float]:
+    active = waiting = 0
+    for scheduler in list(_schedulers):
+        active += scheduler.active
+        waiting += scheduler.waiting
+    return {"active": active, "waiting": waiting}
+
+
+monitor.register_gauge_callback("crawl_scheduler", _scheduler_stats)
+
+
+class CrawlDisallowedError(Exception):
+    """The site's robots.txt disallows crawling the URL."""
+
+
+class HostResolutionError(Exception):
+    """The URL's host name does not resolve."""
+
+
+class _TTLCache:
+    """Bounded mapping whose entries expire individually."""
+
+    def __init__(self, clock: Callable[[], float], max_size: int = HOST_CACHE_SIZE):
+        self._clock = clock
+        self._max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self._clock():
+            return None
+        return entry[1]
+
+    def set(self, key: str, value, ttl: float):
+        self._entries.pop(key, None)
+        self._entries[key] = (self._clock() + ttl, value)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+
+class RobotsCache:
+    """
+    robots.txt rules per origin, fetched on first use and cached.
+
+    Missing robots.txt (4xx) allows everything; an unreachable one allows
+    everything too but is retried after ``NEGATIVE_TTL`` seconds.
+    """
+
+    def __init__(self, user_agent: str = "CAGBot", ttl: float = 3600.0, timeout: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.timeout = timeout
+        self._cache = _TTLCache(clock)
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    async def fetch(self, origin: str) -> Tuple[int, str]:
+        """
+        Status code and body of an origin's robots.txt.
+
+        Redirects are followed only to URLs that pass ``URLValidator``, so a
+        site cannot point the fetch at internal addresses.
+
+        Raises:
+            ValueError: A redirect target is not allowed, or there are too many redirects
+        """
+        import httpx
+        url = origin + "/robots.txt"
+        async with httpx.AsyncClient(timeout=self.timeout, follow_redirects=False,
+                                     headers={"User-Agent": self.user_agent}) as client:
+            for _ in range(MAX_ROBOTS_REDIRECTS + 1):
+                response = await client.get(url)
+                if not response.is_redirect:
+                    return response.status_code, response.text
+                url = urljoin(url, response.headers["location"])
+                is_valid, error = URLValidator.validate_url(url)
+                if not is_valid:
+                    raise ValueError(f"robots.txt redirect to {url} rejected: {error}")
+        raise ValueError(f"Too many robots.txt redirects from {origin}")
+
+    async def _load(self, origin: str) -> RobotFileParser:
+        parser = RobotFileParser()
+        ttl = self.ttl
+        try:
+            status, body = await self.fetch(origin)
+        except Exception as e:
+            logger.info("robots.txt of %s unavailable (%s); allowing crawls", origin, e)
+            status, body, ttl = 0, "", NEGATIVE_TTL
+        if 200 <= status < 300:
+            parser.parse(body.splitlines())
+        elif 500 <= status:
+            ttl = NEGATIVE_TTL
+            parser.parse([])
+        else:
+            parser.parse([])
+        self._cache.set(origin, parser, ttl)
+        return parser
+
+    async def rules(self, url: str) -> RobotFileParser:
+        """Parsed robots.txt of the URL's origin."""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        parser = self._cache.get(origin)
+        if parser is not None:
+            return parser
+        task = self._pending.get(origin)
+        if task is None:
+            task = self._pending[origin] = asyncio.ensure_future(self._load(origin))
+            task.add_done_callback(lambda _: self._pending.pop(origin, None))
+        return await asyncio.shield(task)
+
+    async def allowed(self, url: str) -> bool:
+        return (await self.rules(url)).can_fetch(self.user_agent, url)
+
+    async def crawl_delay(self, url: str) -> Optional[float]:
+        delay = (await self.rules(url)).crawl_delay(self.user_agent)
+        return float(delay) if delay is not None else None
+
+
+class DNSCache:
+    """
+    Cached check that host names resolve (``ttl`` seconds, failures ``NEGATIVE_TTL``).
+
+    The addresses are not handed to the crawl; they only decide whether to start it.
+    """
+
+    def __init__(self, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._cache = _TTLCache(clock)
+
+    async def lookup(self, host: str) -> List[str]:
+        """Addresses of ``host`` (empty if it does not resolve)."""
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        except (socket.gaierror, UnicodeError):
+            return []
+        return sorted({info[4][0] for info in infos})
+
+    async def resolve(self, host: str) -> List[str]:
+        """
+        Cached addresses of ``host``.
+
+        Raises:
+            HostResolutionError: The host does not resolve
+        """
+        addresses = self._cache.get(host)
+        if addresses is None:
+            addresses = await self.lookup(host)
+            self._cache.set(host, addresses, self.ttl if addresses else NEGATIVE_TTL)
+        if not addresses:
+            dns_failed_metrics.increment()
+            raise HostResolutionError(f"Host {host} could not be resolved")
+        return addresses
+
+
+class _Host:
+    __slots__ = ("name", "active", "next_start", "delay", "waiters")
+
+    def __init__(self, name: str, delay: float):
+        self.name = name
+        self.active = 0
+        self.next_start = 0.0
+        self.delay = delay
+        self.waiters: Deque[asyncio.Future] = deque()
+
+
+class CrawlScheduler:
+    """
+    Grants crawl slots per host with concurrency limits, delays and fair queuing.
+
+    Args:
+        settings: Application settings (``crawl_*``)
+        robots: robots.txt cache (None to ignore robots.txt)
+        dns: DNS cache (None to skip resolution)
+        clock: Monotonic clock
+    """
+
+    def __init__(self, settings, robots: Optional[RobotsCache] = None, dns: Optional[DNSCache] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_concurrency = max(1, settings.crawl_max_concurrency)
+        self.per_host_concurrency = max(1, settings.crawl_per_host_concurrency)
+        self.per_host_delay = settings.crawl_per_host_delay
+        self.max_crawl_delay = settings.crawl_max_crawl_delay
+        self.robots = robots
+        self.dns = dns
+        self._clock = clock
+        self._hosts: Dict[str, _Host] = {}
+        # Hosts with waiters, in the order they get their next slot
+        self._turns: Deque[_Host] = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._sweep_at = HOST_SWEEP_THRESHOLD
+        self.active = 0
+        _schedulers.add(self)
+
+    @classmethod
+    def from_settings(cls, settings) -> "CrawlScheduler":
+        robots = None
+        if settings.crawl_respect_robots:
+            robots = RobotsCache(settings.crawl_user_agent, settings.crawl_robots_ttl)
+        return cls(settings, robots=robots, dns=DNSCache(settings.crawl_dns_ttl))
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(host.waiters) for host in self._turns)
+
+    def _dispatch(self):
+        """Hand free slots to waiting hosts, one per host per round."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = self._clock()
+        wake_at: Optional[float] = None
+        for _ in range(len(self._turns)):
+            if self.active >= self.max_concurrency:
+                break
+            host = self._turns.popleft()
+            while host.waiters and host.waiters[0].done():
+                host.waiters.popleft()  # cancelled while waiting
+            if not host.waiters:
+                self._forget(host)
+                continue
+            if host.active < self.per_host_concurrency and now >= host.next_start:
+                host.waiters.popleft().set_result(None)
+                host.active += 1
+                self.active += 1
+                host.next_start = now + host.delay
+            elif host.active < self.per_host_concurrency:
+                wake_at = host.next_start if wake_at is None else min(wake_at, host.next_start)
+            if host.waiters:
+                self._turns.append(host)
+        if wake_at is not None and self.active < self.max_concurrency:
+            self._timer = asyncio.get_running_loop().call_later(max(0.0, wake_at - now), self._dispatch)
+
+    def _host(self, name: str) -> _Host:
+        host = self._hosts.get(name)
+        if host is None:
+            if len(self._hosts) >= self._sweep_at:
+                self._sweep()
+            host = self._hosts[name] = _Host(name, self.per_host_delay)
+        return host
+
+    def _forget(self, host: _Host):
+        # Idle hosts past their delay carry no state worth keeping
+        if host.active == 0 and not host.waiters and host.next_start <= self._clock():
+            self._hosts.pop(host.name, None)
+
+    def _sweep(self):
+        """Forget idle hosts whose delay ran out after their last crawl ended."""
+        for host in list(self._hosts.values()):
+            self._forget(host)
+        self._sweep_at = max(HOST_SWEEP_THRESHOLD, 2 * len(self._hosts))
+
+    def _release(self, host: _Host):
+        host.active -= 1
+        self.active -= 1
+        self._forget(host)
+        self._dispatch()
+
+    async def _delay_for(self, url: str, name: str) -> float:
+        """Minimum delay between crawl starts on the host, after the DNS and robots.txt checks."""
+        if self.dns is not None:
+            await self.dns.resolve(name)
+        delay = self.per_host_delay
+        if self.robots is not None:
+            if not await self.robots.allowed(url):
+                robots_blocked_metrics.increment()
+                raise CrawlDisallowedError(f"robots.txt of {name} disallows {url}")
+            crawl_delay = await self.robots.crawl_delay(url)
+            if crawl_delay is not None:
+                delay = max(delay, min(crawl_delay, self.max_crawl_delay))
+        return delay
+
+    @asynccontextmanager
+    async def slot(self, url: str) -> AsyncIterator[None]:
+        """
+        Wait for a crawl slot for ``url`` and hold it for the block.
+
+        Raises:
+            CrawlDisallowedError: robots.txt disallows the URL
+            HostResolutionError: The host does not resolve
+        """
+        name = (urlsplit(url).hostname or "").lower()
+        delay = await self._delay_for(url, name)
+        host = self._host(name)
+        host.delay = delay
+        waiter = asyncio.get_running_loop().create_future()
+        host.waiters.append(waiter)
+        if host not in self._turns:
+            self._turns.append(host)
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the wait was cancelled
+                self._release(host)
+            raise
+        try:
+            yield
+        finally:
+            self._release(host)
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
@@ -1,6 +1,8 @@
-from crawl4ai.async_webcrawler import AsyncWebCrawler
+from contextlib import nullcontext
 from typing import Dict, Any, Optional
 import time
+from app.core.monitoring import monitor
+from common.cache_keys import content_hash
 
 
 class CrawlerService:
@@ -8,9 +10,28 @@ class CrawlerService:
     A service for crawling websites and extracting content with caching support.
     """
 
-    def __init__(self, cache_service=None):
+    def __init__(self, cache_service=None, digester=None, track_access: bool = False, scheduler=None):
+        # crawl4ai is slow to import; load it on first use rather than at startup
+        from crawl4ai.async_webcrawler import AsyncWebCrawler
         self.crawler = AsyncWebCrawler()
         self.cache_service = cache_service
+        # Optional PageDigester summarising long pages after they are crawled
+        self.digester = digester
+        # Count requests per URL for cache warming (see app.services.cache_warmer)
+        self.track_access = track_access
+        # Optional CrawlScheduler enforcing per-host politeness (see app.services.crawl_scheduler)
+        self.scheduler = scheduler
+
+    async def aclose(self):
+        """
+        Shuts down the underlying crawler (and its browser, if one was started).
+        """
+        close = getattr(self.crawler, "close", None)
+        if close is not None:
+            await close()
+
+    def _slot(self, url: str):
+        return self.scheduler.slot(url) if self.scheduler else nullcontext()
 
     async def crawl(self, url: str, use_cache: bool = True) -> str:
         """
@@ -30,7 +51,9 @@ class CrawlerService:
                 return cached_data.get("markdown", "")
         
         # Crawl the website
-        result = await self.crawler.arun(url=url)
+        async with self._slot(url):
+            with monitor.track_in_flight("crawler_active_crawls"):
+                result = await self.crawler.arun(url=url)
         markdown_content = result.markdown
         
         # Cache the result if cache service is available
@@ -45,17 +68,22 @@ class CrawlerService:
         
         return markdown_content
     
-    async def crawl_with_metadata(self, url: str, use_cache: bool = True) -> Dict[str, Any]:
+    async def crawl_with_metadata(self, url: str, use_cache: bool = True, record_access: bool = True) -> Dict[str, Any]:
         """
         Crawls a website and returns detailed metadata along with content.
         
         Args:
             url: The URL to crawl
             use_cache: Whether to use cached data if available
+            record_access: Whether the request counts towards the URL's popularity
+                (off for background refreshes)
             
         Returns:
             Dictionary containing markdown, title, timestamp, and other metadata
         """
+        if record_access and self.track_access and self.cache_service:
+            await self.cache_service.record_access(url)
+        
         # Check cache first if enabled
         if use_cache and self.cache_service:
             cached_data = await self.cache_service.get_crawled_data(url)
@@ -66,11 +94,14 @@ class CrawlerService:
                 return cached_data
         
         # Crawl the website
-        result = await self.crawler.arun(url=url)
+        async with self._slot(url):
+            with monitor.track_in_flight("crawler_active_crawls"):
+                result = await self.crawler.arun(url=url)
         
         crawl_data = {
             "url": url,
             "markdown": result.markdown,
+            "content_hash": content_hash(result.markdown or ""),
             "title": getattr(result, 'title', '') or '',
             "timestamp": time.time(),
             "success": result.success if hasattr(result, 'success') else True,
@@ -80,6 +111,11 @@ class CrawlerService:
         
         # Cache the result if cache service is available
         if self.cache_service:
-            await self.cache_service.set_crawled_data(url, crawl_data)
+            ttl = await self.cache_service.set_crawled_data(url, crawl_data)
+            if ttl:
+                crawl_data["ttl"] = ttl
+        
+        if self.digester:
+            self.digester.schedule(url, crawl_data["content_hash"], crawl_data["markdown"] or "")
         
         return crawl_data
@@ -0,0 +1,239 @@
+"""
+Crawl-time page digests for long pages.
+
+After a page is crawled, ``PageDigester`` splits it into sections at its
+headings, summarises every section with bounded concurrency (map), and
+combines the section summaries into a page summary (reduce, repeated over
+groups of summaries when they do not fit one prompt). The digest is stored
+next to the page's content blob (``SimpleCacheService.get_page_digest``).
+
+``/cag`` can then answer from the digest plus the raw sections most relevant
+to the query (see ``build_digest_prompt``) instead of the whole page, which
+keeps per-query prompts small.
+
+Enabled with ``PAGE_DIGEST_ENABLED``; only pages of at least
+``PAGE_DIGEST_MIN_TOKENS`` estimated tokens are digested.
+"""
+
+import asyncio
+import logging
+import math
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.core.monitoring import monitor, track_stage
+from app.services.llm_router import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+_HEADING = re.compile(r"^#{1,6}\s", re.MULTILINE)
+_WORD = re.compile(r"\w{3,}")
+
+digest_created_metrics = monitor.counter_handle("digest.created")
+digest_failed_metrics = monitor.counter_handle("digest.failed")
+
+MAP_PROMPT = """Summarize the following section of the page {url} in a few sentences. Keep the names, numbers and facts needed to answer questions about it.
+
+{text}"""
+
+REDUCE_PROMPT = """Write a concise summary of the page {url} from these section summaries:
+
+{text}"""
+
+
+def split_sections(markdown: str, max_chars: int) -> List[Dict[str, Any]]:
+    """
+    Split markdown into sections at headings.
+
+    Sections longer than ``max_chars`` are cut at paragraph breaks; adjacent
+    short sections are merged while they fit.
+
+    Returns:
+        Sections as ``{"title", "start", "end"}`` with character offsets into ``markdown``
+    """
+    starts = [m.start() for m in _HEADING.finditer(markdown)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    spans = []
+    for start, end in zip(starts, starts[1:] + [len(markdown)]):
+        while end - start > max_chars:
+            cut = markdown.rfind("\n\n", start + 1, start + max_chars)
+            cut = cut if cut > start else start + max_chars
+            spans.append([start, cut])
+            start = cut
+        if spans and end - spans[-1][0] <= max_chars:
+            spans[-1][1] = end
+        else:
+            spans.append([start, end])
+    sections = []
+    for start, end in spans:
+        text = markdown[start:end]
+        if not text.strip():
+            continue
+        first_line = text.strip().splitlines()[0]
+        title = first_line.lstrip("#").strip() if first_line.startswith("#") else ""
+        sections.append({"title": title, "start": start, "end": end})
+    return sections
+
+
+def _terms(text: str) -> Counter:
+    return Counter(_WORD.findall(text.lower()))
+
+
+def relevant_sections(markdown: str, sections: Sequence[Dict[str, Any]], query: str, limit: int) -> List[Dict[str, Any]]:
+    """
+    The ``limit`` sections sharing the most query terms, in page order.
+
+    Terms are weighted by how few sections contain them and section scores
+    are damped by length, so long sections do not win on size alone.
+    """
+    query_terms = set(_terms(query))
+    if not query_terms or limit <= 0:
+        return []
+    counts = [_terms(markdown[s["start"]:s["end"]] + " " + s.get("summary", "")) for s in sections]
+    document_frequency = {t: sum(1 for c in counts if t in c) for t in query_terms}
+    scores = []
+    for index, count in enumerate(counts):
+        score = sum(
+            math.log(1 + count[t]) * math.log(1 + len(sections) / document_frequency[t])
+            for t in query_terms if count[t]
+        )
+        scores.append((score / math.sqrt(1 + sum(count.values()) / 100), index))
+    chosen = sorted(index for score, index in sorted(scores, reverse=True)[:limit] if score > 0)
+    return [sections[i] for i in chosen]
+
+
+def build_digest_prompt(url: str, markdown: str, digest: Dict[str, Any], query: str, limit: int) -> str:
+    """
+    Prompt body answering ``query`` from a digest and the most relevant raw sections.
+
+    Args:
+        url: URL the content was crawled from
+        markdown: Page content the digest was built from
+        digest: Stored digest (``summary`` and ``sections``)
+        query: User query
+        limit: Number of raw sections to include
+
+    Returns:
+        The prompt, without chat history
+    """
+    outline = "\n".join(
+        f"- {s['title'] or 'Section ' + str(i + 1)}: {s['summary']}" for i, s in enumerate(digest["sections"])
+    )
+    raw = "\n\n".join(markdown[s["start"]:s["end"]].strip()
+                      for s in relevant_sections(markdown, digest["sections"], query, limit))
+    return f"""Summary of the page at {url}:
+{digest['summary']}
+
+Section summaries:
+{outline}
+
+Most relevant sections in full:
+{raw or '(none matched the query)'}
+
+User Query: {query}
+
+Please provide a comprehensive answer based on the content above."""
+
+
+class PageDigester:
+    """
+    Builds page digests in the background with bounded-concurrency LLM calls.
+
+    Args:
+        settings: Application settings (``page_digest_*``)
+        cache: Cache service storing the digests
+        llm: ``LLMRouter`` used for the summaries (routed as endpoint ``digest``)
+    """
+
+    def __init__(self, settings, cache, llm):
+        self.cache = cache
+        self.llm = llm
+        self.enabled = settings.page_digest_enabled
+        self.min_tokens = settings.page_digest_min_tokens
+        self.section_chars = settings.page_digest_section_tokens * 4
+        self.ttl = settings.page_digest_ttl
+        self._semaphore = asyncio.Semaphore(max(1, settings.page_digest_concurrency))
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def applies(self, markdown: str) -> bool:
+        return self.enabled and estimate_tokens(markdown) >= self.min_tokens
+
+    async def _summarize(self, template: str, url: str, text: str) -> str:
+        async with self._semaphore:
+            summary, _ = await self.llm.generate(template.format(url=url, text=text), endpoint="digest")
+        return summary.strip()
+
+    async def _reduce(self, url: str, summaries: List[str]) -> str:
+        # Summarise groups of summaries until they fit one prompt
+        while len(summaries) > 1 and sum(len(s) for s in summaries) > self.section_chars:
+            groups: List[List[str]] = [[]]
+            for summary in summaries:
+                if groups[-1] and sum(len(s) for s in groups[-1]) + len(summary) > self.section_chars:
+                    groups.append([])
+                groups[-1].append(summary)
+            if len(groups) == len(summaries):
+                break
+            summaries = list(await asyncio.gather(
+                *(self._summarize(REDUCE_PROMPT, url, "\n\n".join(group)) for group in groups)
+            ))
+        return await self._summarize(REDUCE_PROMPT, url, "\n\n".join(summaries))
+
+    async def build(self, url: str, markdown: str) -> Dict[str, Any]:
+        """
+        Digest a page.
+
+        Returns:
+            ``{"summary", "sections", "created_at"}``; each section has
+            ``title``, ``start``, ``end`` and ``summary``
+        """
+        with track_stage("digest.build"):
+            sections = split_sections(markdown, self.section_chars)
+            summaries = await asyncio.gather(
+                *(self._summarize(MAP_PROMPT, url, markdown[s["start"]:s["end"]]) for s in sections)
+            )
+            for section, summary in zip(sections, summaries):
+                section["summary"] = summary
+            summary = await self._reduce(url, list(summaries))
+        return {"summary": summary, "sections": sections, "created_at": time.time()}
+
+    async def digest(self, url: str, page_hash: str, markdown: str) -> Dict[str, Any]:
+        """The stored digest of a page, building and storing it first if there is none."""
+        digest = await self.cache.get_page_digest(page_hash)
+        if digest is None:
+            digest = await self.build(url, markdown)
+            await self.cache.set_page_digest(page_hash, digest, self.ttl)
+            digest_created_metrics.increment()
+            logger.info("Digested %s into %d sections", url, len(digest["sections"]))
+        return digest
+
+    async def _run(self, url: str, page_hash: str, markdown: str) -> None:
+        try:
+            await self.digest(url, page_hash, markdown)
+        except Exception as e:
+            digest_failed_metrics.increment()
+            logger.warning("Digest of %s failed: %s", url, e)
+
+    def schedule(self, url: str, page_hash: str, markdown: str) -> Optional[asyncio.Task]:
+        """
+        Digest a page in the background unless it is small or already being digested.
+
+        Returns:
+            The background task, or None if nothing was scheduled
+        """
+        if not self.applies(markdown):
+            return None
+        task = self._tasks.get(page_hash)
+        if task is None:
+            task = self._tasks[page_hash] = asyncio.ensure_future(self._run(url, page_hash, markdown))
+            task.add_done_callback(lambda _: self._tasks.pop(page_hash, None))
+        return task
+
+    async def aclose(self) -> None:
+        """Cancel digests still running."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,15 +1,41 @@
 from redis.asyncio.client import Redis
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import json
+import logging
+
+from app.core.monitoring import monitor
+from app.services.resilience import REDIS_ERRORS, CircuitBreaker, CircuitOpenError, redis_breaker
+
+logger = logging.getLogger(__name__)
+
+# History reads and writes skipped because Redis was unavailable
+history_skipped_metrics = monitor.counter_handle("history.skipped")
 
 
 class HistoryService:
     """
     A service for managing chat history in Redis.
+
+    While Redis is unavailable (the Redis circuit breaker is open, or a call
+    fails) history is skipped: reads return no turns and writes are dropped,
+    so chat requests still get answered.
     """
 
-    def __init__(self, settings):
-        self.redis = Redis.from_url(settings.redis_url, decode_responses=True)
+    def __init__(self, settings, breaker: Optional[CircuitBreaker] = None):
+        timeout = getattr(settings, "redis_socket_timeout", None)
+        self.redis = Redis.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            socket_timeout=timeout,
+            socket_connect_timeout=timeout,
+        )
+        self.breaker = breaker or redis_breaker(settings)
+
+    async def aclose(self):
+        """
+        Closes the Redis connection pool.
+        """
+        await self.redis.aclose()
 
     async def add_turn(self, user_id: str, message: str, role: str):
         """
@@ -17,14 +43,30 @@ class HistoryService:
         """
         history_key = f"history:{user_id}"
         chat_turn = {"message": message, "role": role}
-        await self.redis.rpush(history_key, json.dumps(chat_turn))
+        try:
+            with self.breaker.guard(REDIS_ERRORS):
+                await self.redis.rpush(history_key, json.dumps(chat_turn))
+        except CircuitOpenError:
+            history_skipped_metrics.increment()
+        except REDIS_ERRORS as e:
+            history_skipped_metrics.increment()
+            logger.warning("Skipping history write for %s: %s", user_id, e)
 
     async def get_history(self, user_id: str) -> List[Dict[str, Any]]:
         """
         Gets the chat history for a user.
         """
         history_key = f"history:{user_id}"
-        history_raw = await self.redis.lrange(history_key, 0, -1)
+        try:
+            with self.breaker.guard(REDIS_ERRORS):
+                history_raw = await self.redis.lrange(history_key, 0, -1)
+        except CircuitOpenError:
+            history_skipped_metrics.increment()
+            return []
+        except REDIS_ERRORS as e:
+            history_skipped_metrics.increment()
+            logger.warning("Skipping history read for %s: %s", user_id, e)
+            return []
         history = [json.loads(turn) for turn in history_raw]
         return history
 
@@ -33,4 +75,5 @@ class HistoryService:
         Clears the chat history for a user.
         """
         history_key = f"history:{user_id}"
-        await self.redis.delete(history_key)
+        with self.breaker.guard(REDIS_ERRORS):
+            await self.redis.delete(history_key)
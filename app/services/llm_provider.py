@@ -1,16 +1,39 @@
-import google.generativeai as genai
+import asyncio
+from types import ModuleType
+from typing import Any, Dict, Optional
 from app.core.config import Settings
 
+# google.generativeai takes a large share of startup time; it is imported on
+# first use and configured with the key recorded by configure_genai().
+_genai: Optional[ModuleType] = None
+_api_key: Optional[str] = None
+
 def configure_genai(settings: Settings):
-    genai.configure(api_key=settings.google_api_key)
+    """Record the API key; the SDK is configured when it is first loaded."""
+    global _api_key
+    _api_key = settings.google_api_key
+    if _genai is not None:
+        _genai.configure(api_key=_api_key)
+
+def load_genai() -> ModuleType:
+    """Import and configure ``google.generativeai`` once."""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        if _api_key:
+            genai.configure(api_key=_api_key)
+        _genai = genai
+    return _genai
 
 class LLMProvider:
     """
     A provider for interacting with the Google Generative AI API.
     """
 
-    def __init__(self, model_name: str = "gemini-2.0-flash"):
-        self.model = genai.GenerativeModel(model_name)
+    def __init__(self, model_name: str = "gemini-2.0-flash", generation_config: Optional[Dict[str, Any]] = None):
+        self.model_name = model_name
+        self.generation_config = generation_config or {}
+        self.model = load_genai().GenerativeModel(model_name, generation_config=self.generation_config or None)
 
     async def generate_content(self, prompt: str) -> str:
         """
@@ -18,3 +41,24 @@ class LLMProvider:
         """
         response = await self.model.generate_content_async(prompt)
         return response.text
+
+
+class LocalLLMProvider:
+    """
+    Offline stand-in backend that answers without calling any API.
+
+    The response is derived deterministically from the prompt, so it can be
+    routed to and cached like a real model in tests and local development.
+    """
+
+    def __init__(self, model_name: str = "local-echo", latency: float = 0.0):
+        self.model_name = model_name
+        self.generation_config: Dict[str, Any] = {}
+        self.latency = latency
+
+    async def generate_content(self, prompt: str) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        lines = [line.strip() for line in prompt.splitlines() if line.strip()]
+        question = next((line for line in reversed(lines) if line.startswith("User Query:")), lines[-1] if lines else "")
+        return f"[{self.model_name}] {question[:200]} ({len(prompt)} characters of context)"
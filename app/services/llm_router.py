@@ -0,0 +1,295 @@
+"""
+Routing of LLM calls across several configured backends.
+
+Backends are listed in ``LLM_BACKENDS`` (JSON) in order of preference, e.g.::
+
+    [{"name": "lite", "model": "gemini-2.0-flash-lite", "max_prompt_tokens": 4000},
+     {"name": "flash", "model": "gemini-2.0-flash"},
+     {"name": "local", "provider": "local", "model": "local-echo"}]
+
+A call goes to the first backend that accepts the prompt size and endpoint
+and is not degraded. Each backend keeps an exponentially weighted latency
+and error rate; a backend whose error rate passes ``error_threshold`` or
+whose latency exceeds ``slow_factor`` times the fastest Gemini candidate's
+(or whose circuit breaker is open) is skipped until its record decays:
+the error rate towards zero and the latency towards the fastest
+candidate's. Local stand-ins never set the reference latency. When the
+chosen backend is unavailable the call fails over to the next candidate.
+
+Without ``LLM_BACKENDS`` there is a single Gemini backend for
+``LLM_MODEL_NAME``, which behaves like the plain provider.
+"""
+
+import logging
+import math
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.monitoring import monitor
+from app.services.resilience import LLMUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# Live routers, reported through the llm_backend_* gauges
+_routers: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def _backend_gauge(read: Callable[["Backend"], float]) -> Callable[[], Dict[str, float]]:
+    def collect() -> Dict[str, float]:
+        return {backend.name: read(backend) for router in list(_routers) for backend in router.backends}
+    return collect
+
+
+monitor.register_gauge_callback("llm_backend_latency_seconds", _backend_gauge(lambda b: round(b.stats.latency, 4)))
+monitor.register_gauge_callback("llm_backend_error_rate", _backend_gauge(lambda b: round(b.stats.error_rate(), 4)))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+@dataclass
+class BackendConfig:
+    """
+    One entry of ``LLM_BACKENDS``.
+
+    Attributes:
+        name: Label used in metrics and responses
+        model: Model name sent to the provider and recorded in cache keys
+        provider: ``gemini`` or ``local`` (offline stand-in)
+        max_prompt_tokens: Largest prompt (estimated tokens) routed here
+        endpoints: Endpoints allowed to use the backend (all if omitted)
+        latency: Artificial latency of the local backend, in seconds
+    """
+    name: str
+    model: str
+    provider: str = "gemini"
+    max_prompt_tokens: Optional[int] = None
+    endpoints: Optional[List[str]] = None
+    latency: float = 0.0
+
+    def accepts(self, endpoint: Optional[str], tokens: int) -> bool:
+        if self.max_prompt_tokens is not None and tokens > self.max_prompt_tokens:
+            return False
+        return not self.endpoints or endpoint is None or endpoint in self.endpoints
+
+
+class BackendStats:
+    """
+    Exponentially weighted latency and error rate of one backend.
+
+    Both records fade with a ``decay`` seconds time constant while the
+    backend gets no traffic: the error rate towards zero and the latency
+    towards a prior (see :meth:`latency_estimate`), so a skipped backend is
+    retried eventually and its next samples outweigh the stale ones.
+    """
+
+    def __init__(self, alpha: float = 0.2, decay: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.alpha = alpha
+        self.decay = decay
+        self._clock = clock
+        self.latency = 0.0
+        self.samples = 0
+        self._error_rate = 0.0
+        self._updated_at = clock()
+        self._sampled_at = self._updated_at
+
+    def _weight(self, since: float) -> float:
+        """Weight left to a record last updated at ``since``."""
+        return math.exp(-(self._clock() - since) / self.decay) if self.decay > 0 else 1.0
+
+    def error_rate(self) -> float:
+        return self._error_rate * self._weight(self._updated_at)
+
+    def latency_estimate(self, prior: float) -> float:
+        """Recorded latency, faded towards ``prior`` since the last sample."""
+        if not self.samples:
+            return prior
+        return prior + (self.latency - prior) * self._weight(self._sampled_at)
+
+    def record(self, duration: Optional[float], ok: bool):
+        """Record a call; ``duration`` is omitted for failures."""
+        self._error_rate = (1 - self.alpha) * self.error_rate() + self.alpha * (0.0 if ok else 1.0)
+        self._updated_at = self._clock()
+        if duration is not None:
+            if self.samples == 0:
+                self.latency = duration
+            else:
+                # Older samples count less the longer ago they were taken
+                keep = (1 - self.alpha) * self._weight(self._sampled_at)
+                self.latency = keep * self.latency + (1 - keep) * duration
+            self._sampled_at = self._updated_at
+            self.samples += 1
+
+
+@dataclass
+class Backend:
+    """A configured backend with its provider, context cache and live statistics."""
+    config: BackendConfig
+    provider: Any
+    stats: BackendStats = field(default_factory=BackendStats)
+    # Provider-side context cache (see app.services.context_cache), if supported
+    context_cache: Any = None
+
+    @property
+    def name(self) -> str:
+        return self.config.name
+
+    @property
+    def model_name(self) -> str:
+        return self.config.model
+
+    @property
+    def generation_config(self) -> Dict[str, Any]:
+        config = getattr(self.provider, "generation_config", None)
+        return config if isinstance(config, dict) else {}
+
+    def breaker_open(self) -> bool:
+        caller = getattr(self.provider, "caller", None)
+        breaker = getattr(caller, "breaker", None)
+        return breaker is not None and breaker.state == "open"
+
+
+class LLMRouter:
+    """
+    Chooses a backend per call and fails over between backends.
+
+    Also usable wherever an ``LLMProvider`` is expected: ``generate_content``
+    routes without an endpoint.
+    """
+
+    def __init__(self, backends: Sequence[Backend], error_threshold: float = 0.5, slow_factor: float = 3.0):
+        if not backends:
+            raise ValueError("At least one LLM backend is required")
+        self.backends = list(backends)
+        self.error_threshold = error_threshold
+        self.slow_factor = slow_factor
+        self._routed = {b.name: monitor.counter_handle(f"llm.route.{b.name}") for b in self.backends}
+        self._failovers = monitor.counter_handle("llm.failover")
+        _routers.add(self)
+
+    @classmethod
+    def from_settings(cls, settings) -> "LLMRouter":
+        """Build Gemini and local backends from ``LLM_BACKENDS``."""
+        from app.services.context_cache import GeminiContextCache, LocalContextCache
+        from app.services.llm_provider import LLMProvider, LocalLLMProvider
+        from app.services.resilience import CallPolicy, ResilientCaller, ResilientLLMProvider
+
+        entries = settings.llm_backends or [{"name": settings.llm_model_name, "model": settings.llm_model_name}]
+        policy = CallPolicy.from_settings(settings)
+        backends = []
+        for entry in entries:
+            config = BackendConfig(**entry)
+            ttl = settings.llm_context_cache_ttl
+            if config.provider == "local":
+                provider = LocalLLMProvider(config.model, config.latency)
+                context_cache = LocalContextCache(config.model, ttl)
+            elif config.provider == "gemini":
+                provider = LLMProvider(config.model, settings.llm_generation_config())
+                context_cache = GeminiContextCache(config.model, settings.llm_generation_config(), ttl)
+            else:
+                raise ValueError(f"Unknown LLM provider {config.provider!r} for backend {config.name}")
+            backends.append(Backend(config, ResilientLLMProvider(
+                provider, ResilientCaller(policy, name=f"llm.{config.name}")
+            ), context_cache=context_cache))
+        return cls(backends, settings.llm_route_error_threshold, settings.llm_route_slow_factor)
+
+    @classmethod
+    def single(cls, provider: Any, model_name: str) -> "LLMRouter":
+        """Router with one backend wrapping an existing provider."""
+        return cls([Backend(BackendConfig(name=model_name, model=model_name), provider)])
+
+    @property
+    def model_name(self) -> str:
+        """Model of the preferred backend."""
+        return self.backends[0].model_name
+
+    def degraded(self, backend: Backend, reference_latency: float) -> bool:
+        if backend.breaker_open() or backend.stats.error_rate() > self.error_threshold:
+            return True
+        return bool(reference_latency) and backend.stats.samples > 0 and \
+            backend.stats.latency_estimate(reference_latency) > self.slow_factor * reference_latency
+
+    def candidates(self, prompt: str, endpoint: Optional[str] = None) -> List[Backend]:
+        """
+        Backends for a prompt in the order they should be tried.
+
+        Healthy backends accepting the prompt come first, in configured
+        order; degraded ones follow, best score first. If no backend accepts
+        the prompt size, all backends are candidates, largest limit first.
+        """
+        tokens = estimate_tokens(prompt)
+        eligible = [b for b in self.backends if b.config.accepts(endpoint, tokens)]
+        if not eligible:
+            eligible = sorted(self.backends, key=lambda b: -(b.config.max_prompt_tokens or math.inf))
+        # Local stand-ins answer instantly and would make every real model look slow
+        measured = [b.stats.latency for b in eligible if b.stats.samples and b.config.provider != "local"]
+        reference = min(measured) if measured else 0.0
+        healthy = [b for b in eligible if not self.degraded(b, reference)]
+        degraded = sorted(
+            (b for b in eligible if b not in healthy),
+            key=lambda b: (b.breaker_open(), b.stats.error_rate(), b.stats.latency),
+        )
+        return healthy + degraded
+
+    def select(self, prompt: str, endpoint: Optional[str] = None) -> Backend:
+        """The backend a call for this prompt would use first."""
+        return self.candidates(prompt, endpoint)[0]
+
+    async def generate(self, prompt: str, endpoint: Optional[str] = None,
+                       backend: Optional[Backend] = None) -> Tuple[str, Backend]:
+        """
+        Generate with the selected backend, failing over to the next candidates.
+
+        Args:
+            prompt: Prompt to send
+            endpoint: Endpoint name used by routing rules
+            backend: Backend to try first (normally from :meth:`select`)
+
+        Returns:
+            The response text and the backend that produced it
+
+        Raises:
+            LLMUnavailableError: Every candidate was unavailable
+        """
+        candidates = self.candidates(prompt, endpoint)
+        if backend is not None:
+            candidates = [backend] + [b for b in candidates if b is not backend]
+        error: Optional[LLMUnavailableError] = None
+        for index, candidate in enumerate(candidates):
+            if index:
+                self._failovers.increment()
+                logger.warning("Failing over from %s to %s: %s", candidates[index - 1].name, candidate.name, error)
+            self._routed[candidate.name].increment()
+            start = time.perf_counter()
+            try:
+                text = await candidate.provider.generate_content(prompt)
+            except LLMUnavailableError as e:
+                candidate.stats.record(None, ok=False)
+                error = e
+                continue
+            candidate.stats.record(time.perf_counter() - start, ok=True)
+            return text, candidate
+        raise error
+
+    async def generate_content(self, prompt: str) -> str:
+        text, _ = await self.generate(prompt)
+        return text
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Per-backend configuration and live statistics."""
+        return [
+            {
+                "name": b.name,
+                "model": b.model_name,
+                "provider": b.config.provider,
+                "latency": round(b.stats.latency, 4),
+                "error_rate": round(b.stats.error_rate(), 4),
+                "samples": b.stats.samples,
+                "breaker_open": b.breaker_open(),
+            }
+            for b in self.backends
+        ]
@@ -3,21 +3,65 @@ Redis Server Integration Service
 Provides integration with the separate Redis server for advanced caching operations.
 """
 
-import asyncio
+import importlib.util
+import logging
 import httpx
 from typing import Optional, Dict, Any
 from app.core.config import Settings
 
+logger = logging.getLogger(__name__)
+
 
 class RedisServerClient:
     """
     Client for communicating with the separate Redis server.
+    
+    A single pooled ``httpx.AsyncClient`` is kept for the lifetime of the
+    instance so calls reuse keep-alive connections. Close it with ``aclose()``
+    or use the instance as an async context manager.
     """
     
     def __init__(self, settings: Settings):
         self.settings = settings
         self.base_url = settings.redis_server_url or "http://localhost:8001"
         self.enabled = settings.redis_server_enabled
+        self.timeout = httpx.Timeout(
+            settings.redis_server_timeout, connect=settings.redis_server_connect_timeout
+        )
+        self.limits = httpx.Limits(
+            max_connections=settings.redis_server_max_connections,
+            max_keepalive_connections=settings.redis_server_max_keepalive_connections,
+            keepalive_expiry=settings.redis_server_keepalive_expiry,
+        )
+        # HTTP/2 needs the optional 'h2' package (httpx[http2])
+        self.http2 = settings.redis_server_http2 and importlib.util.find_spec("h2") is not None
+        if settings.redis_server_http2 and not self.http2:
+            logger.warning("HTTP/2 requested for Redis server client but 'h2' is not installed; using HTTP/1.1")
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared pooled client, created on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+            )
+        return self._client
+    
+    async def aclose(self) -> None:
+        """Close the pooled client and its connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def __aenter__(self) -> "RedisServerClient":
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
         
     async def health_check(self) -> Dict[str, Any]:
         """Check the health of the Redis server."""
@@ -25,9 +69,8 @@ class RedisServerClient:
             return {"status": "disabled", "message": "Redis server integration disabled"}
             
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.base_url}/health/status")
-                return response.json()
+            response = await self.client.get("/health/status", timeout=5.0)
+            return response.json()
         except Exception as e:
             return {"status": "error", "message": f"Redis server unreachable: {e}"}
     
@@ -37,9 +80,8 @@ class RedisServerClient:
             return {}
             
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.base_url}/cache/stats")
-                return response.json()
+            response = await self.client.get("/cache/stats", timeout=5.0)
+            return response.json()
         except Exception:
             return {}
     
@@ -49,9 +91,8 @@ class RedisServerClient:
             return {}
             
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.base_url}/history/stats")
-                return response.json()
+            response = await self.client.get("/history/stats", timeout=5.0)
+            return response.json()
         except Exception:
             return {}
     
@@ -61,10 +102,9 @@ class RedisServerClient:
             return {"status": "disabled"}
             
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                params = {"pattern": pattern} if pattern else {}
-                response = await client.delete(f"{self.base_url}/cache/clear", params=params)
-                return response.json()
+            params = {"pattern": pattern} if pattern else {}
+            response = await self.client.delete("/cache/clear", params=params, timeout=10.0)
+            return response.json()
         except Exception as e:
             return {"status": "error", "message": str(e)}
     
@@ -74,8 +114,7 @@ class RedisServerClient:
             return {"status": "disabled"}
             
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(f"{self.base_url}/admin/backup")
-                return response.json()
+            response = await self.client.post("/admin/backup", timeout=30.0)
+            return response.json()
         except Exception as e:
-            return {"status": "error", "message": str(e)}
\ No newline at end of file
+            return {"status": "error", "message": str(e)}
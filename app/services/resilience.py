@@ -0,0 +1,314 @@
+"""
+Resilient calls to the LLM upstream.
+
+``ResilientCaller`` runs a call with a per-attempt deadline, retries
+retryable failures (timeouts, 408/429/5xx) with jittered exponential
+backoff, optionally hedges a slow attempt with a second request once it has
+run longer than the observed p95 latency, and guards the upstream with a
+``CircuitBreaker`` that fails fast while it is unhealthy. ``CallPolicy`` and
+``is_retryable`` come from ``common.retry`` (shared with the agent).
+
+When the upstream cannot answer, ``LLMUnavailableError`` is raised; the API
+then serves a stale cached answer if one is kept (see ``llm_stale_ttl``) or
+responds with 503.
+"""
+
+import asyncio
+import logging
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple, Type, TypeVar
+
+from redis import exceptions as redis_exceptions
+
+from app.core.monitoring import LatencyHistogram, monitor
+from common.retry import RETRYABLE_STATUS_CODES, CallPolicy, is_retryable  # noqa: F401 (re-exported)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Latency samples needed before hedging uses the observed percentile
+HEDGE_MIN_SAMPLES = 20
+# Samples per latency window; the percentile tracks recent behaviour
+HEDGE_WINDOW = 1000
+
+BREAKER_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+# Errors meaning Redis is unreachable or too slow (as opposed to a bad command)
+REDIS_ERRORS: Tuple[Type[BaseException], ...] = (
+    redis_exceptions.ConnectionError,
+    redis_exceptions.TimeoutError,
+    asyncio.TimeoutError,
+    OSError,
+)
+
+# Live breakers, reported as the circuit_breaker_state gauge
+_breakers: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def _breaker_states() -> Dict[str, float]:
+    # Breakers sharing a name (e.g. services built outside the container) report the worst state
+    states: Dict[str, float] = {}
+    for breaker in list(_breakers):
+        states[breaker.name] = max(states.get(breaker.name, 0), BREAKER_STATE_VALUES[breaker.state])
+    return states
+
+
+monitor.register_gauge_callback("circuit_breaker_state", _breaker_states)
+
+
+class CircuitOpenError(Exception):
+    """A circuit breaker is open; the call was not attempted."""
+
+
+class LLMUnavailableError(Exception):
+    """The LLM upstream could not produce an answer (timeouts, overload, outage)."""
+
+
+class LLMCircuitOpenError(CircuitOpenError, LLMUnavailableError):
+    """The LLM circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failed calls in a row the breaker opens and
+    rejects calls for ``reset_timeout`` seconds. It then lets a single probe
+    through (half-open): success closes it, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        _breakers.add(self)
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        """Whether a call may go out now; claims the probe slot when half-open."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        if self._opened_at is not None:
+            logger.info("Circuit breaker %s closed", self.name)
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self._probe_in_flight or (self._opened_at is None and self._failures >= self.failure_threshold):
+            logger.warning("Circuit breaker %s opened after %d failures", self.name, self._failures)
+            self._opened_at = self._clock()
+        self._probe_in_flight = False
+
+    def release_probe(self):
+        """Give up a claimed probe without a result (e.g. the call was cancelled)."""
+        self._probe_in_flight = False
+
+    @contextmanager
+    def guard(self, failures: Tuple[Type[BaseException], ...] = (Exception,)) -> Iterator[None]:
+        """
+        Run a block under the breaker.
+
+        Raises ``CircuitOpenError`` instead of entering the block while the
+        breaker is open. Exceptions of the ``failures`` types count as
+        failures; the block completing (or failing otherwise) counts as a
+        success.
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name} circuit breaker is open")
+        try:
+            yield
+        except failures:
+            self.record_failure()
+            raise
+        except Exception:
+            self.record_success()
+            raise
+        except BaseException:
+            self.release_probe()
+            raise
+        self.record_success()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """State for health reporting."""
+        state = self.state
+        return {
+            "state": state,
+            "consecutive_failures": self._failures,
+            "open_for": round(self._clock() - self._opened_at, 3) if self._opened_at is not None else 0.0,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout,
+        }
+
+
+def redis_breaker(settings) -> CircuitBreaker:
+    """Circuit breaker guarding Redis access, configured from settings."""
+    return CircuitBreaker(
+        "redis",
+        failure_threshold=getattr(settings, "redis_breaker_failure_threshold", 3),
+        reset_timeout=getattr(settings, "redis_breaker_reset_timeout", 10.0),
+    )
+
+
+class ResilientCaller:
+    """
+    Runs upstream calls under a ``CallPolicy`` and a ``CircuitBreaker``.
+
+    Calls are given as factories returning a fresh awaitable, since a retry or
+    hedge needs to start the request again.
+    """
+
+    def __init__(self, policy: CallPolicy, name: str = "llm", breaker: Optional[CircuitBreaker] = None):
+        self.policy = policy
+        self.name = name
+        self.breaker = breaker or CircuitBreaker(
+            name, policy.breaker_failure_threshold, policy.breaker_reset_timeout
+        )
+        self._latency = LatencyHistogram()
+        self._previous_latency: Optional[LatencyHistogram] = None
+        self._latency_metrics = monitor.stage_handle(f"{name}.call")
+        self._timeouts = monitor.counter_handle(f"{name}.timeout")
+        self._retries = monitor.counter_handle(f"{name}.retry")
+        self._hedges = monitor.counter_handle(f"{name}.hedge")
+        self._hedge_wins = monitor.counter_handle(f"{name}.hedge_win")
+        self._rejected = monitor.counter_handle(f"{name}.circuit_open")
+        self._failures = monitor.counter_handle(f"{name}.failure")
+
+    def hedge_delay(self) -> float:
+        """How long an attempt may run before a hedge is sent."""
+        histogram = self._latency
+        if histogram.count < HEDGE_MIN_SAMPLES and self._previous_latency is not None:
+            histogram = self._previous_latency
+        if histogram.count < HEDGE_MIN_SAMPLES:
+            return self.policy.hedge_min_delay
+        return max(self.policy.hedge_min_delay, histogram.percentile(self.policy.hedge_percentile))
+
+    def _record_latency(self, duration: float):
+        if self._latency.count >= HEDGE_WINDOW:
+            self._previous_latency, self._latency = self._latency, LatencyHistogram()
+        self._latency.record(duration)
+        self._latency_metrics.record(duration)
+
+    async def _attempt(self, factory: Callable[[], Awaitable[T]], sampled: bool = True) -> T:
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(factory(), timeout=self.policy.timeout)
+        except asyncio.TimeoutError:
+            self._timeouts.increment()
+            raise
+        if sampled:
+            self._record_latency(time.perf_counter() - start)
+        return result
+
+    async def _hedged(self, factory: Callable[[], Awaitable[T]]) -> T:
+        """One attempt, raced against a second one if it runs past the hedge delay."""
+        if not self.policy.hedge_enabled:
+            return await self._attempt(factory)
+        primary = asyncio.ensure_future(self._attempt(factory))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_delay())
+            if done:
+                return primary.result()
+            self._hedges.increment()
+            hedge = asyncio.ensure_future(self._attempt(factory))
+            pending.add(hedge)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._hedge_wins.increment()
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, factory: Callable[[], Awaitable[T]], sampled: bool = True, retry: bool = True) -> T:
+        """
+        Run ``factory()`` with deadlines, retries, hedging and the breaker.
+
+        Unsampled calls (e.g. uploads that are not model calls) are neither
+        hedged nor counted in the latency behind the hedge delay. Calls with
+        ``retry=False`` (e.g. uploads that create billed resources) get a
+        single attempt.
+
+        Raises:
+            LLMCircuitOpenError: The breaker is open
+            LLMUnavailableError: Retryable failures exhausted the retry budget
+            Exception: Non-retryable errors from the call, unchanged
+        """
+        if not self.breaker.allow_request():
+            self._rejected.increment()
+            raise LLMCircuitOpenError(f"{self.name} circuit breaker is open")
+        attempt = 0
+        while True:
+            try:
+                result = await (self._hedged(factory) if sampled else self._attempt(factory, sampled=False))
+            except asyncio.CancelledError:
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # The upstream answered; the request itself was bad
+                    self.breaker.record_success()
+                    raise
+                if not retry or attempt >= self.policy.max_retries:
+                    self._failures.increment()
+                    self.breaker.record_failure()
+                    raise LLMUnavailableError(
+                        f"{self.name} failed after {attempt + 1} attempts: {e!r}"
+                    ) from e
+                delay = self.policy.backoff(attempt)
+                attempt += 1
+                self._retries.increment()
+                logger.warning("%s call failed (%r); retry %d in %.2fs", self.name, e, attempt, delay)
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+
+class ResilientLLMProvider:
+    """
+    ``LLMProvider`` wrapper routing ``generate_content`` through a ``ResilientCaller``.
+
+    Other attributes (``model_name``, ``generation_config``, ...) are read from
+    the wrapped provider.
+    """
+
+    def __init__(self, provider: Any, caller: ResilientCaller):
+        self.provider = provider
+        self.caller = caller
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.provider, name)
+
+    async def generate_content(self, prompt: str) -> str:
+        return await self.caller.call(lambda: self.provider.generate_content(prompt))
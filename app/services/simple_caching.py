@@ -3,11 +3,111 @@ import time
 import logging
 import json
 import hashlib
-from typing import Optional, Dict, Any
+import uuid
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, AsyncIterator, Callable, Iterable, List, Tuple
+from urllib.parse import urlparse
 import redis.asyncio as redis
+from redis.exceptions import WatchError
+from app.core.monitoring import monitor
+from app.core.urls import canonicalize_url
+from app.services.adaptive_ttl import TTLPolicy, update_change_stats
+from common.cache_keys import content_hash
+from app.services.resilience import REDIS_ERRORS, CircuitBreaker, CircuitOpenError, redis_breaker
 
 logger = logging.getLogger(__name__)
 
+# Connection pools of live cache services, reported as Redis pool gauges.
+_connection_pools: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def _redis_pool_stats() -> Dict[str, float]:
+    """Aggregate connection counts over all live Redis connection pools."""
+    in_use = idle = 0
+    for pool in list(_connection_pools):
+        in_use += len(getattr(pool, "_in_use_connections", ()))
+        idle += len(getattr(pool, "_available_connections", ()))
+    return {"in_use": in_use, "idle": idle}
+
+
+monitor.register_gauge_callback("redis_pool_connections", _redis_pool_stats)
+# Redis operations skipped because the Redis circuit breaker was open
+redis_skipped_metrics = monitor.counter_handle("redis.skipped")
+
+# Secondary indexes used for cascading invalidation
+DOMAIN_INDEX_PREFIX = "idx:domain:"   # domain -> set of crawled URLs
+DEPENDENTS_INDEX_PREFIX = "idx:deps:"  # crawl key -> set of derived LLM keys
+BLOB_PREFIX = "blob:"                  # content hash -> page markdown
+BLOB_REFS_SUFFIX = ":refs"             # blob key + suffix -> set of crawl keys using it
+CONTEXT_SUFFIX = ":ctx:"               # blob key + suffix + model -> provider context handle
+DIGEST_SUFFIX = ":digest"              # blob key + suffix -> page digest (see app.services.digest)
+INVALIDATION_BATCH_SIZE = 500
+
+# Access tracking for cache warming (see app.services.cache_warmer)
+ACCESS_HITS_KEY = "access:hits"        # sorted set: canonical URL -> decayed hit count
+ACCESS_LAST_KEY = "access:last"        # sorted set: canonical URL -> last access time
+LOCK_PREFIX = "lock:"
+LOCK_LEASE = 30                        # seconds a held lock lives without renewal
+UNIQUE_USERS_PREFIX = "hll:users:"     # canonical URL -> HyperLogLog of requesting users
+CHANGE_STATS_PREFIX = "chg:"           # crawl key -> change statistics (see app.services.adaptive_ttl)
+CHANGE_STATS_TTL = 60 * 86400
+
+
+def _url_domain(url: str) -> str:
+    """Lower-cased hostname of a URL ('' if it has none)."""
+    return (urlparse(url).hostname or "").lower()
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU of recent cache entries.
+    
+    Only read while Redis is unavailable, so entries may lag behind other
+    workers' writes; the total size is bounded by ``max_bytes`` (as reported
+    by callers, roughly the length of the stored text).
+    """
+    
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, default_ttl: float = 600.0):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+    
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self.pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, size: int = 0) -> None:
+        if size > self.max_bytes:
+            return
+        self.pop(key)
+        self._entries[key] = (time.monotonic() + (self.default_ttl if ttl is None else ttl), size, value)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted, _) = self._entries.popitem(last=False)
+            self.size -= evicted
+    
+    def pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+    
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
 
 class SimpleCacheService:
     """
@@ -15,51 +115,118 @@ class SimpleCacheService:
     Works with standard Redis installation.
     """
     
-    def __init__(self, settings):
+    def __init__(self, settings, breaker: Optional[CircuitBreaker] = None):
         self.settings = settings
         self.redis_client = None
+        # Index sets outlive the entries they point to; stale members are harmless
+        self.index_ttl = getattr(settings, "cache_index_ttl", 86400)
+        self.merge_url_schemes = getattr(settings, "cache_merge_url_schemes", True)
+        # Expired LLM answers are kept this much longer as a fallback for outages
+        self.llm_stale_ttl = getattr(settings, "llm_stale_ttl", 0)
+        # Unique-user counts of a URL are kept this long after its last request
+        self.unique_users_ttl = getattr(settings, "unique_users_ttl", 7 * 86400)
+        # Crawl TTLs adapt to how often each URL's content changes
+        self.ttl_policy = TTLPolicy.from_settings(settings)
+        # Shared with the other Redis-backed services when built by the container
+        self.breaker = breaker or redis_breaker(settings)
+        # Served while the breaker is open or Redis fails
+        self.local = LocalCache(getattr(settings, "cache_local_max_bytes", 64 * 1024 * 1024))
         self._initialize_redis()
     
     def _initialize_redis(self):
         """Initialize Redis client."""
         try:
+            timeout = getattr(self.settings, "redis_socket_timeout", None)
             self.redis_client = redis.from_url(
                 self.settings.redis_url,
-                decode_responses=True
+                decode_responses=True,
+                socket_timeout=timeout,
+                socket_connect_timeout=timeout,
             )
+            _connection_pools.add(self.redis_client.connection_pool)
             logger.info("Redis client initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Redis client: {e}")
             raise
     
+    async def aclose(self) -> None:
+        """Close the Redis connection pool."""
+        if self.redis_client is not None:
+            await self.redis_client.aclose()
+    
     def _hash_key(self, key: str, prefix: str = "") -> str:
         """Create a hash for the key."""
         full_key = f"{prefix}:{key}" if prefix else key
         return hashlib.md5(full_key.encode()).hexdigest()
     
-    async def get_llm_response(self, prompt: str) -> Optional[str]:
+    def canonical_url(self, url: str) -> str:
+        """Canonical form of a URL used for crawl cache keys and indexes."""
+        return canonicalize_url(url, merge_schemes=self.merge_url_schemes)
+    
+    def _crawl_key(self, url: str) -> str:
+        return self._hash_key(self.canonical_url(url), "crawl")
+    
+    async def _read_llm_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """Read an LLM entry from Redis, or from the local fallback while Redis is unavailable."""
+        try:
+            with self.breaker.guard(REDIS_ERRORS):
+                result = await self.redis_client.get(key)
+        except CircuitOpenError:
+            redis_skipped_metrics.increment()
+            return self.local.get(key)
+        except REDIS_ERRORS:
+            return self.local.get(key)
+        if not result:
+            return None
+        data = json.loads(result)
+        self.local.set(key, data, size=len(result))
+        return data
+    
+    async def get_llm_response(self, prompt: str, cache_key: Optional[str] = None) -> Optional[str]:
         """
         Get cached LLM response for a given prompt.
         
         Args:
             prompt: The input prompt to check cache for
+            cache_key: Precomputed cache key (see ``common.cache_keys``);
+                when given the prompt is not hashed
             
         Returns:
-            Cached response if found, None otherwise
+            Cached response if found and not expired, None otherwise
         """
         try:
-            key = self._hash_key(prompt, "llm")
-            result = await self.redis_client.get(key)
-            if result:
-                data = json.loads(result)
-                logger.info(f"LLM cache hit for prompt hash: {key[:8]}...")
+            key = cache_key or self._hash_key(prompt, "llm")
+            data = await self._read_llm_entry(key)
+            if data and data.get("expires_at", float("inf")) > time.time():
+                logger.info("LLM cache hit for prompt hash: %.8s...", key)
                 return data.get("response")
             return None
         except Exception as e:
             logger.error(f"Failed to get LLM response from cache: {e}")
             return None
     
-    async def set_llm_response(self, prompt: str, response: str, ttl: int = 3600) -> None:
+    async def get_stale_llm_response(self, prompt: str, cache_key: Optional[str] = None) -> Optional[str]:
+        """
+        Get a cached LLM response even if it has expired.
+        
+        Used when the LLM upstream is unavailable; entries are kept for
+        ``llm_stale_ttl`` seconds after they expire.
+        """
+        try:
+            data = await self._read_llm_entry(cache_key or self._hash_key(prompt, "llm"))
+            return data.get("response") if data else None
+        except Exception as e:
+            logger.error(f"Failed to get stale LLM response from cache: {e}")
+            return None
+    
+    async def set_llm_response(
+        self,
+        prompt: str,
+        response: str,
+        ttl: int = 3600,
+        source_url: Optional[str] = None,
+        cache_key: Optional[str] = None,
+    ) -> None:
         """
         Cache an LLM response for a given prompt.
         
@@ -67,16 +234,31 @@ class SimpleCacheService:
             prompt: The input prompt
             response: The LLM response to cache
             ttl: Time to live in seconds (default: 1 hour)
+            source_url: URL whose crawled content the prompt was built from; the
+                response is then invalidated together with that URL
+            cache_key: Precomputed cache key, used instead of hashing the prompt
         """
         try:
-            key = self._hash_key(prompt, "llm")
+            key = cache_key or self._hash_key(prompt, "llm")
+            now = time.time()
+            # The prompt embeds the crawled page, which is already stored once as a blob
             data = {
-                "prompt": prompt,
                 "response": response,
-                "timestamp": time.time()
+                "timestamp": now,
+                "expires_at": now + ttl,
             }
-            await self.redis_client.setex(key, ttl, json.dumps(data))
-            logger.info(f"LLM response cached with key: {key[:8]}...")
+            self.local.set(key, data, ttl + self.llm_stale_ttl, len(response))
+            with self.breaker.guard(REDIS_ERRORS):
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.setex(key, ttl + self.llm_stale_ttl, json.dumps(data))
+                if source_url:
+                    deps_key = DEPENDENTS_INDEX_PREFIX + self._crawl_key(source_url)
+                    pipe.sadd(deps_key, key)
+                    pipe.expire(deps_key, self.index_ttl)
+                await pipe.execute()
+            logger.info("LLM response cached with key: %.8s...", key)
+        except CircuitOpenError:
+            redis_skipped_metrics.increment()
         except Exception as e:
             logger.error(f"Failed to set LLM response in cache: {e}")
     
@@ -85,46 +267,556 @@ class SimpleCacheService:
         Get cached crawled data for a given URL.
         
         Args:
-            url: The URL to check cache for
+            url: The URL to check cache for (any spelling of the canonical URL)
             
         Returns:
             Cached crawled data if found, None otherwise
         """
+        key = self._crawl_key(url)
         try:
-            key = self._hash_key(url, "crawl")
-            result = await self.redis_client.get(key)
-            if result:
-                data = json.loads(result)
-                logger.info(f"Crawl cache hit for URL: {url}")
-                return data
-            return None
+            with self.breaker.guard(REDIS_ERRORS):
+                result = await self.redis_client.get(key)
+                if result:
+                    data = json.loads(result)
+                    if data.get("markdown") is None and data.get("content_hash"):
+                        markdown = await self.redis_client.get(BLOB_PREFIX + data["content_hash"])
+                        if markdown is None:
+                            # Blob expired or was released; treat as a miss
+                            return None
+                        data["markdown"] = markdown
+                    self.local.set(key, data, size=len(data.get("markdown") or ""))
+                    logger.info("Crawl cache hit for URL: %s", url)
+                    return data
+                return None
+        except CircuitOpenError:
+            redis_skipped_metrics.increment()
+            return self.local.get(key)
         except Exception as e:
             logger.error(f"Failed to get crawled data from cache: {e}")
-            return None
+            return self.local.get(key)
     
-    async def set_crawled_data(self, url: str, data: Dict[str, Any], ttl: int = 7200) -> None:
+    async def set_crawled_data(self, url: str, data: Dict[str, Any], ttl: Optional[int] = None) -> Optional[int]:
         """
         Cache crawled data for a given URL.
         
+        The markdown is stored once per distinct content in a blob keyed by its
+        content hash; the URL entry only references it. Blobs track the crawl
+        keys referencing them and live at least as long as the longest-lived
+        reference. A copy is also kept in the local fallback cache.
+        
+        Every call updates the URL's change statistics, from which the TTL
+        is chosen unless one is given (see ``app.services.adaptive_ttl``).
+        
         Args:
             url: The URL that was crawled
             data: The crawled data to cache
-            ttl: Time to live in seconds (default: 2 hours)
+            ttl: Time to live in seconds (default: learned from the URL's change rate)
+            
+        Returns:
+            The TTL used, or None if the data could not be stored in Redis
         """
         try:
-            key = self._hash_key(url, "crawl")
+            canonical = self.canonical_url(url)
+            key = self._hash_key(canonical, "crawl")
+            domain = _url_domain(canonical)
+            markdown = data.get("markdown") or ""
+            page_hash = data.get("content_hash") or content_hash(markdown)
+            blob_key = BLOB_PREFIX + page_hash
+            refs_key = blob_key + BLOB_REFS_SUFFIX
+            stats_key = CHANGE_STATS_PREFIX + key
+            now = time.time()
             cache_data = {
                 "url": url,
+                "canonical_url": canonical,
                 "timestamp": data.get("timestamp"),
-                "markdown": data.get("markdown"),
+                "content_hash": page_hash,
                 "title": data.get("title", ""),
                 "status_code": data.get("status_code"),
-                "cached_at": time.time()
+                "cached_at": now
             }
-            await self.redis_client.setex(key, ttl, json.dumps(cache_data))
-            logger.info(f"Crawled data cached for URL: {url}")
+            self.local.set(
+                key, dict(cache_data, markdown=markdown), ttl or self.ttl_policy.ttl_for(domain, {}), len(markdown)
+            )
+            
+            with self.breaker.guard(REDIS_ERRORS):
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.get(key)
+                pipe.ttl(blob_key)
+                pipe.hgetall(stats_key)
+                previous_raw, blob_ttl, stats = await pipe.execute()
+                previous_hash = json.loads(previous_raw).get("content_hash") if previous_raw else None
+                stats = update_change_stats(stats, page_hash, now)
+                if ttl is None:
+                    ttl = self.ttl_policy.ttl_for(domain, stats)
+                cache_data["ttl"] = ttl
+                
+                domain_key = DOMAIN_INDEX_PREFIX + domain
+                pipe = self.redis_client.pipeline(transaction=False)
+                if blob_ttl == -2:
+                    # Only upload the content when no identical page is stored yet
+                    pipe.set(blob_key, markdown, ex=ttl, nx=True)
+                elif 0 <= blob_ttl < ttl:
+                    pipe.expire(blob_key, ttl)
+                pipe.sadd(refs_key, key)
+                pipe.expire(refs_key, max(ttl, blob_ttl))
+                pipe.set(key, json.dumps(cache_data), ex=ttl)
+                pipe.sadd(domain_key, canonical)
+                pipe.expire(domain_key, self.index_ttl)
+                pipe.hset(stats_key, mapping=stats)
+                pipe.expire(stats_key, CHANGE_STATS_TTL)
+                await pipe.execute()
+                
+                if previous_hash and previous_hash != page_hash:
+                    await self._release_blobs({previous_hash: [key]})
+            logger.info("Crawled data cached for URL: %s (ttl %ss)", url, ttl)
+            return ttl
+        except CircuitOpenError:
+            redis_skipped_metrics.increment()
         except Exception as e:
             logger.error(f"Failed to set crawled data in cache: {e}")
+        return None
+    
+    async def get_change_stats(self, url: str) -> Dict[str, Any]:
+        """
+        Change statistics of a URL and the crawl TTL they currently yield.
+        
+        Returns:
+            ``hash``, ``seen_at``, ``observed``, ``changes``, ``crawls`` (when
+            the URL has been crawled) and ``ttl``
+        """
+        canonical = self.canonical_url(url)
+        stats: Dict[str, Any] = {}
+        try:
+            with self.breaker.guard(REDIS_ERRORS):
+                stats = await self.redis_client.hgetall(CHANGE_STATS_PREFIX + self._hash_key(canonical, "crawl"))
+        except CircuitOpenError:
+            redis_skipped_metrics.increment()
+        except Exception as e:
+            logger.error(f"Failed to get change statistics: {e}")
+        for name in ("seen_at", "observed", "changes"):
+            if name in stats:
+                stats[name] = float(stats[name])
+        if "crawls" in stats:
+            stats["crawls"] = int(stats["crawls"])
+        stats["ttl"] = self.ttl_policy.ttl_for(_url_domain(canonical), stats)
+        return stats
+    
+    async def get_context_handle(self, page_hash: str, model: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the provider-side cached context registered for a page's content.
+        
+        Args:
+            page_hash: Content hash of the page (as in the crawl entry)
+            model: Model the context was created for
+            
+        Returns:
+            The stored handle (``name``, ``model``, ``expires_at``), or None
+        """
+        key = BLOB_PREFIX + page_hash + CONTEXT_SUFFIX + model
+        try:
+            with self.breaker.guard(REDIS_ERRORS):
+                result = await self.redis_client.get(key)
+        except CircuitOpenError:
+            redis_skipped_metrics.increment()
+            return self.local.get(key)
+        except Exception as e:
+            logger.error(f"Failed to get context handle from cache: {e}")
+            return self.local.get(key)
+        return json.loads(result) if result else None
+    
+    async def set_context_handle(self, page_hash: str, model: str, handle: Dict[str, Any], ttl: int) -> None:
+        """
+        Store a provider-side cached context handle next to the page's content blob.
+        
+        Args:
+            page_hash: Content hash of the page
+            model: Model the context was created for
+            handle: Handle returned by the provider
+            ttl: Seconds to keep the handle (should end before the context expires)
+        """
+        if ttl <= 0:
+            return
+        key = BLOB_PREFIX + page_hash + CONTEXT_SUFFIX + model
+        self.local.set(key, handle, ttl)
+        try:
+            with self.breaker.guard(REDIS_ERRORS):
+                await self.redis_client.set(key, json.dumps(handle), ex=ttl)
+        except CircuitOpenError:
+            redis_skipped_metrics.increment()
+        except Exception as e:
+            logger.error(f"Failed to set context handle in cache: {e}")
+    
+    async def get_page_digest(self, page_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the digest (page and section summaries) stored for a page's content.
+        
+        Args:
+            page_hash: Content hash of the page
+            
+        Returns:
+            The digest, or None if the page has not been digested
+        """
+        key = BLOB_PREFIX + page_hash + DIGEST_SUFFIX
+        try:
+            with self.breaker.guard(REDIS_ERRORS):
+                result = await self.redis_client.get(key)
+        except CircuitOpenError:
+            redis_skipped_metrics.increment()
+            return self.local.get(key)
+        except Exception as e:
+            logger.error(f"Failed to get page digest from cache: {e}")
+            return self.local.get(key)
+        return json.loads(result) if result else None
+    
+    async def set_page_digest(self, page_hash: str, digest: Dict[str, Any], ttl: int = 86400) -> None:
+        """
+        Store a page digest next to the page's content blob.
+        
+        Args:
+            page_hash: Content hash of the page
+            digest: Digest to store
+            ttl: Time to live in seconds (default: 1 day)
+        """
+        key = BLOB_PREFIX + page_hash + DIGEST_SUFFIX
+        raw = json.dumps(digest)
+        self.local.set(key, digest, ttl, len(raw))
+        try:
+            with self.breaker.guard(REDIS_ERRORS):
+                await self.redis_client.set(key, raw, ex=ttl)
+        except CircuitOpenError:
+            redis_skipped_metrics.increment()
+        except Exception as e:
+            logger.error(f"Failed to set page digest in cache: {e}")
+    
+    async def record_access(self, *urls: str, weight: float = 1.0) -> None:
+        """
+        Count requests for URLs in the access sorted sets.
+        
+        Args:
+            urls: Requested URLs (any spelling of the canonical URL)
+            weight: Amount added to each URL's hit count
+        """
+        try:
+            now = time.time()
+            with self.breaker.guard(REDIS_ERRORS):
+                pipe = self.redis_client.pipeline(transaction=False)
+                for url in urls:
+                    canonical = self.canonical_url(url)
+                    pipe.zincrby(ACCESS_HITS_KEY, weight, canonical)
+                    pipe.zadd(ACCESS_LAST_KEY, {canonical: now})
+                await pipe.execute()
+        except CircuitOpenError:
+            redis_skipped_metrics.increment()
+        except Exception as e:
+            logger.error(f"Failed to record URL access: {e}")
+    
+    async def hot_urls(self, limit: int, since: Optional[float] = None) -> List[Tuple[str, float]]:
+        """
+        Most requested URLs.
+        
+        Args:
+            limit: Number of URLs to return
+            since: Skip URLs not requested since this time
+            
+        Returns:
+            (canonical URL, hit count) pairs, most requested first (empty if Redis is unavailable)
+        """
+        try:
+            with self.breaker.guard(REDIS_ERRORS):
+                ranked = await self.redis_client.zrevrange(ACCESS_HITS_KEY, 0, limit - 1, withscores=True)
+                if since is None or not ranked:
+                    return ranked
+                last_access = await self.redis_client.zmscore(ACCESS_LAST_KEY, [url for url, _ in ranked])
+        except CircuitOpenError:
+            redis_skipped_metrics.increment()
+            return []
+        except Exception as e:
+            logger.error(f"Failed to get hot URLs: {e}")
+            return []
+        return [entry for entry, last in zip(ranked, last_access) if last is not None and last >= since]
+    
+    async def decay_access(self, factor: float, keep: int) -> None:
+        """
+        Multiply all hit counts by ``factor`` and forget all but the ``keep`` most requested URLs.
+        
+        Runs entirely in Redis; no members are transferred to the worker.
+        """
+        try:
+            with self.breaker.guard(REDIS_ERRORS):
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.zremrangebyrank(ACCESS_HITS_KEY, 0, -(keep + 1))
+                pipe.zunionstore(ACCESS_HITS_KEY, {ACCESS_HITS_KEY: factor})
+                # Keep last-access times only for URLs still ranked (their hits weigh 0)
+                pipe.zinterstore(ACCESS_LAST_KEY, {ACCESS_LAST_KEY: 1, ACCESS_HITS_KEY: 0})
+                await pipe.execute()
+        except CircuitOpenError:
+            redis_skipped_metrics.increment()
+        except Exception as e:
+            logger.error(f"Failed to decay access counts: {e}")
+    
+    async def record_unique_user(self, url: str, user: str) -> None:
+        """
+        Add a user to the URL's HyperLogLog of requesting users (about 12 KB per URL at most).
+        
+        Args:
+            url: Requested URL (any spelling of the canonical URL)
+            user: User id or client address
+        """
+        key = UNIQUE_USERS_PREFIX + self.canonical_url(url)
+        try:
+            with self.breaker.guard(REDIS_ERRORS):
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.pfadd(key, user)
+                pipe.expire(key, self.unique_users_ttl)
+                await pipe.execute()
+        except CircuitOpenError:
+            redis_skipped_metrics.increment()
+        except Exception as e:
+            logger.error(f"Failed to record unique user: {e}")
+    
+    async def unique_users(self, urls: List[str]) -> List[int]:
+        """
+        Approximate number of distinct users (standard error 0.81%) per URL.
+        
+        Returns an empty list if Redis is unavailable.
+        """
+        try:
+            with self.breaker.guard(REDIS_ERRORS):
+                pipe = self.redis_client.pipeline(transaction=False)
+                for url in urls:
+                    pipe.pfcount(UNIQUE_USERS_PREFIX + self.canonical_url(url))
+                return await pipe.execute()
+        except CircuitOpenError:
+            redis_skipped_metrics.increment()
+        except Exception as e:
+            logger.error(f"Failed to count unique users: {e}")
+        return []
+    
+    async def crawl_ttls(self, urls: List[str]) -> List[int]:
+        """
+        Seconds until the cached crawls of URLs expire (-2 if not cached).
+        
+        Returns an empty list if Redis is unavailable.
+        """
+        try:
+            with self.breaker.guard(REDIS_ERRORS):
+                pipe = self.redis_client.pipeline(transaction=False)
+                for url in urls:
+                    pipe.ttl(self._crawl_key(url))
+                return await pipe.execute()
+        except CircuitOpenError:
+            redis_skipped_metrics.increment()
+        except Exception as e:
+            logger.error(f"Failed to get crawl TTLs: {e}")
+        return []
+    
+    async def acquire_lock(self, name: str, ttl: int) -> Optional[str]:
+        """
+        Take a named lock shared by all workers for ``ttl`` seconds.
+        
+        Returns:
+            The owner token if this caller got the lock (None if it is taken
+            or Redis is unavailable)
+        """
+        token = uuid.uuid4().hex
+        try:
+            with self.breaker.guard(REDIS_ERRORS):
+                if await self.redis_client.set(LOCK_PREFIX + name, token, nx=True, ex=max(1, ttl)):
+                    return token
+        except CircuitOpenError:
+            redis_skipped_metrics.increment()
+        except Exception as e:
+            logger.error(f"Failed to acquire lock {name}: {e}")
+        return None
+    
+    async def _if_lock_owned(self, name: str, token: str, action: Callable[[Any, str], None]) -> bool:
+        """Queue ``action(pipe, key)`` on the lock key in a transaction, only if ``token`` still owns it."""
+        key = LOCK_PREFIX + name
+        try:
+            with self.breaker.guard(REDIS_ERRORS):
+                async with self.redis_client.pipeline(transaction=True) as pipe:
+                    await pipe.watch(key)
+                    if await pipe.get(key) != token:
+                        await pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    action(pipe, key)
+                    await pipe.execute()
+                    return True
+        except WatchError:
+            pass
+        except CircuitOpenError:
+            redis_skipped_metrics.increment()
+        except Exception as e:
+            logger.error(f"Failed to update lock {name}: {e}")
+        return False
+    
+    async def release_lock(self, name: str, token: str) -> bool:
+        """Release a lock taken with ``acquire_lock`` if ``token`` still owns it."""
+        return await self._if_lock_owned(name, token, lambda pipe, key: pipe.delete(key))
+    
+    async def _renew_lock(self, name: str, token: str, ttl: int) -> None:
+        while True:
+            await asyncio.sleep(ttl / 3)
+            if not await self._if_lock_owned(name, token, lambda pipe, key: pipe.expire(key, ttl)):
+                logger.warning("Lost lock %s while holding it", name)
+                return
+    
+    @asynccontextmanager
+    async def hold_lock(self, name: str, ttl: int = LOCK_LEASE) -> AsyncIterator[bool]:
+        """
+        Hold a named lock for the duration of the block.
+        
+        The lock expires ``ttl`` seconds after its holder stops renewing it
+        (e.g. a crashed worker) and is released when the block ends.
+        
+        Yields:
+            Whether this caller got the lock; the block should do nothing otherwise
+        """
+        token = await self.acquire_lock(name, ttl)
+        if token is None:
+            yield False
+            return
+        renewal = asyncio.ensure_future(self._renew_lock(name, token, ttl))
+        try:
+            yield True
+        finally:
+            renewal.cancel()
+            await self.release_lock(name, token)
+    
+    async def _release_blobs(self, references: Dict[str, List[str]]) -> int:
+        """
+        Drop crawl-key references from blobs and unlink blobs nobody references.
+        
+        Args:
+            references: Content hash -> crawl keys that no longer use it
+        
+        Returns:
+            Number of blobs removed
+        """
+        pipe = self.redis_client.pipeline(transaction=False)
+        hashes = list(references)
+        for page_hash in hashes:
+            refs_key = BLOB_PREFIX + page_hash + BLOB_REFS_SUFFIX
+            pipe.srem(refs_key, *references[page_hash])
+            pipe.scard(refs_key)
+        results = await pipe.execute()
+        orphaned = [
+            page_hash for page_hash, remaining in zip(hashes, results[1::2]) if remaining == 0
+        ]
+        blob_keys = [BLOB_PREFIX + h for h in orphaned] + [BLOB_PREFIX + h + BLOB_REFS_SUFFIX for h in orphaned]
+        await self._unlink_in_batches(blob_keys)
+        return len(orphaned)
+    
+    async def _unlink_in_batches(self, keys: Iterable[str]) -> int:
+        """UNLINK keys in fixed-size batches; returns the number removed."""
+        removed = 0
+        batch: List[str] = []
+        for key in keys:
+            batch.append(key)
+            if len(batch) >= INVALIDATION_BATCH_SIZE:
+                removed += await self.redis_client.unlink(*batch)
+                batch = []
+        if batch:
+            removed += await self.redis_client.unlink(*batch)
+        return removed
+    
+    async def _invalidate_urls(self, urls: List[str]) -> Dict[str, int]:
+        """
+        Remove crawl entries for canonical URLs plus every LLM response derived
+        from them, releasing their content blobs.
+        """
+        # The local fallback does not track dependents; drop it wholesale
+        self.local.clear()
+        crawl_keys = [self._hash_key(url, "crawl") for url in urls]
+        references: Dict[str, List[str]] = {}
+        for crawl_key, raw in zip(crawl_keys, await self.redis_client.mget(crawl_keys)):
+            page_hash = json.loads(raw).get("content_hash") if raw else None
+            if page_hash:
+                references.setdefault(page_hash, []).append(crawl_key)
+        deps_keys = [DEPENDENTS_INDEX_PREFIX + key for key in crawl_keys]
+        llm_keys: List[str] = []
+        for deps_key in deps_keys:
+            async for llm_key in self.redis_client.sscan_iter(deps_key, count=INVALIDATION_BATCH_SIZE):
+                llm_keys.append(llm_key)
+        crawl_removed = await self._unlink_in_batches(crawl_keys)
+        llm_removed = await self._unlink_in_batches(llm_keys)
+        await self._unlink_in_batches(deps_keys)
+        if references:
+            await self._release_blobs(references)
+        
+        by_domain: Dict[str, List[str]] = {}
+        for url in urls:
+            by_domain.setdefault(_url_domain(url), []).append(url)
+        pipe = self.redis_client.pipeline(transaction=False)
+        for domain, domain_urls in by_domain.items():
+            pipe.srem(DOMAIN_INDEX_PREFIX + domain, *domain_urls)
+        await pipe.execute()
+        return {"urls": len(urls), "crawl_entries": crawl_removed, "llm_entries": llm_removed}
+    
+    async def _invalidate_matching(self, domain: str, prefix: Optional[str] = None) -> Dict[str, int]:
+        """Invalidate indexed (canonical) URLs of a domain, optionally only those under a prefix."""
+        totals = {"urls": 0, "crawl_entries": 0, "llm_entries": 0}
+        domain_key = DOMAIN_INDEX_PREFIX + domain.lower()
+        batch: List[str] = []
+        # Collect first: removing members while SSCAN is iterating may skip some
+        async for url in self.redis_client.sscan_iter(domain_key, count=INVALIDATION_BATCH_SIZE):
+            if prefix is None or url.startswith(prefix):
+                batch.append(url)
+        for start in range(0, len(batch), INVALIDATION_BATCH_SIZE):
+            result = await self._invalidate_urls(batch[start:start + INVALIDATION_BATCH_SIZE])
+            for name, count in result.items():
+                totals[name] += count
+        return totals
+    
+    async def invalidate_url(self, url: str) -> Dict[str, int]:
+        """
+        Invalidate the cached crawl of a URL and all LLM responses derived from it.
+        
+        Returns:
+            Counts of invalidated URLs, crawl entries and LLM entries
+        
+        Raises:
+            CircuitOpenError: The Redis circuit breaker is open
+            redis.RedisError: Redis failed part way; the invalidation may be partial
+        """
+        with self.breaker.guard(REDIS_ERRORS):
+            result = await self._invalidate_urls([self.canonical_url(url)])
+        logger.info("Invalidated URL %s: %s", url, result)
+        return result
+    
+    async def invalidate_domain(self, domain: str) -> Dict[str, int]:
+        """
+        Invalidate every cached crawl of a domain and all LLM responses derived from them.
+        
+        Work is proportional to the number of URLs indexed for the domain.
+        Raises the same errors as ``invalidate_url``.
+        """
+        with self.breaker.guard(REDIS_ERRORS):
+            result = await self._invalidate_matching(domain)
+            await self.redis_client.unlink(DOMAIN_INDEX_PREFIX + domain.lower())
+        logger.info("Invalidated domain %s: %s", domain, result)
+        return result
+    
+    async def invalidate_prefix(self, prefix: str) -> Dict[str, int]:
+        """
+        Invalidate cached crawls whose URL starts with ``prefix`` (e.g.
+        ``https://example.com/docs/``) and all LLM responses derived from them.
+        
+        Raises:
+            ValueError: The prefix has no host
+            CircuitOpenError, redis.RedisError: As for ``invalidate_url``
+        """
+        domain = _url_domain(prefix)
+        if not domain:
+            raise ValueError("Prefix must be an absolute URL including the host")
+        canonical_prefix = self.canonical_url(prefix)
+        if prefix.endswith("/") and not canonical_prefix.endswith("/"):
+            canonical_prefix += "/"
+        with self.breaker.guard(REDIS_ERRORS):
+            result = await self._invalidate_matching(domain, canonical_prefix)
+        logger.info("Invalidated prefix %s: %s", prefix, result)
+        return result
     
     # Backward compatibility methods
     async def get(self, key: str) -> Optional[str]:
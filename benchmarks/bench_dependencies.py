@@ -0,0 +1,88 @@
+"""
+Benchmark what resolving the /cag dependencies costs per request.
+
+Usage:
+    python -m benchmarks.bench_dependencies [--requests 2000]
+
+``per_request`` reproduces the previous dependencies, which built
+``Settings()`` (re-reading ``.env`` and parsing the Redis URL), a
+``GenerativeModel``, the cache, history and crawler services on every
+request. ``container`` resolves the same services through
+``app.api.dependencies`` from an application-scoped ``ServiceContainer``.
+Prints microseconds per request for each.
+"""
+
+import argparse
+import json
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict
+
+from app.api import dependencies
+from app.core.config import Settings
+from app.core.container import ServiceContainer
+
+
+def per_request() -> None:
+    """Previous behaviour: every dependency constructed from scratch."""
+    from app.services.crawler import CrawlerService
+    from app.services.history import HistoryService
+    from app.services.llm_provider import LLMProvider
+    from app.services.simple_caching import SimpleCacheService
+
+    settings = Settings()
+    LLMProvider(settings.llm_model_name, settings.llm_generation_config())
+    cache = SimpleCacheService(settings)
+    HistoryService(settings)
+    CrawlerService(cache_service=cache)
+
+
+def container_resolver() -> Callable[[], None]:
+    """Resolve the same dependencies the way the routes do now."""
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(container=ServiceContainer(Settings()))))
+
+    def resolve() -> None:
+        container = dependencies.get_container(request)
+        dependencies.get_settings(container)
+        dependencies.get_llm_provider(container)
+        cache = dependencies.get_gptcache_service(container)
+        dependencies.get_history_service(container)
+        dependencies.get_crawler_service(container, cache)
+
+    resolve()  # services are built on first use
+    return resolve
+
+
+def _time_per_request(resolve: Callable[[], None], requests: int) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(requests):
+        resolve()
+    return (time.perf_counter_ns() - start) / requests / 1000
+
+
+def run(requests: int = 2000) -> Dict[str, float]:
+    """
+    Time both strategies.
+
+    Returns:
+        Microseconds per request for ``per_request`` and ``container``
+    """
+    per_request()  # warm imports
+    legacy = _time_per_request(per_request, max(1, requests // 20))
+    shared = _time_per_request(container_resolver(), requests)
+    return {
+        "per_request_us": round(legacy, 2),
+        "container_us": round(shared, 3),
+        "speedup": round(legacy / shared, 1) if shared else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-request dependency resolution")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.requests), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark the cost of recording metrics in the monitoring hot path.
+
+Usage:
+    python -m benchmarks.bench_monitoring [--events 200000] [--threads 4]
+
+Prints nanoseconds per event for each recording path, single-threaded and
+with several threads recording concurrently. ``locked_baseline`` reproduces
+the previous design (one global lock and a formatted key per event) for
+comparison.
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict
+
+from app.core.monitoring import ApplicationMonitor, MetricData
+
+
+class LockedBaseline:
+    """Previous recording strategy: global lock plus per-call key formatting."""
+
+    def __init__(self):
+        self._metrics: Dict[str, MetricData] = defaultdict(MetricData)
+        self._lock = threading.Lock()
+
+    def record_request(self, endpoint: str, duration: float):
+        with self._lock:
+            self._metrics[f"endpoint_{endpoint.replace('/', '_')}"].add_measurement(duration)
+
+
+def _time_per_event(record: Callable[[], None], events: int, threads: int) -> float:
+    """Run ``record`` ``events`` times per thread and return ns per event."""
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        barrier.wait()
+        for _ in range(events):
+            record()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    start = time.perf_counter_ns()
+    barrier.wait()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter_ns() - start
+    return elapsed / (events * threads)
+
+
+def run(events: int, threads: int) -> Dict[str, Dict[str, float]]:
+    monitor = ApplicationMonitor()
+    baseline = LockedBaseline()
+    request_handle = monitor.request_handle("cag")
+    cache_handle = monitor.cache_handle("llm")
+
+    cases: Dict[str, Callable[[], None]] = {
+        "locked_baseline": lambda: baseline.record_request("cag", 0.0125),
+        "record_request": lambda: monitor.record_request("cag", 0.0125),
+        "request_handle": lambda: request_handle.record(0.0125),
+        "cache_handle_hit": cache_handle.hit,
+    }
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name, record in cases.items():
+        results[name] = {
+            "single_thread_ns": round(_time_per_event(record, events, 1), 1),
+            f"{threads}_threads_ns": round(_time_per_event(record, events, threads), 1),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=200_000, help="Events per thread")
+    parser.add_argument("--threads", type=int, default=4, help="Concurrent recording threads")
+    args = parser.parse_args()
+    print(json.dumps(run(args.events, args.threads), indent=2))
+
+
+if __name__ == "__main__":
+    main()
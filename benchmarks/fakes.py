@@ -0,0 +1,159 @@
+"""
+Offline stand-ins for the external services used by the API.
+
+``FakeLLMProvider`` replaces Gemini with a configurable latency distribution,
+simulated token streaming and an error rate. ``FakeCrawlerService`` runs the
+real ``CrawlerService`` caching logic but serves pages from a local corpus
+instead of the network.
+"""
+
+import asyncio
+import random
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from app.services.crawler import CrawlerService
+
+CORPUS_HOST = "https://bench.example.com"
+
+
+class FakeLLMError(RuntimeError):
+    """Injected LLM failure."""
+
+
+@dataclass
+class LatencyModel:
+    """
+    Log-normal latency distribution (seconds).
+
+    Attributes:
+        median: Median latency
+        sigma: Shape of the log-normal; 0 makes the latency constant
+        maximum: Upper clamp for sampled values
+    """
+    median: float = 0.0
+    sigma: float = 0.0
+    maximum: float = 30.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median <= 0:
+            return 0.0
+        if self.sigma <= 0:
+            return self.median
+        return min(self.maximum, rng.lognormvariate(0.0, self.sigma) * self.median)
+
+
+class FakeLLMProvider:
+    """
+    Drop-in replacement for ``LLMProvider`` that never calls the network.
+
+    A response is produced as a stream of tokens: the first token arrives
+    after a time-to-first-token sampled from ``latency``, every following
+    token after ``token_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        latency: Optional[LatencyModel] = None,
+        token_interval: float = 0.0,
+        response_tokens: int = 64,
+        error_rate: float = 0.0,
+        model_name: str = "fake-llm",
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency or LatencyModel()
+        self.token_interval = token_interval
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self.model_name = model_name
+        self.generation_config: Dict[str, Any] = {}
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    async def stream_content(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the response token by token."""
+        self.calls += 1
+        await asyncio.sleep(self.latency.sample(self._rng))
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise FakeLLMError("Injected LLM failure")
+        for index in range(self.response_tokens):
+            if index and self.token_interval:
+                await asyncio.sleep(self.token_interval)
+            yield f"token{index} "
+
+    async def generate_content(self, prompt: str) -> str:
+        return "".join([token async for token in self.stream_content(prompt)])
+
+
+class FakeWebCrawler:
+    """Stand-in for ``AsyncWebCrawler`` serving markdown from a corpus."""
+
+    def __init__(self, corpus: Dict[str, str], latency: Optional[LatencyModel] = None, seed: Optional[int] = None):
+        self.corpus = corpus
+        self.paths = sorted(corpus)
+        self.latency = latency or LatencyModel()
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    async def arun(self, url: str) -> SimpleNamespace:
+        self.calls += 1
+        await asyncio.sleep(self.latency.sample(self._rng))
+        path = urlsplit(url).path
+        if path not in self.corpus:
+            # Unknown URLs still resolve so cache-miss traffic can use fresh URLs
+            path = self.paths[zlib.crc32(path.encode()) % len(self.paths)]
+        return SimpleNamespace(
+            markdown=self.corpus[path],
+            title=path.rsplit("/", 1)[-1],
+            success=True,
+            status_code=200,
+        )
+
+
+class FakeCrawlerService(CrawlerService):
+    """``CrawlerService`` with its crawler replaced by ``FakeWebCrawler``."""
+
+    def __init__(self, crawler: FakeWebCrawler, cache_service=None):
+        self.crawler = crawler
+        self.cache_service = cache_service
+        self.digester = None
+        self.track_access = False
+        self.scheduler = None
+
+
+def load_corpus(directory: str) -> Dict[str, str]:
+    """
+    Load ``*.md`` files from a directory as a corpus.
+
+    Returns:
+        Mapping of URL path (``/<file stem>``) to markdown
+    """
+    corpus = {f"/{path.stem}": path.read_text(encoding="utf-8") for path in sorted(Path(directory).glob("*.md"))}
+    if not corpus:
+        raise ValueError(f"No .md files found in {directory}")
+    return corpus
+
+
+def synthetic_corpus(pages: int = 50, page_kb: int = 32, seed: int = 0) -> Dict[str, str]:
+    """Generate a deterministic corpus of markdown pages of roughly ``page_kb`` KB."""
+    rng = random.Random(seed)
+    words = ["cache", "augmented", "generation", "redis", "latency", "crawler", "gemini",
+             "throughput", "percentile", "markdown", "request", "response", "token"]
+    corpus: Dict[str, str] = {}
+    for page in range(pages):
+        sections: List[str] = [f"# Page {page}\n"]
+        size = 0
+        while size < page_kb * 1024:
+            paragraph = " ".join(rng.choice(words) for _ in range(80))
+            sections.append(f"## Section {len(sections)}\n\n{paragraph}\n")
+            size += len(paragraph) + 16
+        corpus[f"/page-{page}"] = "\n".join(sections)
+    return corpus
+
+
+def corpus_urls(corpus: Dict[str, str]) -> List[str]:
+    return [CORPUS_HOST + path for path in sorted(corpus)]
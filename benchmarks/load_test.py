@@ -0,0 +1,312 @@
+"""
+Offline load test of the API with fake Gemini and fake crawler.
+
+Usage:
+    python -m benchmarks.load_test [--requests 1000] [--concurrency 32]
+        [--mix crawl=1,generate=1,cag=2] [--cache-hit-ratio 0.8]
+        [--llm-latency 0.8 --llm-sigma 0.4 --token-interval 0.01 --error-rate 0.01]
+        [--corpus DIR] [--redis-url redis://localhost:6379/15] [--output report.json]
+
+Boots ``app.main.app`` in-process with ``FakeLLMProvider`` and
+``FakeCrawlerService`` injected through dependency overrides, drives
+``/crawl``, ``/generate`` and ``/cag`` from a pool of concurrent clients and
+prints a JSON report with throughput and latency percentiles per endpoint.
+Caching runs through the real ``SimpleCacheService`` against fakeredis (or a
+real Redis with ``--redis-url``; the database is flushed first).
+
+``--cache-hit-ratio`` is the fraction of requests drawn from a hot set that
+is warmed before measuring; the others use fresh URLs, prompts and queries.
+The observed hit rates are reported next to it.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+import httpx
+
+from benchmarks.fakes import (
+    FakeCrawlerService,
+    FakeLLMProvider,
+    FakeWebCrawler,
+    LatencyModel,
+    corpus_urls,
+    load_corpus,
+    synthetic_corpus,
+)
+
+ENDPOINTS = ("crawl", "generate", "cag")
+REPORT_PERCENTILES = (50.0, 90.0, 95.0, 99.0)
+
+
+@dataclass
+class LoadTestConfig:
+    requests: int = 1000
+    concurrency: int = 32
+    mix: Dict[str, float] = field(default_factory=lambda: {"crawl": 1.0, "generate": 1.0, "cag": 2.0})
+    cache_hit_ratio: float = 0.8
+    hot_set_size: int = 20
+    llm_latency: float = 0.0
+    llm_sigma: float = 0.0
+    token_interval: float = 0.0
+    response_tokens: int = 64
+    error_rate: float = 0.0
+    crawl_latency: float = 0.0
+    corpus_dir: Optional[str] = None
+    corpus_pages: int = 50
+    page_kb: int = 32
+    redis_url: Optional[str] = None
+    seed: int = 1
+
+
+@dataclass
+class PlannedRequest:
+    endpoint: str
+    body: Dict[str, Any]
+    hot: bool
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    status: int
+    latency: float
+    cache_hit: Optional[bool]
+
+
+def build_plan(config: LoadTestConfig, urls: Sequence[str]) -> tuple:
+    """
+    Build the deterministic request sequence for a run.
+
+    Returns:
+        Tuple of (warm-up requests, measured requests)
+    """
+    rng = random.Random(config.seed)
+    hot_urls = list(urls[:config.hot_set_size])
+    hot_bodies = {
+        "crawl": [{"url": url} for url in hot_urls],
+        "generate": [{"prompt": f"Explain topic {i} in two sentences."} for i in range(config.hot_set_size)],
+        "cag": [{"url": url, "query": f"What is section {i} about?"} for i, url in enumerate(hot_urls)],
+    }
+    endpoints = [name for name in ENDPOINTS if config.mix.get(name, 0) > 0]
+    weights = [config.mix[name] for name in endpoints]
+
+    plan: List[PlannedRequest] = []
+    for i in range(config.requests):
+        endpoint = rng.choices(endpoints, weights)[0]
+        if rng.random() < config.cache_hit_ratio:
+            plan.append(PlannedRequest(endpoint, rng.choice(hot_bodies[endpoint]), True))
+        elif endpoint == "crawl":
+            plan.append(PlannedRequest(endpoint, {"url": f"{rng.choice(urls)}?run={i}"}, False))
+        elif endpoint == "generate":
+            plan.append(PlannedRequest(endpoint, {"prompt": f"Unique benchmark prompt number {i}."}, False))
+        else:
+            plan.append(PlannedRequest(endpoint, {"url": rng.choice(urls), "query": f"Unique question {i}?"}, False))
+
+    warmup = [PlannedRequest(name, body, True) for name in endpoints for body in hot_bodies[name]]
+    return warmup, plan
+
+
+def _cache_hit(endpoint: str, payload: Dict[str, Any]) -> Optional[bool]:
+    if endpoint == "cag":
+        return payload.get("llm_cached")
+    return payload.get("cached")
+
+
+@asynccontextmanager
+async def benchmark_app(config: LoadTestConfig) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Install the fakes on ``app.main.app`` and run its lifespan.
+
+    Yields:
+        The app, its fakes and the cache service
+    """
+    from app.api import endpoints
+    from app.core.config import get_settings
+    from app.main import app
+    from app.services.history import HistoryService
+    from app.services.simple_caching import SimpleCacheService
+
+    settings = get_settings()
+    if config.redis_url:
+        settings.redis_url = config.redis_url
+    cache = SimpleCacheService(settings)
+    history = HistoryService(settings)
+    if config.redis_url:
+        await cache.redis_client.flushdb()
+    else:
+        import fakeredis
+
+        server = fakeredis.FakeServer()
+        cache.redis_client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        history.redis = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+
+    corpus = load_corpus(config.corpus_dir) if config.corpus_dir else synthetic_corpus(
+        config.corpus_pages, config.page_kb, config.seed
+    )
+    llm = FakeLLMProvider(
+        latency=LatencyModel(config.llm_latency, config.llm_sigma),
+        token_interval=config.token_interval,
+        response_tokens=config.response_tokens,
+        error_rate=config.error_rate,
+        seed=config.seed,
+    )
+    crawler = FakeWebCrawler(corpus, LatencyModel(config.crawl_latency), seed=config.seed)
+
+    overrides = {
+        endpoints.get_llm_provider: lambda: llm,
+        endpoints.get_gptcache_service: lambda: cache,
+        endpoints.get_history_service: lambda: history,
+        endpoints.get_crawler_service: lambda: FakeCrawlerService(crawler, cache_service=cache),
+    }
+    previous = dict(app.dependency_overrides)
+    app.dependency_overrides.update(overrides)
+    try:
+        async with app.router.lifespan_context(app):
+            yield {"app": app, "llm": llm, "crawler": crawler, "cache": cache, "urls": corpus_urls(corpus)}
+    finally:
+        app.dependency_overrides = previous
+        if config.redis_url:
+            await cache.redis_client.flushdb()
+
+
+async def send_request(client: httpx.AsyncClient, request: PlannedRequest, client_id: int) -> Sample:
+    # A distinct forwarded address per request keeps the per-IP rate limiter
+    # in the measured path without rejecting the synthetic traffic
+    headers = {"X-Forwarded-For": f"bench-{client_id}"}
+    start = time.perf_counter()
+    try:
+        response = await client.post(f"/{request.endpoint}", json=request.body, headers=headers)
+    except httpx.TransportError:
+        # Connection failures against a real target are reported as status 0
+        return Sample(request.endpoint, 0, time.perf_counter() - start, None)
+    latency = time.perf_counter() - start
+    hit = None
+    if response.status_code == 200:
+        hit = _cache_hit(request.endpoint, response.json())
+    return Sample(request.endpoint, response.status_code, latency, hit)
+
+
+async def drive(app, requests: Sequence[PlannedRequest], concurrency: int, id_offset: int = 0) -> List[Sample]:
+    """Issue requests from ``concurrency`` concurrent clients."""
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    samples: List[Sample] = []
+    queue = iter(enumerate(requests, start=id_offset))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def worker():
+            for client_id, request in queue:
+                samples.append(await send_request(client, request, client_id))
+
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return samples
+
+
+def percentile(sorted_values: Sequence[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples: Sequence[Sample], elapsed: float) -> Dict[str, Any]:
+    """Throughput, latency percentiles (ms), status codes and cache hit rate."""
+    latencies = sorted(sample.latency for sample in samples)
+    statuses: Dict[str, int] = {}
+    for sample in samples:
+        statuses[str(sample.status)] = statuses.get(str(sample.status), 0) + 1
+    cache_flags = [sample.cache_hit for sample in samples if sample.cache_hit is not None]
+    latency_ms: Dict[str, float] = {
+        f"p{percent:g}": round(percentile(latencies, percent) * 1000, 3) for percent in REPORT_PERCENTILES
+    }
+    if latencies:
+        latency_ms["mean"] = round(sum(latencies) / len(latencies) * 1000, 3)
+        latency_ms["max"] = round(latencies[-1] * 1000, 3)
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for sample in samples if sample.status >= 400 or sample.status == 0),
+        "status_codes": statuses,
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": latency_ms,
+        "cache_hit_rate": round(sum(cache_flags) / len(cache_flags), 4) if cache_flags else None,
+    }
+
+
+async def run(config: LoadTestConfig) -> Dict[str, Any]:
+    """Run a load test and return the JSON-serializable report."""
+    async with benchmark_app(config) as env:
+        warmup, plan = build_plan(config, env["urls"])
+        await drive(env["app"], warmup, config.concurrency)
+        llm_calls, crawls = env["llm"].calls, env["crawler"].calls
+
+        start = time.perf_counter()
+        samples = await drive(env["app"], plan, config.concurrency, id_offset=len(warmup))
+        elapsed = time.perf_counter() - start
+
+        return {
+            "config": asdict(config),
+            "duration_s": round(elapsed, 3),
+            "overall": summarize(samples, elapsed),
+            "endpoints": {
+                name: summarize([s for s in samples if s.endpoint == name], elapsed)
+                for name in ENDPOINTS
+                if any(s.endpoint == name for s in samples)
+            },
+            "backend_calls": {
+                "llm": env["llm"].calls - llm_calls,
+                "crawl": env["crawler"].calls - crawls,
+            },
+        }
+
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint in mix: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mix", type=_parse_mix, default=None, help="e.g. crawl=1,generate=1,cag=2")
+    parser.add_argument("--cache-hit-ratio", type=float, default=0.8)
+    parser.add_argument("--hot-set-size", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Median time to first token (s)")
+    parser.add_argument("--llm-sigma", type=float, default=0.0, help="Log-normal shape of LLM latency")
+    parser.add_argument("--token-interval", type=float, default=0.0, help="Delay between streamed tokens (s)")
+    parser.add_argument("--response-tokens", type=int, default=64)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of LLM calls that fail")
+    parser.add_argument("--crawl-latency", type=float, default=0.0, help="Fake crawl latency (s)")
+    parser.add_argument("--corpus", dest="corpus_dir", help="Directory of .md fixture pages")
+    parser.add_argument("--pages", dest="corpus_pages", type=int, default=50, help="Synthetic corpus size")
+    parser.add_argument("--page-kb", type=int, default=32, help="Synthetic page size")
+    parser.add_argument("--redis-url", help="Use this Redis (flushed!) instead of fakeredis")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Also write the report to this file")
+    args = vars(parser.parse_args(argv))
+
+    output = args.pop("output")
+    mix = args.pop("mix")
+    config = LoadTestConfig(**args)
+    if mix:
+        config.mix = mix
+    report = asyncio.run(run(config))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
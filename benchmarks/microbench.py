@@ -0,0 +1,281 @@
+"""
+Microbenchmarks for the per-request hot paths.
+
+Usage:
+    python -m benchmarks.microbench [--filter history] [--redis-url URL]
+    python -m benchmarks.microbench --save-baseline
+    python -m benchmarks.microbench --compare [--threshold 0.25]
+
+Cases cover ``SimpleCacheService`` crawl entries with large markdown,
+``HistoryService.get_history`` at 10/1k/100k turns, ``_hash_key`` on large
+prompts, /cag prompt assembly and the rate limiter with many client IPs.
+Redis-backed cases run against fakeredis unless ``--redis-url`` is given
+(that database is flushed).
+
+Each case reports the median and best time per operation over several
+repeats. ``--save-baseline`` writes the results to
+``benchmarks/baselines/microbench.json``; ``--compare`` re-runs the cases and
+flags any whose median is more than ``--threshold`` slower than the baseline,
+exiting with status 1 if there is a regression. Baselines are only
+comparable on the same machine.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "microbench.json"
+DEFAULT_THRESHOLD = 0.25
+
+Operation = Callable[[], Union[None, Awaitable[None]]]
+
+
+@dataclass
+class Case:
+    """A benchmark case; ``setup`` returns the operation to time."""
+    name: str
+    setup: Callable[["BenchContext"], Awaitable[Operation]]
+    number: int = 100
+    is_async: bool = True
+
+
+class BenchContext:
+    """Shared fixtures for the cases: settings and Redis connections."""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        from app.core.config import get_settings
+
+        self.settings = get_settings()
+        self.redis_url = redis_url
+        if redis_url:
+            self.settings.redis_url = redis_url
+        self._server = None
+
+    def redis(self):
+        if self.redis_url:
+            import redis.asyncio as redis
+
+            return redis.from_url(self.redis_url, decode_responses=True)
+        import fakeredis
+
+        if self._server is None:
+            self._server = fakeredis.FakeServer()
+        return fakeredis.FakeAsyncRedis(server=self._server, decode_responses=True)
+
+    async def reset(self):
+        await self.redis().flushdb()
+
+
+def _markdown(kb: int) -> str:
+    paragraph = "Cache augmented generation keeps crawled pages and answers close to the API. "
+    return "# Page\n\n" + paragraph * (kb * 1024 // len(paragraph) + 1)
+
+
+def _cache_service(ctx: BenchContext):
+    from app.services.simple_caching import SimpleCacheService
+
+    cache = SimpleCacheService(ctx.settings)
+    cache.redis_client = ctx.redis()
+    return cache
+
+
+def crawl_set_case(kb: int) -> Case:
+    async def setup(ctx: BenchContext) -> Operation:
+        cache = _cache_service(ctx)
+        data = {"markdown": _markdown(kb), "title": "Page", "timestamp": 1.0, "status_code": 200}
+        counter = iter(range(10**9))
+
+        async def op():
+            await cache.set_crawled_data(f"https://bench.example.com/page-{next(counter)}", data)
+        return op
+    return Case(f"cache.set_crawled_data[{kb}kb]", setup, number=50)
+
+
+def crawl_get_case(kb: int) -> Case:
+    async def setup(ctx: BenchContext) -> Operation:
+        cache = _cache_service(ctx)
+        url = "https://bench.example.com/page"
+        await cache.set_crawled_data(url, {"markdown": _markdown(kb), "timestamp": 1.0})
+
+        async def op():
+            await cache.get_crawled_data(url)
+        return op
+    return Case(f"cache.get_crawled_data[{kb}kb]", setup, number=100)
+
+
+def history_case(turns: int) -> Case:
+    async def setup(ctx: BenchContext) -> Operation:
+        from app.services.history import HistoryService
+
+        history = HistoryService(ctx.settings)
+        history.redis = ctx.redis()
+        turn = json.dumps({"message": "How does the cache decide what to keep? " * 4, "role": "user"})
+        for start in range(0, turns, 10_000):
+            await history.redis.rpush("history:bench", *([turn] * min(10_000, turns - start)))
+
+        async def op():
+            await history.get_history("bench")
+        return op
+    return Case(f"history.get_history[{turns}]", setup, number=max(1, 20_000 // turns))
+
+
+def hash_key_case(kb: int) -> Case:
+    async def setup(ctx: BenchContext) -> Operation:
+        cache = _cache_service(ctx)
+        prompt = _markdown(kb)
+
+        def op():
+            cache._hash_key(prompt, "llm")
+        return op
+    return Case(f"cache._hash_key[{kb}kb]", setup, number=200, is_async=False)
+
+
+def cag_prompt_case(kb: int, turns: int) -> Case:
+    async def setup(ctx: BenchContext) -> Operation:
+        from app.api.endpoints import build_cag_prompt
+
+        markdown = _markdown(kb)
+        history = [{"role": "user", "message": "Earlier question about caching?"}] * turns
+
+        def op():
+            build_cag_prompt("https://bench.example.com/page", markdown, "What does it cache?", history)
+        return op
+    return Case(f"cag.build_prompt[{kb}kb,{turns}turns]", setup, number=200, is_async=False)
+
+
+def rate_limiter_case(clients: int) -> Case:
+    async def setup(ctx: BenchContext) -> Operation:
+        from app.middleware.rate_limiting import RateLimitMiddleware
+
+        limiter = RateLimitMiddleware(app=None, calls_per_minute=10**9, expensive_calls_per_minute=10**9)
+        ips = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(clients)]
+        for ip in ips:
+            limiter.is_rate_limited(ip, "/cag")
+        position = iter(range(10**9))
+
+        def op():
+            limiter.is_rate_limited(ips[next(position) % clients], "/cag")
+        return op
+    return Case(f"rate_limiter.is_rate_limited[{clients}ips]", setup, number=1000, is_async=False)
+
+
+CASES: List[Case] = [
+    crawl_set_case(256),
+    crawl_get_case(256),
+    history_case(10),
+    history_case(1_000),
+    history_case(100_000),
+    hash_key_case(256),
+    cag_prompt_case(256, 5),
+    rate_limiter_case(10_000),
+]
+
+
+async def _time_case(case: Case, ctx: BenchContext, repeats: int) -> Dict[str, float]:
+    await ctx.reset()
+    op = await case.setup(ctx)
+    timings: List[float] = []
+    for _ in range(repeats + 1):  # the first repeat warms up and is discarded
+        start = time.perf_counter_ns()
+        if case.is_async:
+            for _ in range(case.number):
+                await op()
+        else:
+            for _ in range(case.number):
+                op()
+        timings.append((time.perf_counter_ns() - start) / case.number)
+    timings = timings[1:]
+    return {
+        "median_us": round(statistics.median(timings) / 1000, 3),
+        "min_us": round(min(timings) / 1000, 3),
+        "ops": case.number,
+        "repeats": repeats,
+    }
+
+
+async def run(cases: List[Case], redis_url: Optional[str] = None, repeats: int = 5) -> Dict[str, Dict[str, float]]:
+    ctx = BenchContext(redis_url)
+    results = {}
+    try:
+        for case in cases:
+            results[case.name] = await _time_case(case, ctx, repeats)
+    finally:
+        await ctx.reset()
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], threshold: float) -> Dict[str, Dict[str, Any]]:
+    """
+    Compare results against a baseline.
+
+    Returns:
+        Per case: baseline and current median, their ratio and a status of
+        ``regression``, ``improved``, ``ok`` or ``new``
+    """
+    report = {}
+    previous = baseline.get("results", {})
+    for name, result in results.items():
+        if name not in previous:
+            report[name] = {"current_us": result["median_us"], "status": "new"}
+            continue
+        ratio = result["median_us"] / previous[name]["median_us"] if previous[name]["median_us"] else 1.0
+        status = "ok"
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold):
+            status = "improved"
+        report[name] = {
+            "baseline_us": previous[name]["median_us"],
+            "current_us": result["median_us"],
+            "ratio": round(ratio, 3),
+            "status": status,
+        }
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--redis-url", help="Run against this Redis (flushed!) instead of fakeredis")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown flagged as a regression")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in CASES if args.filter in case.name]
+    results = asyncio.run(run(cases, args.redis_url, args.repeats))
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "machine": {"python": platform.python_version(), "platform": platform.platform()},
+            "redis": "redis" if args.redis_url else "fakeredis",
+            "results": results,
+        }
+        args.baseline.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+
+    if args.compare:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        report = compare(results, baseline, args.threshold)
+        print(json.dumps(report, indent=2))
+        regressions = [name for name, entry in report.items() if entry["status"] == "regression"]
+        if regressions:
+            print(f"Regressions (> {args.threshold:.0%} slower): {', '.join(regressions)}")
+            return 1
+        return 0
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
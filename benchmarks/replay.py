@@ -0,0 +1,232 @@
+"""
+Replay captured API traffic for capacity testing.
+
+Usage:
+    python -m benchmarks.replay CAPTURE.jsonl [...] --target http://localhost:8000
+        [--speed 1.0 | --speed 4 | --speed max] [--concurrency 64] [--output report.json]
+    python -m benchmarks.replay CAPTURE.jsonl --in-process [--llm-latency 0.8 ...]
+
+Reads files written by ``app.middleware.capture`` (rotated siblings such as
+``CAPTURE.jsonl.1`` are included) and re-issues the requests in arrival
+order. With a numeric ``--speed`` the original inter-arrival times are kept,
+divided by the speed factor; ``max`` sends as fast as ``--concurrency``
+allows. Requests are never in flight more than ``--concurrency`` at a time;
+when that limit delays a request past its scheduled time the lag is
+reported.
+
+``--in-process`` replays against ``app.main.app`` with the fake LLM and
+crawler from ``benchmarks.load_test`` instead of a live server.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+from benchmarks.load_test import (
+    ENDPOINTS,
+    LoadTestConfig,
+    PlannedRequest,
+    Sample,
+    benchmark_app,
+    percentile,
+    send_request,
+    summarize,
+)
+
+
+@dataclass
+class CapturedRequest:
+    ts: float
+    request: PlannedRequest
+
+
+def capture_files(path: Path) -> List[Path]:
+    """A capture file preceded by its rotated backups, oldest first."""
+    backups = sorted(
+        (p for p in path.parent.glob(path.name + ".*") if p.suffix[1:].isdigit()),
+        key=lambda p: int(p.suffix[1:]),
+        reverse=True,
+    )
+    return backups + ([path] if path.exists() else [])
+
+
+def load_capture(paths: Sequence[str], include_rotated: bool = True) -> List[CapturedRequest]:
+    """
+    Load captured requests for the known endpoints, sorted by arrival time.
+
+    Malformed lines (e.g. a line cut short by a crash) are skipped.
+    """
+    entries: List[CapturedRequest] = []
+    for raw_path in paths:
+        path = Path(raw_path)
+        for file in capture_files(path) if include_rotated else [path]:
+            with open(file, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        endpoint = entry["path"].lstrip("/")
+                        ts = float(entry["ts"])
+                    except (ValueError, KeyError, TypeError, AttributeError):
+                        continue
+                    if endpoint in ENDPOINTS and isinstance(entry.get("body"), dict):
+                        entries.append(CapturedRequest(ts, PlannedRequest(endpoint, entry["body"], False)))
+    entries.sort(key=lambda entry: entry.ts)
+    return entries
+
+
+async def replay(
+    client: httpx.AsyncClient,
+    entries: Sequence[CapturedRequest],
+    speed: Optional[float],
+    concurrency: int,
+) -> Dict[str, Any]:
+    """
+    Re-issue captured requests.
+
+    Args:
+        client: Client bound to the target
+        entries: Captured requests in arrival order
+        speed: Time compression factor, or None to send as fast as possible
+        concurrency: Maximum requests in flight
+
+    Returns:
+        Samples and per-request schedule lag (seconds)
+    """
+    samples: List[Sample] = []
+    lags: List[float] = []
+    if not entries:
+        return {"samples": samples, "lags": lags}
+
+    slots = asyncio.Semaphore(max(1, concurrency))
+    first_ts = entries[0].ts
+    start = time.perf_counter()
+
+    async def issue(client_id: int, entry: CapturedRequest, due: float):
+        # The slot was acquired by the scheduler; it is released when the request finishes
+        try:
+            lags.append(max(0.0, time.perf_counter() - due))
+            samples.append(await send_request(client, entry.request, client_id))
+        finally:
+            slots.release()
+
+    tasks = []
+    for client_id, entry in enumerate(entries):
+        due = time.perf_counter()
+        if speed:
+            due = start + (entry.ts - first_ts) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await slots.acquire()
+        tasks.append(asyncio.create_task(issue(client_id, entry, due)))
+    await asyncio.gather(*tasks)
+    return {"samples": samples, "lags": lags}
+
+
+def build_report(samples: Sequence[Sample], lags: Sequence[float], elapsed: float, config: Dict[str, Any]) -> Dict[str, Any]:
+    sorted_lags = sorted(lags)
+    return {
+        "config": config,
+        "duration_s": round(elapsed, 3),
+        "overall": summarize(samples, elapsed),
+        "endpoints": {
+            name: summarize([s for s in samples if s.endpoint == name], elapsed)
+            for name in ENDPOINTS
+            if any(s.endpoint == name for s in samples)
+        },
+        "schedule_lag_ms": {
+            "p50": round(percentile(sorted_lags, 50) * 1000, 3),
+            "p99": round(percentile(sorted_lags, 99) * 1000, 3),
+            "max": round(sorted_lags[-1] * 1000, 3) if sorted_lags else 0.0,
+        },
+    }
+
+
+async def run(
+    paths: Sequence[str],
+    speed: Optional[float],
+    concurrency: int,
+    target: Optional[str] = None,
+    fakes: Optional[LoadTestConfig] = None,
+    include_rotated: bool = True,
+) -> Dict[str, Any]:
+    """Replay capture files against ``target`` or, without one, in-process with ``fakes``."""
+    entries = load_capture(paths, include_rotated)
+    config = {
+        "files": list(paths),
+        "requests": len(entries),
+        "speed": speed or "max",
+        "concurrency": concurrency,
+        "target": target or "in-process",
+    }
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    if target:
+        async with httpx.AsyncClient(base_url=target, timeout=None, limits=limits) as client:
+            start = time.perf_counter()
+            result = await replay(client, entries, speed, concurrency)
+            elapsed = time.perf_counter() - start
+    else:
+        fakes = fakes or LoadTestConfig()
+        config["fakes"] = asdict(fakes)
+        async with benchmark_app(fakes) as env:
+            transport = httpx.ASGITransport(app=env["app"], raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=None) as client:
+                start = time.perf_counter()
+                result = await replay(client, entries, speed, concurrency)
+                elapsed = time.perf_counter() - start
+    return build_report(result["samples"], result["lags"], elapsed, config)
+
+
+def _parse_speed(value: str) -> Optional[float]:
+    if value == "max":
+        return None
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("Speed must be positive or 'max'")
+    return speed
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("captures", nargs="+", help="Capture JSONL files")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--target", help="Base URL of the API to replay against")
+    target.add_argument("--in-process", action="store_true", help="Replay against app.main.app with fakes")
+    parser.add_argument("--speed", type=_parse_speed, default=1.0,
+                        help="1 = original timing, N = N times faster, 'max' = no delays")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--no-rotated", action="store_true", help="Ignore rotated capture files")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="In-process: median fake LLM latency (s)")
+    parser.add_argument("--llm-sigma", type=float, default=0.0, help="In-process: log-normal shape")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="In-process: fake LLM failure rate")
+    parser.add_argument("--crawl-latency", type=float, default=0.0, help="In-process: fake crawl latency (s)")
+    parser.add_argument("--output", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    fakes = None
+    if args.in_process:
+        fakes = LoadTestConfig(
+            llm_latency=args.llm_latency,
+            llm_sigma=args.llm_sigma,
+            error_rate=args.error_rate,
+            crawl_latency=args.crawl_latency,
+        )
+    report = asyncio.run(run(
+        args.captures, args.speed, args.concurrency, args.target, fakes, not args.no_rotated
+    ))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
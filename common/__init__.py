@@ -0,0 +1,4 @@
+"""
+Helpers shared by the API (``app``) and the standalone agent and Redis
+server (``src``), kept free of imports from either side.
+"""
@@ -0,0 +1,107 @@
+"""
+Cache key helpers shared by the API (caching service and endpoints) and
+the agent's ``GeminiClient``.
+
+LLM cache keys are built from components rather than from the final prompt
+text: the model and generation config, the content hash of the page (computed
+once at crawl time), the normalized query and a digest of the included chat
+history. Building a key therefore costs O(query) instead of hashing the whole
+page on every request.
+"""
+
+import hashlib
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional
+
+import xxhash
+
+# Bumped whenever the key layout changes so old entries simply stop matching
+LLM_KEY_VERSION = "v2"
+
+_WHITESPACE = re.compile(r"\s+")
+# Separates key components so ("ab", "c") and ("a", "bc") hash differently
+_SEPARATOR = b"\x1f"
+
+
+def content_hash(content: str) -> str:
+    """Content address of a crawled page (SHA-256 of its markdown)."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def history_digest(turns: Iterable[Dict[str, Any]]) -> str:
+    """Stable digest of the chat turns included in a prompt ('' if none)."""
+    hasher = xxhash.xxh3_128()
+    empty = True
+    for turn in turns:
+        empty = False
+        hasher.update(str(turn.get("role", "")).encode("utf-8"))
+        hasher.update(_SEPARATOR)
+        hasher.update(str(turn.get("message", "")).encode("utf-8"))
+        hasher.update(_SEPARATOR)
+    return "" if empty else hasher.hexdigest()
+
+
+def normalize_query(query: str, collapse_whitespace: bool = True, lowercase: bool = False) -> str:
+    """
+    Normalize a user query before it becomes part of a cache key.
+
+    Args:
+        query: The raw query
+        collapse_whitespace: Strip the query and collapse whitespace runs to one space
+        lowercase: Case-fold the query
+
+    Returns:
+        The normalized query
+    """
+    if collapse_whitespace:
+        query = _WHITESPACE.sub(" ", query).strip()
+    if lowercase:
+        query = query.casefold()
+    return query
+
+
+@lru_cache(maxsize=64)
+def _model_namespace(model_name: str, config_json: str) -> bytes:
+    digest = xxhash.xxh3_64_hexdigest(f"{model_name}\x1f{config_json}")
+    return f"{LLM_KEY_VERSION}:{digest}".encode("utf-8")
+
+
+def model_namespace(model_name: str, generation_config: Optional[Dict[str, Any]] = None) -> bytes:
+    """Digest of the model and its generation config; memoized per configuration."""
+    return _model_namespace(model_name, json.dumps(generation_config or {}, sort_keys=True))
+
+
+def llm_cache_key(
+    model_name: str,
+    page_hash: str,
+    query: str,
+    history: str = "",
+    generation_config: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    LLM cache key for a question about a page.
+
+    Derived from the page's content hash rather than its URL or the full
+    prompt text, so identical pages served under different URLs share answers
+    and changing the model or its config never returns stale answers.
+
+    Args:
+        model_name: Model that generates the answer
+        page_hash: ``content_hash`` of the page markdown
+        query: The query, already passed through ``normalize_query``
+        history: ``history_digest`` of the turns included in the prompt
+        generation_config: Generation parameters affecting the answer
+
+    Returns:
+        Redis key for the LLM response
+    """
+    hasher = xxhash.xxh3_128(model_namespace(model_name, generation_config))
+    hasher.update(_SEPARATOR)
+    hasher.update(page_hash.encode("utf-8"))
+    hasher.update(_SEPARATOR)
+    hasher.update(history.encode("utf-8"))
+    hasher.update(_SEPARATOR)
+    hasher.update(query.encode("utf-8"))
+    return "llm:" + hasher.hexdigest()
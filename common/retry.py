@@ -0,0 +1,79 @@
+"""
+Deadlines and retries for calls to an LLM upstream, shared by the API's
+``app.services.resilience`` and the agent's ``GeminiClient``.
+
+Only the dependency-free part lives here: which failures are worth
+retrying, the ``CallPolicy`` parameters and ``call_with_retries``. Hedging,
+circuit breakers and metrics stay in ``app.services.resilience``.
+"""
+
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+# HTTP statuses (as reported by google.api_core exceptions) worth retrying
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a failed call may succeed when repeated."""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None)
+    if not isinstance(code, int):
+        code = getattr(error, "status_code", None)
+    return code in RETRYABLE_STATUS_CODES
+
+
+@dataclass
+class CallPolicy:
+    """Deadline, retry, hedging and circuit breaker parameters."""
+    timeout: float = 30.0
+    max_retries: int = 2
+    retry_base_delay: float = 0.5
+    retry_max_delay: float = 8.0
+    hedge_enabled: bool = False
+    hedge_min_delay: float = 1.0
+    hedge_percentile: float = 95.0
+    breaker_failure_threshold: int = 5
+    breaker_reset_timeout: float = 30.0
+
+    @classmethod
+    def from_settings(cls, settings) -> "CallPolicy":
+        return cls(
+            timeout=settings.llm_timeout,
+            max_retries=settings.llm_max_retries,
+            retry_base_delay=settings.llm_retry_base_delay,
+            retry_max_delay=settings.llm_retry_max_delay,
+            hedge_enabled=settings.llm_hedge_enabled,
+            hedge_min_delay=settings.llm_hedge_min_delay,
+            hedge_percentile=settings.llm_hedge_percentile,
+            breaker_failure_threshold=settings.llm_breaker_failure_threshold,
+            breaker_reset_timeout=settings.llm_breaker_reset_timeout,
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential delay before retry number ``attempt`` (0-based)."""
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt)))
+
+
+async def call_with_retries(factory: Callable[[], Awaitable[T]], policy: CallPolicy) -> T:
+    """
+    Run ``factory()`` with the policy's per-attempt deadline, retrying retryable failures.
+
+    Raises:
+        Exception: The last error once retries are exhausted, or a
+            non-retryable error unchanged
+    """
+    attempt = 0
+    while True:
+        try:
+            return await asyncio.wait_for(factory(), timeout=policy.timeout)
+        except Exception as e:
+            if not is_retryable(e) or attempt >= policy.max_retries:
+                raise
+        await asyncio.sleep(policy.backoff(attempt))
+        attempt += 1
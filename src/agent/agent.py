@@ -13,6 +13,12 @@ class AIAgent:
         self.gemini_client = GeminiClient(redis_api_client=self.redis_api_client)
         self.crawler = Crawler(redis_api_client=self.redis_api_client)
 
+    async def close(self):
+        """
+        Releases the pooled HTTP connections held by the Redis API client.
+        """
+        await self.redis_api_client.aclose()
+
     async def process_query(self, query: str, user_id: str) -> str:
         """
         Processes a user query, potentially involving web crawling and LLM generation.
@@ -42,14 +42,14 @@ class Crawler:
 # Example usage (for testing purposes, not part of the main application flow)
 async def main():
     # For testing, you might need to run the FastAPI server separately
-    redis_client = RedisApiClient()
-    crawler = Crawler(redis_client)
-    markdown_content = await crawler.fetch_and_extract_markdown(
-        "https://www.example.com"
-    )
-    if markdown_content:
-        print("Successfully crawled and extracted markdown.")
-        # print(markdown_content[:500]) # Print first 500 chars
+    async with RedisApiClient() as redis_client:
+        crawler = Crawler(redis_client)
+        markdown_content = await crawler.fetch_and_extract_markdown(
+            "https://www.example.com"
+        )
+        if markdown_content:
+            print("Successfully crawled and extracted markdown.")
+            # print(markdown_content[:500]) # Print first 500 chars
 
 
 if __name__ == "__main__":
@@ -1,35 +1,57 @@
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from common.cache_keys import history_digest, llm_cache_key, normalize_query
+from common.retry import CallPolicy, call_with_retries
 from src.redis_client.redis_api_client import RedisApiClient
 from src.redis_server.settings import settings
 
+MODEL_NAME = "gemini-2.0-flash"
+CACHE_PREFIX = "gemini_"
+
 
 class GeminiClient:
     """
-    A client for interacting with the Google Gemini API (gemini-2.0-flash model).
+    A client for interacting with the Google Gemini API (gemini-2.0-flash by default).
     Handles summarization, analysis, and query answering, with caching and history integration.
     """
 
-    def __init__(self, redis_api_client: RedisApiClient):
+    def __init__(self, redis_api_client: RedisApiClient, policy: CallPolicy | None = None,
+                 model_name: str = MODEL_NAME):
         genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel("gemini-2.0-flash")
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
         self.redis_api_client = redis_api_client
+        # Per-attempt deadline and retries around generate_content_async
+        self.policy = policy or CallPolicy()
+
+    @staticmethod
+    def cache_key(prompt: str, chat_history: list[dict] | None = None, model_name: str = MODEL_NAME) -> str:
+        """
+        Returns the cache key for a prompt and the chat history it is sent with.
+        Uses the app's LLM key scheme, so keys are stable across processes and
+        answers from different models never share a key.
+        """
+        return CACHE_PREFIX + llm_cache_key(
+            model_name, "", normalize_query(prompt), history_digest(chat_history or [])
+        )
 
     async def generate_content(self, prompt: str, user_id: str | None = None) -> str:
         """
         Generates content using the Gemini model, leveraging cache and chat history.
         """
+        # Retrieve chat history if user_id is provided; it is part of the cache key
+        full_prompt = prompt
+        chat_history = []
+        if user_id:
+            chat_history = await self.redis_api_client.get_chat_history(user_id)
+
         # Check cache first
-        cache_key = f"gemini_cache:{hash(prompt)}"
+        cache_key = self.cache_key(prompt, chat_history, self.model_name)
         cached_response = await self.redis_api_client.get_cache(cache_key)
         if cached_response:
             return cached_response
 
-        # Retrieve chat history if user_id is provided
-        full_prompt = prompt
-        if user_id:
-            chat_history = await self.redis_api_client.get_chat_history(user_id)
-
+        if chat_history:
             # Construct prompt with history (simple concatenation for now)
             history_str = "\n".join(
                 [f"{turn['role']}: {turn['message']}" for turn in chat_history]
@@ -37,7 +59,7 @@ class GeminiClient:
             full_prompt = f"{history_str}\nUser: {prompt}"
 
         try:
-            response = await self.model.generate_content_async(
+            response = await call_with_retries(lambda: self.model.generate_content_async(
                 full_prompt,
                 safety_settings={
                     HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
@@ -45,7 +67,7 @@ class GeminiClient:
                     HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
                     HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
                 },
-            )
+            ), self.policy)
             generated_text = response.text
 
             # Store in cache
@@ -70,12 +92,12 @@ class GeminiClient:
 async def main():
     # Ensure GEMINI_API_KEY is set in your environment or .env file
     # os.environ["GEMINI_API_KEY"] = "YOUR_API_KEY"
-    redis_client = RedisApiClient()
-    client = GeminiClient(redis_client)
-    response = await client.generate_content(
-        "Tell me a short story about a brave knight.", user_id="test_user_1"
-    )
-    print(response)
+    async with RedisApiClient() as redis_client:
+        client = GeminiClient(redis_client)
+        response = await client.generate_content(
+            "Tell me a short story about a brave knight.", user_id="test_user_1"
+        )
+        print(response)
 
 
 if __name__ == "__main__":
@@ -1,14 +1,64 @@
+import importlib.util
 import httpx
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterable, Mapping, Sequence, Union
 
 
 class RedisApiClient:
     """
     Client for interacting with the FastAPI Redis server.
+
+    Holds one pooled ``httpx.AsyncClient`` for its whole lifetime so requests
+    reuse keep-alive connections. Use it as an async context manager, or call
+    ``aclose()`` when done.
     """
 
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        batch_size: int = 1000,
+    ):
         self.base_url = base_url
+        self.batch_size = batch_size
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        # HTTP/2 needs the optional 'h2' package (httpx[http2])
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        if http2 and not self.http2:
+            print("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared pooled client, created on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the pooled client and its connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> "RedisApiClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
 
     async def set_cache(
         self, key: str, value: str, expiration: Optional[int] = None
@@ -17,61 +67,121 @@ class RedisApiClient:
         payload = {"key": key, "value": value}
         if expiration:
             payload["expiration"] = str(expiration)
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload)
-            response.raise_for_status()
-            return response.json()
+        response = await self.client.post(url, json=payload)
+        response.raise_for_status()
+        return response.json()
 
     async def get_cache(self, key: str) -> Optional[str]:
         url = f"{self.base_url}/cache/get/{key}"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            if response.status_code == 404:
-                return None
-            response.raise_for_status()
-            return response.json().get("value")
+        response = await self.client.get(url)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json().get("value")
 
     async def invalidate_cache(self, key: str) -> Dict[str, Any]:
         url = f"{self.base_url}/cache/invalidate/{key}"
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(url)
+        response = await self.client.delete(url)
+        response.raise_for_status()
+        return response.json()
+
+    def _batches(self, items: Sequence[Any]) -> Iterable[Sequence[Any]]:
+        for start in range(0, len(items), self.batch_size):
+            yield items[start:start + self.batch_size]
+
+    async def mget_cache(self, keys: Sequence[str]) -> Dict[str, Optional[str]]:
+        """
+        Gets many cache entries, one request per ``batch_size`` keys.
+        Missing keys map to None.
+        """
+        url = f"{self.base_url}/cache/mget"
+        values: Dict[str, Optional[str]] = {}
+        for batch in self._batches(list(keys)):
+            response = await self.client.post(url, json={"keys": list(batch)})
             response.raise_for_status()
-            return response.json()
+            values.update(response.json()["values"])
+        return values
+
+    async def mset_cache(
+        self,
+        entries: Union[Mapping[str, str], Sequence[Dict[str, Any]]],
+        expiration: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Sets many cache entries. ``entries`` is either a key -> value mapping
+        or a list of ``{"key", "value", "expiration"}`` dicts for per-key TTLs;
+        ``expiration`` is the default TTL for entries without their own.
+        """
+        url = f"{self.base_url}/cache/mset"
+        if isinstance(entries, Mapping):
+            entry_list = [{"key": k, "value": v} for k, v in entries.items()]
+        else:
+            entry_list = list(entries)
+        count = 0
+        for batch in self._batches(entry_list):
+            payload: Dict[str, Any] = {"entries": list(batch)}
+            if expiration:
+                payload["expiration"] = expiration
+            response = await self.client.post(url, json=payload)
+            response.raise_for_status()
+            count += response.json()["count"]
+        return {"count": count}
+
+    async def mdelete_cache(self, keys: Sequence[str]) -> Dict[str, Any]:
+        """
+        Invalidates many cache entries.
+        """
+        url = f"{self.base_url}/cache/mdelete"
+        deleted = 0
+        for batch in self._batches(list(keys)):
+            response = await self.client.post(url, json={"keys": list(batch)})
+            response.raise_for_status()
+            deleted += response.json()["deleted"]
+        return {"deleted": deleted, "requested": len(keys)}
 
     async def add_chat_turn(
         self, user_id: str, message: str, role: str
     ) -> Dict[str, Any]:
         url = f"{self.base_url}/history/add"
         payload = {"user_id": user_id, "message": message, "role": role}
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload)
-            response.raise_for_status()
-            return response.json()
+        response = await self.client.post(url, json=payload)
+        response.raise_for_status()
+        return response.json()
 
     async def get_chat_history(self, user_id: str) -> List[Dict[str, Any]]:
         url = f"{self.base_url}/history/get/{user_id}"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
+        response = await self.client.get(url)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_chat_histories(
+        self, user_ids: Sequence[str]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Gets the chat histories of many users.
+        """
+        url = f"{self.base_url}/history/get"
+        histories: Dict[str, List[Dict[str, Any]]] = {}
+        for batch in self._batches(list(user_ids)):
+            response = await self.client.post(url, json={"user_ids": list(batch)})
             response.raise_for_status()
-            return response.json()
+            histories.update(response.json())
+        return histories
 
     async def clear_chat_history(self, user_id: str) -> Dict[str, Any]:
         url = f"{self.base_url}/history/clear/{user_id}"
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(url)
-            response.raise_for_status()
-            return response.json()
+        response = await self.client.delete(url)
+        response.raise_for_status()
+        return response.json()
 
     async def health_check(self) -> Dict[str, Any]:
         url = f"{self.base_url}/health"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.json()
+        response = await self.client.get(url)
+        response.raise_for_status()
+        return response.json()
 
     async def redis_health_check(self) -> Dict[str, Any]:
         url = f"{self.base_url}/health/redis"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.json()
+        response = await self.client.get(url)
+        response.raise_for_status()
+        return response.json()
@@ -0,0 +1,81 @@
+import asyncio
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query
+from redis.asyncio.client import Redis
+from redis.exceptions import ResponseError
+from typing import Any, Dict
+
+from src.redis_server.database import get_redis_cache_client
+
+router = APIRouter()
+
+BACKUP_POLL_INTERVAL = 0.5
+
+
+def _backup_progress(persistence: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Builds a backup status report from INFO persistence.
+    Key-level progress is only reported by Redis 7+.
+    """
+    in_progress = bool(int(persistence.get("rdb_bgsave_in_progress", 0)))
+    status: Dict[str, Any] = {
+        "status": "in_progress" if in_progress else "idle",
+        "last_save_time": persistence.get("rdb_last_save_time"),
+        "last_bgsave_status": persistence.get("rdb_last_bgsave_status"),
+        "current_bgsave_seconds": persistence.get("rdb_current_bgsave_time_sec"),
+    }
+    total = int(persistence.get("current_save_keys_total", 0) or 0)
+    if in_progress and total:
+        processed = int(persistence.get("current_save_keys_processed", 0) or 0)
+        status["progress_percent"] = round(processed / total * 100, 1)
+    return status
+
+
+@router.get("/backup/status")
+async def backup_status(cache_client: Redis = Depends(get_redis_cache_client)):
+    """
+    Reports whether a background save is running and how far it got.
+    """
+    try:
+        return _backup_progress(await cache_client.info("persistence"))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get backup status: {e}")
+
+
+@router.post("/backup")
+async def create_backup(
+    wait: bool = False,
+    timeout: float = Query(25.0, gt=0, le=300),
+    cache_client: Redis = Depends(get_redis_cache_client),
+):
+    """
+    Starts a snapshot with BGSAVE, which forks and writes the RDB file in the
+    background instead of blocking Redis like SAVE. With ``wait=true`` the
+    request polls INFO persistence until the save completes or ``timeout``
+    seconds pass; otherwise poll ``/admin/backup/status``.
+    """
+    try:
+        persistence = await cache_client.info("persistence")
+        previous_save = persistence.get("rdb_last_save_time")
+        if int(persistence.get("rdb_bgsave_in_progress", 0)):
+            return {**_backup_progress(persistence), "message": "A backup is already in progress."}
+        try:
+            await cache_client.bgsave()
+        except ResponseError as e:
+            # Raised when a save or AOF rewrite started between INFO and BGSAVE
+            return {"status": "in_progress", "message": str(e)}
+
+        if not wait:
+            return {"status": "started", "started_at": time.time(), "previous_save_time": previous_save}
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(BACKUP_POLL_INTERVAL)
+            persistence = await cache_client.info("persistence")
+            progress = _backup_progress(persistence)
+            if progress["status"] == "idle" and persistence.get("rdb_last_save_time") != previous_save:
+                progress["status"] = "success" if progress["last_bgsave_status"] == "ok" else "error"
+                return progress
+        return _backup_progress(await cache_client.info("persistence"))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create backup: {e}")
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from redis.asyncio.client import Redis
 from typing import Optional
 
 from src.redis_server.database import get_redis_cache_client
+from src.redis_server.maintenance import DEFAULT_SCAN_BATCH, keyspace_info, sample_keys, scan_unlink
+from src.redis_server.models import BulkKeysRequest, BulkSetRequest
+from src.redis_server.settings import settings
 
 router = APIRouter()
 
@@ -69,6 +72,119 @@ async def invalidate_cache_entry(
         )
 
 
+@router.post("/mget")
+async def get_cache_entries(
+    request: BulkKeysRequest, cache_client: Redis = Depends(get_redis_cache_client)
+):
+    """
+    Retrieves many cache entries with a single MGET.
+    Missing keys are returned with a null value and listed under 'missing'.
+    """
+    try:
+        values = await cache_client.mget(request.keys)
+        result = dict(zip(request.keys, values))
+        missing = [key for key, value in result.items() if value is None]
+        return {"values": result, "missing": missing}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get cache entries: {e}")
+
+
+@router.post("/mset")
+async def set_cache_entries(
+    request: BulkSetRequest, cache_client: Redis = Depends(get_redis_cache_client)
+):
+    """
+    Stores many cache entries in one round trip.
+    Uses MSET when no entry expires, otherwise a non-transactional pipeline
+    of SET/SETEX so every key can carry its own expiration.
+    """
+    try:
+        entries = request.entries
+        if request.expiration is None and all(e.expiration is None for e in entries):
+            await cache_client.mset({entry.key: entry.value for entry in entries})
+        else:
+            pipe = cache_client.pipeline(transaction=False)
+            for entry in entries:
+                expiration = entry.expiration or request.expiration
+                if expiration:
+                    pipe.setex(entry.key, expiration, entry.value)
+                else:
+                    pipe.set(entry.key, entry.value)
+            await pipe.execute()
+        return {"message": f"{len(entries)} cache entries set successfully.", "count": len(entries)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to set cache entries: {e}")
+
+
+@router.post("/mdelete")
+async def invalidate_cache_entries(
+    request: BulkKeysRequest, cache_client: Redis = Depends(get_redis_cache_client)
+):
+    """
+    Invalidates many cache entries with a single UNLINK (memory is reclaimed
+    in the background, so large values do not block Redis).
+    """
+    try:
+        deleted_count = await cache_client.unlink(*request.keys)
+        return {"deleted": deleted_count, "requested": len(request.keys)}
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to invalidate cache entries: {e}"
+        )
+
+
+@router.get("/stats")
+async def get_cache_stats(
+    sample_size: int = Query(50, ge=0, le=1000),
+    cache_client: Redis = Depends(get_redis_cache_client),
+):
+    """
+    Returns cache statistics without scanning the keyspace.
+    Counts come from INFO/DBSIZE; per-key memory is estimated from
+    MEMORY USAGE on a random sample of keys. Hit/miss counters are
+    server-wide, as Redis does not track them per database.
+    """
+    try:
+        info = await cache_client.info()
+        key_count = await cache_client.dbsize()
+        samples = await sample_keys(cache_client, min(sample_size, key_count)) if key_count else {}
+        sizes = [usage for usage in samples.values() if usage]
+        avg_key_memory = sum(sizes) / len(sizes) if sizes else 0
+        hits = int(info.get("keyspace_hits", 0))
+        misses = int(info.get("keyspace_misses", 0))
+        return {
+            "keys": key_count,
+            "expires": keyspace_info(info, settings.redis_cache_db)["expires"],
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses) * 100, 2) if hits + misses else 0.0,
+            "used_memory_bytes": info.get("used_memory"),
+            "sampled_keys": len(sizes),
+            "avg_key_memory_bytes": round(avg_key_memory),
+            "estimated_memory_bytes": round(avg_key_memory * key_count),
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get cache stats: {e}")
+
+
+@router.delete("/clear")
+async def clear_cache_entries(
+    pattern: Optional[str] = None,
+    batch_size: int = Query(DEFAULT_SCAN_BATCH, ge=1, le=10000),
+    cache_client: Redis = Depends(get_redis_cache_client),
+):
+    """
+    Clears cache entries matching a glob pattern (all entries if omitted).
+    Keys are removed with incremental SCAN + UNLINK batches, so Redis
+    keeps serving other clients while a large keyspace is cleared.
+    """
+    try:
+        cleared = await scan_unlink(cache_client, pattern or "*", batch_size=batch_size)
+        return {"status": "success", "cleared": cleared, "pattern": pattern or "*"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to clear cache: {e}")
+
+
 # TODO: Integrate GPTCache for LLM response caching
 # This will likely involve a separate module that uses GPTCache and then exposes
 # its own set of endpoints or integrates directly with the existing ones.
@@ -0,0 +1,60 @@
+"""
+Removes orphaned ``gemini_cache:*`` keys from the cache database.
+
+Older versions of GeminiClient keyed responses with Python's per-process
+randomized ``hash()``, so those entries can never be read again. Run with:
+
+    python -m src.redis_server.cleanup_gemini_cache [--dry-run] [--batch-size N]
+"""
+
+import argparse
+import asyncio
+from redis.asyncio.client import Redis
+
+from src.redis_server.database import RedisClient
+from src.redis_server.maintenance import DEFAULT_SCAN_BATCH, scan_unlink
+
+# Keys written by older GeminiClient versions (``gemini_cache:{hash(prompt)}``)
+LEGACY_CACHE_PREFIX = "gemini_cache:"
+LEGACY_PATTERN = LEGACY_CACHE_PREFIX + "*"
+
+
+async def count_keys(client: Redis, pattern: str, batch_size: int = DEFAULT_SCAN_BATCH) -> int:
+    """
+    Counts keys matching a pattern with an incremental SCAN.
+    """
+    count = 0
+    async for _ in client.scan_iter(match=pattern, count=batch_size):
+        count += 1
+    return count
+
+
+async def cleanup_legacy_gemini_keys(
+    client: Redis, batch_size: int = DEFAULT_SCAN_BATCH, dry_run: bool = False
+) -> int:
+    """
+    Unlinks every legacy GeminiClient cache key in batches.
+    Returns the number of keys removed (or that would be removed on a dry run).
+    """
+    if dry_run:
+        return await count_keys(client, LEGACY_PATTERN, batch_size)
+    return await scan_unlink(client, LEGACY_PATTERN, batch_size)
+
+
+async def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_SCAN_BATCH)
+    parser.add_argument("--dry-run", action="store_true", help="Only count matching keys")
+    args = parser.parse_args(argv)
+
+    client = await RedisClient.get_cache_client()
+    try:
+        removed = await cleanup_legacy_gemini_keys(client, args.batch_size, args.dry_run)
+    finally:
+        await RedisClient.close_connections()
+    action = "Would remove" if args.dry_run else "Removed"
+    print(f"{action} {removed} keys matching '{LEGACY_PATTERN}'")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
 from redis.asyncio.client import Redis
 
 from src.redis_server.database import get_redis_cache_client, get_redis_history_client
@@ -34,3 +35,31 @@ async def redis_health_check(
             raise HTTPException(status_code=500, detail="Redis connection unhealthy.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Redis connection failed: {e}")
+
+
+@router.get("/status")
+async def health_status(
+    cache_client: Redis = Depends(get_redis_cache_client),
+    history_client: Redis = Depends(get_redis_history_client),
+):
+    """
+    Summarized health of the server and its Redis databases.
+    Always answers with a JSON body containing a 'status' field; failures
+    use HTTP 503 so callers can read the reason.
+    """
+    try:
+        cache_ok = await cache_client.ping()
+        history_ok = await history_client.ping()
+        server_info = await cache_client.info("server")
+        return {
+            "status": "ok" if cache_ok and history_ok else "error",
+            "cache_db": bool(cache_ok),
+            "history_db": bool(history_ok),
+            "redis_version": server_info.get("redis_version"),
+            "uptime_seconds": server_info.get("uptime_in_seconds"),
+        }
+    except Exception as e:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "error", "message": f"Redis connection failed: {e}"},
+        )
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from redis.asyncio.client import Redis
 from typing import List, Dict, Any
 import json
 
 from src.redis_server.database import get_redis_history_client
+from src.redis_server.maintenance import sample_keys
+from src.redis_server.models import BulkHistoryRequest
 
 router = APIRouter()
 
@@ -46,6 +48,66 @@ async def get_chat_history(
         )
 
 
+@router.post("/get")
+async def get_chat_histories(
+    request: BulkHistoryRequest,
+    history_client: Redis = Depends(get_redis_history_client),
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Retrieves the chat histories of many users in one pipelined round trip.
+    Users without history map to an empty list.
+    """
+    try:
+        pipe = history_client.pipeline(transaction=False)
+        for user_id in request.user_ids:
+            pipe.lrange(f"history:{user_id}", 0, -1)
+        results = await pipe.execute()
+        return {
+            user_id: [json.loads(turn) for turn in history_raw]
+            for user_id, history_raw in zip(request.user_ids, results)
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to retrieve chat histories: {e}"
+        )
+
+
+@router.get("/stats")
+async def get_history_stats(
+    sample_size: int = Query(50, ge=0, le=1000),
+    history_client: Redis = Depends(get_redis_history_client),
+):
+    """
+    Returns chat history statistics without scanning the keyspace.
+    The number of users comes from DBSIZE; turns per user and memory are
+    estimated from LLEN and MEMORY USAGE on a random sample of users.
+    """
+    try:
+        user_count = await history_client.dbsize()
+        samples = await sample_keys(history_client, min(sample_size, user_count)) if user_count else {}
+        turn_counts = []
+        if samples:
+            pipe = history_client.pipeline(transaction=False)
+            for key in samples:
+                pipe.llen(key)
+            turn_counts = await pipe.execute()
+        avg_turns = sum(turn_counts) / len(turn_counts) if turn_counts else 0
+        sizes = [usage for usage in samples.values() if usage]
+        avg_memory = sum(sizes) / len(sizes) if sizes else 0
+        return {
+            "total_users": user_count,
+            "sampled_users": len(turn_counts),
+            "avg_turns_per_user": round(avg_turns, 2),
+            "estimated_total_turns": round(avg_turns * user_count),
+            "avg_history_memory_bytes": round(avg_memory),
+            "estimated_memory_bytes": round(avg_memory * user_count),
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to get history stats: {e}"
+        )
+
+
 @router.delete("/clear/{user_id}")
 async def clear_chat_history(
     user_id: str, history_client: Redis = Depends(get_redis_history_client)
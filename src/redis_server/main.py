@@ -5,6 +5,7 @@ from src.redis_server.database import RedisClient
 from src.redis_server.cache_routes import router as cache_router
 from src.redis_server.history_routes import router as history_router
 from src.redis_server.health_routes import router as health_router
+from src.redis_server.admin_routes import router as admin_router
 
 
 @asynccontextmanager
@@ -30,3 +31,4 @@ app = FastAPI(
 app.include_router(cache_router, prefix="/cache", tags=["Cache Management"])
 app.include_router(history_router, prefix="/history", tags=["Chat History Management"])
 app.include_router(health_router, prefix="/health", tags=["Health Checks"])
+app.include_router(admin_router, prefix="/admin", tags=["Administration"])
@@ -0,0 +1,58 @@
+import asyncio
+from redis.asyncio.client import Redis
+from typing import Any, Dict, Optional
+
+# Keys per SCAN/UNLINK round trip; small enough that no single command blocks Redis.
+DEFAULT_SCAN_BATCH = 500
+
+
+async def scan_unlink(
+    client: Redis,
+    pattern: str = "*",
+    batch_size: int = DEFAULT_SCAN_BATCH,
+    max_keys: Optional[int] = None,
+) -> int:
+    """
+    Deletes keys matching a pattern without blocking Redis.
+    Walks the keyspace incrementally with SCAN and frees each batch with
+    UNLINK (memory is reclaimed in a background thread), yielding to the
+    event loop between batches. Returns the number of keys removed.
+    """
+    removed = 0
+    cursor = 0
+    while True:
+        cursor, keys = await client.scan(cursor=cursor, match=pattern, count=batch_size)
+        if keys:
+            if max_keys is not None:
+                keys = keys[: max_keys - removed]
+            removed += await client.unlink(*keys)
+        if cursor == 0 or (max_keys is not None and removed >= max_keys):
+            return removed
+        await asyncio.sleep(0)
+
+
+async def sample_keys(client: Redis, sample_size: int) -> Dict[str, Optional[int]]:
+    """
+    Picks up to ``sample_size`` random keys with their MEMORY USAGE.
+    Uses RANDOMKEY rather than a scan so the cost is independent of the
+    keyspace size.
+    """
+    pipe = client.pipeline(transaction=False)
+    for _ in range(sample_size):
+        pipe.randomkey()
+    keys = {key for key in await pipe.execute() if key is not None}
+    if not keys:
+        return {}
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.memory_usage(key, samples=5)
+    usages = await pipe.execute()
+    return dict(zip(keys, usages))
+
+
+def keyspace_info(info: Dict[str, Any], db: int) -> Dict[str, int]:
+    """
+    Extracts key and expiry counts for one database from INFO output.
+    """
+    db_info = info.get(f"db{db}") or {}
+    return {"keys": int(db_info.get("keys", 0)), "expires": int(db_info.get("expires", 0))}
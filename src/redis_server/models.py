@@ -0,0 +1,41 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+# Upper bound on keys per bulk request, keeping single Redis commands short.
+MAX_BATCH_SIZE = 1000
+
+
+class BulkKeysRequest(BaseModel):
+    """
+    A batch of cache keys for bulk get/delete operations.
+    """
+
+    keys: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class CacheEntry(BaseModel):
+    """
+    A single cache entry with an optional per-key expiration in seconds.
+    """
+
+    key: str
+    value: str
+    expiration: Optional[int] = Field(None, gt=0)
+
+
+class BulkSetRequest(BaseModel):
+    """
+    A batch of cache entries to store. Entries without their own expiration
+    use the request-level default, if any.
+    """
+
+    entries: List[CacheEntry] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+    expiration: Optional[int] = Field(None, gt=0)
+
+
+class BulkHistoryRequest(BaseModel):
+    """
+    A batch of user IDs whose chat histories should be fetched.
+    """
+
+    user_ids: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
@@ -0,0 +1,56 @@
+import pytest
+from fastapi.testclient import TestClient
+from redis.exceptions import ResponseError
+from src.redis_server.main import app
+
+client = TestClient(app)
+
+
+@pytest.mark.asyncio
+async def test_create_backup_starts_bgsave(override_redis_clients):
+    mock_cache_client, _ = override_redis_clients
+    mock_cache_client.info.return_value = {"rdb_bgsave_in_progress": 0, "rdb_last_save_time": 100}
+    response = client.post("/admin/backup")
+    assert response.status_code == 200
+    assert response.json()["status"] == "started"
+    mock_cache_client.bgsave.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_create_backup_waits_for_completion(override_redis_clients, monkeypatch):
+    monkeypatch.setattr("src.redis_server.admin_routes.BACKUP_POLL_INTERVAL", 0)
+    mock_cache_client, _ = override_redis_clients
+    mock_cache_client.info.side_effect = [
+        {"rdb_bgsave_in_progress": 0, "rdb_last_save_time": 100},
+        {"rdb_bgsave_in_progress": 1, "rdb_last_save_time": 100,
+         "current_save_keys_total": 10, "current_save_keys_processed": 5},
+        {"rdb_bgsave_in_progress": 0, "rdb_last_save_time": 200, "rdb_last_bgsave_status": "ok"},
+    ]
+    response = client.post("/admin/backup?wait=true")
+    assert response.status_code == 200
+    assert response.json()["status"] == "success"
+    assert response.json()["last_save_time"] == 200
+
+
+@pytest.mark.asyncio
+async def test_create_backup_already_running(override_redis_clients):
+    mock_cache_client, _ = override_redis_clients
+    mock_cache_client.info.return_value = {"rdb_bgsave_in_progress": 0}
+    mock_cache_client.bgsave.side_effect = ResponseError("Background save already in progress")
+    response = client.post("/admin/backup")
+    assert response.status_code == 200
+    assert response.json()["status"] == "in_progress"
+
+
+@pytest.mark.asyncio
+async def test_backup_status_reports_progress(override_redis_clients):
+    mock_cache_client, _ = override_redis_clients
+    mock_cache_client.info.return_value = {
+        "rdb_bgsave_in_progress": 1,
+        "current_save_keys_total": 200,
+        "current_save_keys_processed": 50,
+    }
+    response = client.get("/admin/backup/status")
+    assert response.status_code == 200
+    assert response.json()["status"] == "in_progress"
+    assert response.json()["progress_percent"] == 25.0
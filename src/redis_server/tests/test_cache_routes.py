@@ -1,4 +1,5 @@
 import pytest
+from unittest.mock import AsyncMock, MagicMock
 from fastapi.testclient import TestClient
 from src.redis_server.main import app
 
@@ -72,4 +73,105 @@ async def test_invalidate_cache_entry_not_found(override_redis_clients):
     assert response.status_code == 404
     assert response.json() == {
         "detail": "Cache entry for key 'non_existing_key' not found."
-    }
\ No newline at end of file
+    }
+
+@pytest.mark.asyncio
+async def test_mget_cache_entries(override_redis_clients):
+    mock_cache_client, _ = override_redis_clients
+    mock_cache_client.mget.return_value = ["value_a", None]
+    response = client.post("/cache/mget", json={"keys": ["a", "b"]})
+    assert response.status_code == 200
+    assert response.json() == {"values": {"a": "value_a", "b": None}, "missing": ["b"]}
+    mock_cache_client.mget.assert_called_once_with(["a", "b"])
+
+
+@pytest.mark.asyncio
+async def test_mget_rejects_empty_batch(override_redis_clients):
+    response = client.post("/cache/mget", json={"keys": []})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_mset_without_expiration_uses_mset(override_redis_clients):
+    mock_cache_client, _ = override_redis_clients
+    response = client.post(
+        "/cache/mset",
+        json={"entries": [{"key": "a", "value": "1"}, {"key": "b", "value": "2"}]},
+    )
+    assert response.status_code == 200
+    assert response.json()["count"] == 2
+    mock_cache_client.mset.assert_called_once_with({"a": "1", "b": "2"})
+
+
+@pytest.mark.asyncio
+async def test_mset_with_per_key_expiration_uses_pipeline(override_redis_clients):
+    mock_cache_client, _ = override_redis_clients
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[True, True])
+    mock_cache_client.pipeline = MagicMock(return_value=pipe)
+    response = client.post(
+        "/cache/mset",
+        json={
+            "entries": [
+                {"key": "a", "value": "1", "expiration": 60},
+                {"key": "b", "value": "2"},
+            ],
+            "expiration": 3600,
+        },
+    )
+    assert response.status_code == 200
+    mock_cache_client.pipeline.assert_called_once_with(transaction=False)
+    pipe.setex.assert_any_call("a", 60, "1")
+    pipe.setex.assert_any_call("b", 3600, "2")
+    pipe.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_mdelete_cache_entries(override_redis_clients):
+    mock_cache_client, _ = override_redis_clients
+    mock_cache_client.unlink.return_value = 1
+    response = client.post("/cache/mdelete", json={"keys": ["a", "b"]})
+    assert response.status_code == 200
+    assert response.json() == {"deleted": 1, "requested": 2}
+    mock_cache_client.unlink.assert_called_once_with("a", "b")
+
+
+@pytest.mark.asyncio
+async def test_clear_cache_scans_and_unlinks_in_batches(override_redis_clients):
+    mock_cache_client, _ = override_redis_clients
+    mock_cache_client.scan.side_effect = [(42, ["a", "b"]), (0, ["c"])]
+    mock_cache_client.unlink.side_effect = [2, 1]
+    response = client.delete("/cache/clear?pattern=crawl:*&batch_size=2")
+    assert response.status_code == 200
+    assert response.json() == {"status": "success", "cleared": 3, "pattern": "crawl:*"}
+    mock_cache_client.scan.assert_any_call(cursor=0, match="crawl:*", count=2)
+    mock_cache_client.scan.assert_any_call(cursor=42, match="crawl:*", count=2)
+    mock_cache_client.unlink.assert_any_call("a", "b")
+    mock_cache_client.unlink.assert_any_call("c")
+
+
+@pytest.mark.asyncio
+async def test_cache_stats_uses_info_and_sampling(override_redis_clients):
+    mock_cache_client, _ = override_redis_clients
+    mock_cache_client.info.return_value = {
+        "keyspace_hits": 30,
+        "keyspace_misses": 10,
+        "used_memory": 4096,
+        "db1": {"keys": 4, "expires": 3},
+    }
+    mock_cache_client.dbsize.return_value = 4
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(side_effect=[["a", "b", None, "a"], [100, 300]])
+    mock_cache_client.pipeline = MagicMock(return_value=pipe)
+
+    response = client.get("/cache/stats?sample_size=4")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["keys"] == 4
+    assert data["expires"] == 3
+    assert data["hit_rate"] == 75.0
+    assert data["sampled_keys"] == 2
+    assert data["avg_key_memory_bytes"] == 200
+    assert data["estimated_memory_bytes"] == 800
+    mock_cache_client.scan.assert_not_called()
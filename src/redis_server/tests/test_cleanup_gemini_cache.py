@@ -0,0 +1,29 @@
+import pytest
+from src.llm.gemini_client import GeminiClient
+from src.redis_server.cleanup_gemini_cache import cleanup_legacy_gemini_keys
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.mark.asyncio
+async def test_cleanup_removes_only_legacy_keys():
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    for i in range(25):
+        await client.set(f"gemini_cache:{-i * 7919}", "stale")
+    current_key = GeminiClient.cache_key("Tell me a story")
+    await client.set(current_key, "fresh")
+
+    assert await cleanup_legacy_gemini_keys(client, batch_size=10, dry_run=True) == 25
+    assert await client.dbsize() == 26
+
+    assert await cleanup_legacy_gemini_keys(client, batch_size=10) == 25
+    assert await client.keys("*") == [current_key]
+
+
+def test_gemini_cache_key_is_deterministic():
+    history = [{"role": "user", "message": "hi"}]
+    key = GeminiClient.cache_key("Tell me a story", history)
+
+    assert key == "gemini_llm:" + key.split(":", 1)[1]
+    assert key == GeminiClient.cache_key("Tell me  a story ", history)
+    assert key != GeminiClient.cache_key("Tell me a story")
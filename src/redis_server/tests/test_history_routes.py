@@ -1,4 +1,5 @@
 import pytest
+from unittest.mock import AsyncMock, MagicMock
 from fastapi.testclient import TestClient
 import json
 from src.redis_server.main import app
@@ -57,4 +58,21 @@ async def test_clear_chat_history_not_found(override_redis_clients):
     assert response.status_code == 404
     assert response.json() == {
         "detail": "Chat history for user 'non_existing_user' not found."
-    }
\ No newline at end of file
+    }
+
+@pytest.mark.asyncio
+async def test_get_chat_histories_batch(override_redis_clients):
+    _, mock_history_client = override_redis_clients
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(
+        return_value=[[json.dumps({"message": "Hello", "role": "user"})], []]
+    )
+    mock_history_client.pipeline = MagicMock(return_value=pipe)
+    response = client.post("/history/get", json={"user_ids": ["user_a", "user_b"]})
+    assert response.status_code == 200
+    assert response.json() == {
+        "user_a": [{"message": "Hello", "role": "user"}],
+        "user_b": [],
+    }
+    pipe.lrange.assert_any_call("history:user_a", 0, -1)
+    pipe.lrange.assert_any_call("history:user_b", 0, -1)
@@ -35,3 +35,22 @@ async def test_redis_health_check_failure(override_redis_clients):
     response = client.get("/health/health/redis")
     assert response.status_code == 500
     assert "Redis connection unhealthy." in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_health_status(override_redis_clients):
+    mock_cache_client, _ = override_redis_clients
+    mock_cache_client.info.return_value = {"redis_version": "7.2.0", "uptime_in_seconds": 10}
+    response = client.get("/health/status")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ok"
+    assert response.json()["redis_version"] == "7.2.0"
+
+
+@pytest.mark.asyncio
+async def test_health_status_failure(override_redis_clients):
+    mock_cache_client, _ = override_redis_clients
+    mock_cache_client.ping.side_effect = ConnectionError("refused")
+    response = client.get("/health/status")
+    assert response.status_code == 503
+    assert response.json()["status"] == "error"
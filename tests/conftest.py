@@ -1,12 +1,19 @@
+import asyncio
+import os
 import pytest
-from unittest.mock import AsyncMock, MagicMock
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# TestClient requests come from "testclient" (in-process httpx clients from
+# 127.0.0.1); trusting them lets tests pick their rate-limit bucket with X-Forwarded-For
+os.environ.setdefault("TRUSTED_PROXIES", '["testclient", "127.0.0.1", "::1"]')
+
 from app.main import app
 from app.api.endpoints import (
     get_llm_provider,
     get_gptcache_service,
     get_history_service,
 )
-import os
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field, model_validator
 from redis import from_url
@@ -45,6 +52,66 @@ def settings():
     return TestSettings()
 
 
+@pytest.fixture
+def make_settings():
+    """
+    Builds application Settings with field overrides.
+    """
+    from app.core.config import Settings
+    return lambda **overrides: Settings(**overrides)
+
+
+@pytest.fixture
+def cache_service(settings):
+    """
+    Provides a SimpleCacheService backed by an in-memory fakeredis.
+    """
+    fakeredis = pytest.importorskip("fakeredis")
+    from app.services.simple_caching import SimpleCacheService
+
+    fake_redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    with patch("app.services.simple_caching.redis.from_url", return_value=fake_redis):
+        yield SimpleCacheService(settings)
+
+
+class FakeClock:
+    """Clock for services that take one; tests move it by setting ``now``."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+class ConcurrencyProbe:
+    """Counts calls made through it and the peak number running at once."""
+
+    def __init__(self):
+        self.active = self.peak = self.calls = 0
+
+    @asynccontextmanager
+    async def call(self, hold: float = 0.01):
+        self.active += 1
+        self.calls += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(hold)
+            yield
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture
+def concurrency_probe():
+    return ConcurrencyProbe()
+
+
 @pytest.fixture
 def override_dependencies():
     """
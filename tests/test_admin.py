@@ -6,43 +6,49 @@ import pytest
 from unittest.mock import AsyncMock, patch
 from fastapi.testclient import TestClient
 
+from app.api.dependencies import get_redis_client
+from app.main import app
+
+
+@pytest.fixture
+def mock_redis_client(override_dependencies):
+    """Replaces the container's RedisServerClient for admin routes."""
+    client = AsyncMock()
+    app.dependency_overrides[get_redis_client] = lambda: client
+    return client
+
 
 @pytest.mark.asyncio
-async def test_detailed_health_check(test_client, override_dependencies):
+async def test_detailed_health_check(test_client, mock_redis_client):
     """Test the detailed health check endpoint."""
-    with patch("app.api.admin.RedisServerClient") as mock_redis_client_class:
-        mock_redis_client = AsyncMock()
-        mock_redis_client_class.return_value = mock_redis_client
-        mock_redis_client.health_check.return_value = {"status": "ok"}
-        
-        response = test_client.get("/admin/health/detailed")
-        
-        assert response.status_code == 200
-        data = response.json()
-        assert "timestamp" in data
-        assert "app_name" in data
-        assert "app_version" in data
-        assert "status" in data
-        assert "components" in data
+    mock_redis_client.health_check.return_value = {"status": "ok"}
+    
+    response = test_client.get("/admin/health/detailed")
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert "timestamp" in data
+    assert "app_name" in data
+    assert "app_version" in data
+    assert "status" in data
+    assert "components" in data
+    assert data["components"]["redis_circuit_breaker"]["state"] == "closed"
 
 
 @pytest.mark.asyncio
-async def test_get_system_stats(test_client, override_dependencies):
+async def test_get_system_stats(test_client, mock_redis_client):
     """Test the system stats endpoint."""
-    with patch("app.api.admin.RedisServerClient") as mock_redis_client_class:
-        mock_redis_client = AsyncMock()
-        mock_redis_client_class.return_value = mock_redis_client
-        mock_redis_client.get_cache_stats.return_value = {"cache_hits": 100}
-        mock_redis_client.get_history_stats.return_value = {"total_users": 10}
-        
-        response = test_client.get("/admin/stats/system")
-        
-        assert response.status_code == 200
-        data = response.json()
-        assert "timestamp" in data
-        assert "cache" in data
-        assert "history" in data
-        assert "configuration" in data
+    mock_redis_client.get_cache_stats.return_value = {"cache_hits": 100}
+    mock_redis_client.get_history_stats.return_value = {"total_users": 10}
+    
+    response = test_client.get("/admin/stats/system")
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert "timestamp" in data
+    assert "cache" in data
+    assert "history" in data
+    assert "configuration" in data
 
 
 @pytest.mark.asyncio
@@ -61,33 +67,27 @@ async def test_get_configuration(test_client, override_dependencies):
 
 
 @pytest.mark.asyncio
-async def test_clear_cache(test_client, override_dependencies):
+async def test_clear_cache(test_client, mock_redis_client):
     """Test the cache clear endpoint."""
-    with patch("app.api.admin.RedisServerClient") as mock_redis_client_class:
-        mock_redis_client = AsyncMock()
-        mock_redis_client_class.return_value = mock_redis_client
-        mock_redis_client.clear_cache.return_value = {"status": "success", "cleared": 10}
-        
-        response = test_client.post("/admin/cache/clear")
-        
-        assert response.status_code == 200
-        data = response.json()
-        assert "status" in data
+    mock_redis_client.clear_cache.return_value = {"status": "success", "cleared": 10}
+    
+    response = test_client.post("/admin/cache/clear")
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert "status" in data
 
 
 @pytest.mark.asyncio
-async def test_create_backup(test_client, override_dependencies):
+async def test_create_backup(test_client, mock_redis_client):
     """Test the backup creation endpoint."""
-    with patch("app.api.admin.RedisServerClient") as mock_redis_client_class:
-        mock_redis_client = AsyncMock()
-        mock_redis_client_class.return_value = mock_redis_client
-        mock_redis_client.backup_data.return_value = {"status": "success", "backup_id": "backup_123"}
-        
-        response = test_client.post("/admin/backup/create")
-        
-        assert response.status_code == 200
-        data = response.json()
-        assert "status" in data
+    mock_redis_client.backup_data.return_value = {"status": "success", "backup_id": "backup_123"}
+    
+    response = test_client.post("/admin/backup/create")
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert "status" in data
 
 
 @pytest.mark.asyncio
@@ -105,7 +105,7 @@ async def test_test_cag_pipeline(test_client, override_dependencies):
     mock_history_service.clear_history = AsyncMock()
     
     # Mock the GPTCacheService constructor to avoid Redis connection
-    with patch("app.api.admin.GPTCacheService") as mock_gptcache_class:
+    with patch("app.services.caching.GPTCacheService") as mock_gptcache_class:
         mock_gptcache_class.return_value = mock_cache_service
         
         response = test_client.post("/admin/test/cag")
@@ -115,4 +115,70 @@ async def test_test_cag_pipeline(test_client, override_dependencies):
         assert "timestamp" in data
         assert "tests" in data
         assert "cache" in data["tests"]
-        assert "history" in data["tests"]
\ No newline at end of file
+        assert "history" in data["tests"]
+
+@pytest.mark.asyncio
+async def test_invalidate_domain(test_client, override_dependencies):
+    """Test cascading invalidation by domain."""
+    _, mock_cache_service, _ = override_dependencies
+    mock_cache_service.invalidate_domain = AsyncMock(
+        return_value={"urls": 2, "crawl_entries": 2, "llm_entries": 5}
+    )
+
+    response = test_client.post("/admin/cache/invalidate/domain?domain=example.com")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["llm_entries"] == 5
+    mock_cache_service.invalidate_domain.assert_awaited_once_with("example.com")
+
+@pytest.mark.asyncio
+async def test_invalidate_returns_503_while_redis_is_unavailable(test_client, override_dependencies):
+    """Test that invalidation reports an unavailable Redis instead of failing with 500."""
+    from redis.exceptions import ConnectionError as RedisConnectionError
+    from app.services.resilience import CircuitOpenError
+
+    _, mock_cache_service, _ = override_dependencies
+    mock_cache_service.invalidate_url = AsyncMock(side_effect=CircuitOpenError("redis circuit breaker is open"))
+    mock_cache_service.invalidate_prefix = AsyncMock(side_effect=RedisConnectionError("refused"))
+
+    assert test_client.post("/admin/cache/invalidate/url?url=https://example.com/a").status_code == 503
+    assert test_client.post("/admin/cache/invalidate/prefix?prefix=https://example.com/docs/").status_code == 503
+
+@pytest.mark.asyncio
+async def test_warm_cache_registers_valid_urls(test_client, override_dependencies):
+    """Test bulk registration of URLs for pre-crawling."""
+    from app.api.dependencies import get_cache_warmer
+
+    warmer = AsyncMock()
+    app.dependency_overrides[get_cache_warmer] = lambda: warmer
+
+    response = test_client.post("/admin/cache/warm", json={"urls": [
+        "https://example.com/a", "https://example.com/a", "http://localhost/admin",
+    ]})
+
+    assert response.status_code == 202
+    data = response.json()
+    assert data["registered"] == 1
+    assert [r["url"] for r in data["rejected"]] == ["http://localhost/admin"]
+    warmer.register.assert_awaited_once_with(["https://example.com/a"])
+
+
+@pytest.mark.asyncio
+async def test_popularity_top_reports_requests_and_unique_users(test_client, override_dependencies):
+    """Test the heavy hitters endpoint."""
+    from app.core.monitoring import popularity
+
+    _, mock_cache_service, _ = override_dependencies
+    mock_cache_service.unique_users = AsyncMock(return_value=[2])
+    popularity.reset()
+    popularity.record("https://example.com/a", "query")
+    popularity.record("https://example.com/a", "query")
+
+    response = test_client.get("/admin/popularity/top?dimension=url&limit=5")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["items"] == [{"key": "https://example.com/a", "count": 2, "unique_users": 2}]
+    assert data["events"] == 2
+    assert test_client.get("/admin/popularity/top?dimension=user").status_code == 400
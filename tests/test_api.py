@@ -22,6 +22,24 @@ async def test_crawl_endpoint(test_client, override_dependencies):
         mock_crawl.assert_called_once_with("https://example.com", use_cache=True)
 
 
+@pytest.mark.asyncio
+async def test_crawl_rejects_urls_disallowed_by_robots(test_client, override_dependencies):
+    from app.services.crawl_scheduler import CrawlDisallowedError, HostResolutionError
+
+    with patch("app.services.crawler.CrawlerService.crawl_with_metadata", new_callable=AsyncMock) as mock_crawl:
+        mock_crawl.side_effect = CrawlDisallowedError("disallowed")
+        response = test_client.post(
+            "/crawl", json={"url": "https://example.com/private"}, headers={"X-Forwarded-For": "robots-test"}
+        )
+        assert response.status_code == 403
+
+        mock_crawl.side_effect = HostResolutionError("unresolvable")
+        response = test_client.post(
+            "/crawl", json={"url": "https://example.com/private"}, headers={"X-Forwarded-For": "robots-test"}
+        )
+        assert response.status_code == 502
+
+
 @pytest.mark.asyncio
 async def test_generate_endpoint_no_cache(test_client, override_dependencies):
     mock_llm_provider_instance, mock_gptcache_service_instance, _ = override_dependencies
@@ -39,8 +57,10 @@ async def test_generate_endpoint_no_cache(test_client, override_dependencies):
     response_data = response.json()
     assert response_data["text"] == "test content"
     assert response_data["cached"] == False
-    mock_gptcache_service_instance.get_llm_response.assert_called_once_with("This is a valid test prompt for testing")
-    mock_gptcache_service_instance.set_llm_response.assert_awaited_once_with("This is a valid test prompt for testing", "test content")
+    assert response_data["model"] == "gemini-2.0-flash"
+    cache_key = mock_gptcache_service_instance.get_llm_response.call_args.kwargs["cache_key"]
+    mock_gptcache_service_instance.get_llm_response.assert_called_once_with("This is a valid test prompt for testing", cache_key=cache_key)
+    mock_gptcache_service_instance.set_llm_response.assert_awaited_once_with("This is a valid test prompt for testing", "test content", cache_key=cache_key)
 
 
 @pytest.mark.asyncio
@@ -122,3 +142,169 @@ async def test_cag_endpoint(test_client, override_dependencies):
         mock_llm_provider_instance.generate_content.assert_called_once()
         mock_history_service_instance.add_turn.assert_any_call("test_user", "What is this page about and what does it contain?", "user")
         mock_history_service_instance.add_turn.assert_any_call("test_user", "Based on the content, here is the answer to your query.", "assistant")
+
+
+@pytest.mark.asyncio
+async def test_cag_llm_cache_key_ignores_query_whitespace(test_client, override_dependencies):
+    """Queries differing only in whitespace use the same LLM cache key"""
+    mock_llm_provider_instance, mock_gptcache_service_instance, _ = override_dependencies
+    mock_llm_provider_instance.generate_content.return_value = "answer"
+
+    with patch("app.services.crawler.CrawlerService.crawl_with_metadata", new_callable=AsyncMock) as mock_crawl:
+        mock_crawl.return_value = {"markdown": "# Page", "timestamp": 1, "status_code": 200}
+        for query in ("What is this page about?", "  What is this   page about? "):
+            response = test_client.post("/cag", json={"url": "https://example.com", "query": query})
+            assert response.status_code == 200
+
+    keys = [call.kwargs["cache_key"] for call in mock_gptcache_service_instance.get_llm_response.call_args_list]
+    assert len(keys) == 2 and keys[0] == keys[1]
+
+
+@pytest.mark.asyncio
+async def test_cag_serves_stale_answer_when_llm_unavailable(test_client, override_dependencies):
+    from app.services.resilience import LLMCircuitOpenError
+
+    mock_llm_provider_instance, mock_gptcache_service_instance, _ = override_dependencies
+    mock_llm_provider_instance.generate_content.side_effect = LLMCircuitOpenError("open")
+    mock_gptcache_service_instance.get_stale_llm_response = AsyncMock(return_value="stale answer")
+
+    with patch("app.services.crawler.CrawlerService.crawl_with_metadata", new_callable=AsyncMock) as mock_crawl:
+        mock_crawl.return_value = {"markdown": "# Page", "timestamp": 1, "status_code": 200}
+        response = test_client.post("/cag", json={"url": "https://example.com", "query": "What is this page about?"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["response"] == "stale answer"
+    assert data["llm_cached"] and data["llm_stale"]
+    mock_gptcache_service_instance.set_llm_response.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_generate_returns_503_when_llm_unavailable_without_stale_answer(test_client, override_dependencies):
+    from app.services.resilience import LLMUnavailableError
+
+    mock_llm_provider_instance, mock_gptcache_service_instance, _ = override_dependencies
+    mock_llm_provider_instance.generate_content.side_effect = LLMUnavailableError("timed out")
+    mock_gptcache_service_instance.get_stale_llm_response = AsyncMock(return_value=None)
+
+    response = test_client.post("/generate", json={"prompt": "This is a valid test prompt for testing"})
+
+    assert response.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_cag_records_routed_model_in_key_and_response(test_client, override_dependencies):
+    from app.api.dependencies import get_llm_provider
+    from app.core.config import Settings
+    from app.main import app
+    from app.services.llm_router import LLMRouter
+
+    _, mock_gptcache_service_instance, _ = override_dependencies
+    router = LLMRouter.from_settings(Settings(llm_backends=[
+        {"name": "small", "provider": "local", "model": "local-small", "max_prompt_tokens": 200},
+        {"name": "large", "provider": "local", "model": "local-large"},
+    ]))
+    app.dependency_overrides[get_llm_provider] = lambda: router
+
+    models = []
+    with patch("app.services.crawler.CrawlerService.crawl_with_metadata", new_callable=AsyncMock) as mock_crawl:
+        for markdown in ("# Short page", "# Long page\n" + "text " * 2000):
+            mock_crawl.return_value = {"markdown": markdown, "timestamp": 1, "status_code": 200}
+            response = test_client.post(
+                "/cag",
+                json={"url": "https://example.com", "query": "What is this page about?"},
+                headers={"X-Forwarded-For": "router-test"},
+            )
+            assert response.status_code == 200
+            models.append(response.json()["model"])
+
+    assert models == ["local-small", "local-large"]
+    keys = [call.kwargs["cache_key"] for call in mock_gptcache_service_instance.set_llm_response.call_args_list]
+    assert len(set(keys)) == 2
+
+
+@pytest.mark.asyncio
+async def test_cag_answers_large_pages_from_cached_context(test_client, override_dependencies):
+    from app.api.dependencies import get_llm_provider, get_settings
+    from app.core.config import Settings
+    from app.main import app
+    from app.services.llm_router import LLMRouter
+
+    _, mock_gptcache_service_instance, _ = override_dependencies
+    settings = Settings(
+        llm_backends=[{"name": "local", "provider": "local", "model": "local-echo"}],
+        llm_context_cache_enabled=True,
+        llm_context_cache_min_tokens=1000,
+    )
+    router = LLMRouter.from_settings(settings)
+    app.dependency_overrides[get_llm_provider] = lambda: router
+    app.dependency_overrides[get_settings] = lambda: settings
+    mock_gptcache_service_instance.get_context_handle = AsyncMock(return_value=None)
+    mock_gptcache_service_instance.set_context_handle = AsyncMock()
+
+    markdown = "# Long page\n" + "text " * 2000
+    with patch("app.services.crawler.CrawlerService.crawl_with_metadata", new_callable=AsyncMock) as mock_crawl:
+        mock_crawl.return_value = {"markdown": markdown, "timestamp": 1, "status_code": 200}
+        response = test_client.post(
+            "/cag",
+            json={"url": "https://example.com", "query": "What is this page about?"},
+            headers={"X-Forwarded-For": "context-cache-test"},
+        )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["llm_context_cached"] is True
+    assert f"cached context: {len(markdown)} characters" in data["response"]
+    handle = mock_gptcache_service_instance.set_context_handle.call_args
+    assert handle.args[1] == "local-echo"
+
+
+@pytest.mark.asyncio
+async def test_cag_digest_mode_sends_digest_and_relevant_sections(test_client, override_dependencies):
+    from app.api.dependencies import get_settings
+    from app.core.config import Settings
+    from app.main import app
+
+    mock_llm_provider_instance, mock_gptcache_service_instance, _ = override_dependencies
+    settings = Settings(page_digest_enabled=True)
+    app.dependency_overrides[get_settings] = lambda: settings
+    mock_gptcache_service_instance.get_page_digest = AsyncMock(return_value=None)
+    mock_gptcache_service_instance.set_page_digest = AsyncMock()
+    mock_llm_provider_instance.generate_content = AsyncMock(return_value="Mocked summary")
+
+    markdown = "# Setup\n\n" + "install steps " * 300 + "\n\n# Pricing\n\n" + "plans and prices " * 300
+    with patch("app.services.crawler.CrawlerService.crawl_with_metadata", new_callable=AsyncMock) as mock_crawl:
+        mock_crawl.return_value = {"markdown": markdown, "timestamp": 1, "status_code": 200}
+        response = test_client.post(
+            "/cag",
+            json={"url": "https://example.com", "query": "What are the prices?", "prompt_mode": "digest"},
+            headers={"X-Forwarded-For": "digest-test"},
+        )
+
+    assert response.status_code == 200
+    assert response.json()["prompt_mode"] == "digest"
+    mock_gptcache_service_instance.set_page_digest.assert_awaited_once()
+    final_prompt = mock_llm_provider_instance.generate_content.call_args.args[0]
+    assert "Section summaries:" in final_prompt
+    assert "plans and prices" in final_prompt
+    assert "install steps" not in final_prompt
+
+
+@pytest.mark.asyncio
+async def test_cag_digest_mode_sends_full_page_while_digests_are_disabled(test_client, override_dependencies):
+    mock_llm_provider_instance, mock_gptcache_service_instance, _ = override_dependencies
+    mock_gptcache_service_instance.set_page_digest = AsyncMock()
+    mock_llm_provider_instance.generate_content = AsyncMock(return_value="Mocked answer")
+
+    with patch("app.services.crawler.CrawlerService.crawl_with_metadata", new_callable=AsyncMock) as mock_crawl:
+        mock_crawl.return_value = {"markdown": "# Page\n\n" + "text " * 3000, "timestamp": 1, "status_code": 200}
+        response = test_client.post(
+            "/cag",
+            json={"url": "https://example.com", "query": "What is this?", "prompt_mode": "digest"},
+            headers={"X-Forwarded-For": "digest-disabled-test"},
+        )
+
+    assert response.status_code == 200
+    assert response.json()["prompt_mode"] == "full"
+    mock_gptcache_service_instance.set_page_digest.assert_not_awaited()
+    assert mock_llm_provider_instance.generate_content.await_count == 1
@@ -0,0 +1,29 @@
+from common.cache_keys import history_digest, llm_cache_key, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  What   is\n CAG? ") == "What is CAG?"
+    assert normalize_query("What  is CAG?", collapse_whitespace=False) == "What  is CAG?"
+    assert normalize_query("What is CAG?", lowercase=True) == "what is cag?"
+
+
+def test_history_digest_is_stable_and_empty_for_no_turns():
+    turns = [{"role": "user", "message": "hi"}, {"role": "assistant", "message": "hello"}]
+    assert history_digest([]) == ""
+    assert history_digest(turns) == history_digest(list(turns))
+    assert history_digest(turns) != history_digest(turns[:1])
+
+
+def test_llm_cache_key_components():
+    base = llm_cache_key("gemini-2.0-flash", "abc", "what is it?")
+
+    assert base == llm_cache_key("gemini-2.0-flash", "abc", "what is it?", generation_config={})
+    assert base.startswith("llm:")
+    assert base != llm_cache_key("gemini-1.5-pro", "abc", "what is it?")
+    assert base != llm_cache_key("gemini-2.0-flash", "abd", "what is it?")
+    assert base != llm_cache_key("gemini-2.0-flash", "abc", "what is it?", history="h")
+    assert base != llm_cache_key("gemini-2.0-flash", "abc", "what is it?", generation_config={"temperature": 0.2})
+
+
+def test_llm_cache_key_separates_components():
+    assert llm_cache_key("m", "ab", "c") != llm_cache_key("m", "a", "bc")
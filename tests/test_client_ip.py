@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+from app.core.client_ip import TrustedProxies
+
+
+def _request(peer, **headers):
+    return SimpleNamespace(client=SimpleNamespace(host=peer) if peer else None, headers=headers)
+
+
+def test_untrusted_peer_ignores_forwarding_headers():
+    proxies = TrustedProxies(["127.0.0.1"])
+    request = _request("203.0.113.7", **{"X-Forwarded-For": "1.2.3.4", "X-Real-IP": "5.6.7.8"})
+
+    assert proxies.client_ip(request) == "203.0.113.7"
+    assert proxies.client_ip(_request(None)) == "unknown"
+
+
+def test_trusted_peer_uses_right_most_untrusted_hop():
+    proxies = TrustedProxies(["10.0.0.0/8", "::1"])
+
+    # The client-supplied left-most entry is not believed
+    request = _request("10.0.0.2", **{"X-Forwarded-For": "6.6.6.6, 198.51.100.4, 10.0.0.9"})
+    assert proxies.client_ip(request) == "198.51.100.4"
+    assert proxies.client_ip(_request("::1", **{"X-Real-IP": "198.51.100.5"})) == "198.51.100.5"
+    assert proxies.client_ip(_request("10.1.2.3")) == "10.1.2.3"
+
+
+def test_trust_all_and_named_peers():
+    assert TrustedProxies(["*"]).client_ip(_request("203.0.113.7", **{"X-Forwarded-For": "1.2.3.4"})) == "1.2.3.4"
+    proxies = TrustedProxies(["testclient"])
+    assert proxies.client_ip(_request("testclient", **{"X-Forwarded-For": "bucket-a"})) == "bucket-a"
@@ -0,0 +1,43 @@
+"""
+Tests for the application-scoped service container.
+"""
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.config import get_settings
+from app.core.container import ServiceContainer
+
+
+def test_services_are_built_once():
+    container = ServiceContainer(get_settings())
+
+    assert container.cache is container.cache
+    assert container.history is container.history
+    assert container.crawler.cache_service is container.cache
+    assert container.trusted_proxies is container.trusted_proxies
+
+
+@pytest.mark.asyncio
+async def test_aclose_closes_built_services_only():
+    container = ServiceContainer(get_settings())
+    cache = container.cache
+    cache.aclose = AsyncMock()
+
+    await container.aclose()
+
+    cache.aclose.assert_awaited_once()
+    assert "history" not in container._services
+    assert container.cache is not cache
+
+
+def test_requests_share_the_lifespan_container(test_client):
+    container = test_client.app.state.container
+    container.settings.app_name = "shared-settings"
+
+    first = test_client.get("/admin/config").json()
+    second = test_client.get("/admin/config").json()
+
+    assert first["app_name"] == second["app_name"] == "shared-settings"
+    assert test_client.app.state.container is container
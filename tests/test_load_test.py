@@ -0,0 +1,28 @@
+import pytest
+from benchmarks.load_test import LoadTestConfig, build_plan, run
+
+pytest.importorskip("fakeredis")
+
+
+def test_build_plan_respects_cache_hit_ratio():
+    config = LoadTestConfig(requests=2000, cache_hit_ratio=0.75, hot_set_size=5)
+    urls = [f"https://bench.example.com/page-{i}" for i in range(10)]
+
+    warmup, plan = build_plan(config, urls)
+
+    assert len(warmup) == 15
+    assert abs(sum(request.hot for request in plan) / len(plan) - 0.75) < 0.05
+    assert {request.endpoint for request in plan} == {"crawl", "generate", "cag"}
+
+
+@pytest.mark.asyncio
+async def test_load_test_reports_percentiles_and_hits():
+    config = LoadTestConfig(requests=40, concurrency=4, cache_hit_ratio=1.0, hot_set_size=2, corpus_pages=3, page_kb=1)
+
+    report = await run(config)
+
+    assert report["overall"]["requests"] == 40
+    assert report["overall"]["errors"] == 0
+    assert report["overall"]["cache_hit_rate"] == 1.0
+    assert report["backend_calls"] == {"llm": 0, "crawl": 0}
+    assert set(report["overall"]["latency_ms"]) >= {"p50", "p95", "p99"}
@@ -0,0 +1,47 @@
+import logging
+import queue
+from app.core.logging_config import AccessLogSampler, JsonFormatter, NonBlockingQueueHandler
+
+
+def _record(msg="hello %s", args=("world",), level=logging.INFO, name="app.access"):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_queue_handler_defers_formatting_of_immutable_args():
+    handler = NonBlockingQueueHandler(queue.Queue())
+    record = handler.prepare(_record())
+    assert record.msg == "hello %s"
+    assert record.args == ("world",)
+
+
+def test_queue_handler_formats_mutable_args_eagerly():
+    handler = NonBlockingQueueHandler(queue.Queue())
+    record = handler.prepare(_record(args=(["mutable"],)))
+    assert record.msg == "hello ['mutable']"
+    assert record.args is None
+
+
+def test_queue_handler_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(_record())
+    handler.handle(_record())
+    assert handler.dropped == 1
+
+
+def test_access_log_sampler_keeps_burst_then_samples():
+    sampler = AccessLogSampler(burst=10, sample_rate=0.25)
+    passed = sum(sampler.filter(_record()) for _ in range(50))
+    assert passed == 10 + 10
+    assert sampler.sampled_out == 30
+    assert sampler.filter(_record(level=logging.WARNING))
+
+
+def test_json_formatter_includes_extra_fields():
+    import json
+
+    record = _record()
+    record.request_id = "abc"
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["message"] == "hello world"
+    assert payload["logger"] == "app.access"
+    assert payload["request_id"] == "abc"
@@ -0,0 +1,27 @@
+import pytest
+from dataclasses import replace
+from benchmarks.microbench import CASES, compare, run
+
+pytest.importorskip("fakeredis")
+
+
+def test_compare_flags_regressions_and_improvements():
+    baseline = {"results": {"a": {"median_us": 10.0}, "b": {"median_us": 10.0}, "c": {"median_us": 10.0}}}
+    results = {name: {"median_us": value} for name, value in
+               {"a": 10.5, "b": 14.0, "c": 5.0, "d": 1.0}.items()}
+
+    report = compare(results, baseline, threshold=0.25)
+
+    assert {name: entry["status"] for name, entry in report.items()} == {
+        "a": "ok", "b": "regression", "c": "improved", "d": "new",
+    }
+
+
+@pytest.mark.asyncio
+async def test_cases_run_against_fakeredis():
+    cheap = [replace(case, number=1) for case in CASES if "100000" not in case.name]
+
+    results = await run(cheap, repeats=1)
+
+    assert set(results) == {case.name for case in cheap}
+    assert all(result["median_us"] > 0 for result in results.values())
@@ -0,0 +1,145 @@
+import pytest
+from app.core.monitoring import ApplicationMonitor, CountMinSketch, HeavyHitters, LatencyHistogram, PopularityTracker
+
+
+def test_histogram_percentiles_within_relative_error():
+    histogram = LatencyHistogram()
+    for i in range(1, 1001):
+        histogram.record(i / 1000)  # 1ms .. 1s
+
+    assert histogram.count == 1000
+    for percent, expected in [(50, 0.5), (95, 0.95), (99, 0.99)]:
+        value = histogram.percentile(percent)
+        assert abs(value - expected) / expected < 1 / LatencyHistogram.SUB_BUCKET_COUNT
+
+
+def test_histogram_bucket_bounds_contain_value():
+    for duration in [0.0, 0.00004, 0.0123, 1.5, 42.0]:
+        lower, upper = LatencyHistogram.bucket_bounds(LatencyHistogram.bucket_index(duration))
+        assert lower <= duration < upper
+
+
+def test_histogram_merge_and_round_trip():
+    first, second = LatencyHistogram(), LatencyHistogram()
+    for _ in range(90):
+        first.record(0.01)
+    for _ in range(10):
+        second.record(2.0)
+
+    restored = LatencyHistogram.from_dict(second.to_dict())
+    first.merge(restored)
+
+    assert first.count == 100
+    assert first.min == 0.01
+    assert first.max == 2.0
+    assert first.percentile(50) == pytest.approx(0.01, rel=0.05)
+    assert first.percentile(99) == pytest.approx(2.0, rel=0.05)
+
+
+def test_monitor_reports_percentiles_and_stages():
+    monitor = ApplicationMonitor()
+    for i in range(100):
+        monitor.record_request("cag", 0.1 + i / 1000)
+    monitor.record_stage("cag.crawl", 0.05)
+    monitor.record_cache_hit("llm")
+
+    metrics = monitor.get_metrics(percentiles=[50, 99.9])
+    endpoint = metrics["metrics"]["endpoint_cag"]
+    assert endpoint["count"] == 100
+    assert "p50" in endpoint and "p99_9" in endpoint
+    assert metrics["metrics"]["stage_cag.crawl"]["count"] == 1
+    assert metrics["metrics"]["cache_hit_llm"] == {"count": 1}
+
+
+def test_recent_average_follows_latest_samples():
+    monitor = ApplicationMonitor()
+    for _ in range(500):
+        monitor.record_request("cag", 1.0)
+    for _ in range(500):
+        monitor.record_request("cag", 0.1)
+
+    endpoint = monitor.get_metrics()["metrics"]["endpoint_cag"]
+    assert endpoint["avg_time"] == pytest.approx(0.55, abs=0.01)
+    assert endpoint["recent_avg_time"] == pytest.approx(0.1, abs=0.01)
+
+
+def test_monitor_merges_worker_snapshots():
+    worker_a, worker_b = ApplicationMonitor(), ApplicationMonitor()
+    worker_a.record_request("crawl", 0.2)
+    worker_b.record_request("crawl", 0.4)
+
+    worker_a.merge_histogram_snapshot(worker_b.get_histogram_snapshot())
+
+    assert worker_a.get_metrics()["metrics"]["endpoint_crawl"]["count"] == 2
+
+
+def test_metrics_endpoint_percentile_query(test_client):
+    response = test_client.get("/admin/metrics?percentiles=50,90")
+    assert response.status_code == 200
+
+    response = test_client.get("/admin/metrics?percentiles=abc")
+    assert response.status_code == 400
+
+
+def test_per_thread_recording_is_aggregated_on_read():
+    import threading
+
+    monitor = ApplicationMonitor()
+    handle = monitor.request_handle("crawl")
+
+    def worker():
+        for _ in range(1000):
+            handle.record(0.01)
+        monitor.record_cache_hit("crawl")
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    metrics = monitor.get_metrics()
+    assert metrics["metrics"]["endpoint_crawl"]["count"] == 4000
+    assert metrics["cache_stats"]["crawl_cache"]["hits"] == 4
+    assert metrics["total_requests"] == 4000
+
+    monitor.reset_metrics()
+    handle.record(0.02)
+    assert monitor.get_metrics()["metrics"]["endpoint_crawl"]["count"] == 1
+
+
+def test_count_min_sketch_never_undercounts_and_stays_close():
+    sketch = CountMinSketch(width=512, depth=4)
+    true_counts = {f"key{i}": (i % 50) + 1 for i in range(2000)}
+    for key, count in true_counts.items():
+        sketch.add(key, count)
+
+    errors = [sketch.estimate(key) - count for key, count in true_counts.items()]
+    assert min(errors) >= 0
+    # e / width of the stream is the per-key error bound (exceeded with probability exp(-depth))
+    bound = 2.72 / 512 * sketch.total
+    assert sum(e > bound for e in errors) / len(errors) < 0.05
+    assert sketch.memory_bytes == 512 * 4 * 8
+
+
+def test_heavy_hitters_find_the_most_frequent_keys():
+    hitters = HeavyHitters(k=5, width=1024, depth=4)
+    for i in range(3000):
+        hitters.add(f"rare{i}")
+        if i % 3 == 0:
+            hitters.add(f"hot{i % 4}")
+
+    assert {key for key, _ in hitters.top(4)} == {"hot0", "hot1", "hot2", "hot3"}
+
+
+def test_popularity_tracks_urls_domains_and_query_hashes():
+    tracker = PopularityTracker(k=10)
+    for _ in range(3):
+        tracker.record("https://example.com/a", "What is it?")
+    tracker.record("https://example.com/b", "what   is IT?")
+    tracker.record("https://other.org/")
+
+    assert tracker.top("url", 1) == [("https://example.com/a", 3)]
+    assert tracker.top("domain") == [("example.com", 4), ("other.org", 1)]
+    assert tracker.top("query") == [(PopularityTracker.query_hash("What is it?"), 4)]
+    assert tracker.stats()["url"]["events"] == 5
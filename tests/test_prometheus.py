@@ -0,0 +1,84 @@
+import os
+import time
+from app.core.monitoring import ApplicationMonitor, monitor, worker_id
+from app.core.prometheus import SnapshotStore, merge_snapshots, render_prometheus, collect_metrics
+
+
+def _worker_monitor(duration: float, failures: int = 0) -> ApplicationMonitor:
+    worker = ApplicationMonitor()
+    for i in range(10):
+        worker.record_request("cag", duration, success=i >= failures)
+    worker.record_cache_hit("llm")
+    worker.record_cache_miss("crawl")
+    worker.increment_gauge("http_requests_in_flight", "/cag")
+    worker.counter_handle("llm.retry").increment()
+    return worker
+
+
+def test_render_prometheus_exposition():
+    text = collect_metrics(app_monitor=_worker_monitor(0.2, failures=2))
+
+    assert '# TYPE cag_requests_total counter' in text
+    assert 'cag_requests_total{endpoint="cag",status="success"} 8' in text
+    assert 'cag_requests_total{endpoint="cag",status="error"} 2' in text
+    assert 'cag_request_duration_seconds_bucket{endpoint="cag",le="0.1"} 0' in text
+    assert 'cag_request_duration_seconds_bucket{endpoint="cag",le="0.25"} 10' in text
+    assert 'cag_request_duration_seconds_count{endpoint="cag"} 10' in text
+    assert 'cag_cache_requests_total{cache="llm",result="hit"} 1' in text
+    assert 'cag_cache_requests_total{cache="crawl",result="miss"} 1' in text
+    assert 'cag_http_requests_in_flight{endpoint="/cag"} 1' in text
+    assert 'cag_events_total{event="llm.retry"} 1' in text
+
+
+def test_multiprocess_snapshots_are_merged(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    other = _worker_monitor(0.5).export_snapshot()
+    other["pid"] = os.getppid()
+    other["worker_id"] = f"{os.getppid()}-other"
+    store.write(other)
+
+    text = collect_metrics(store, app_monitor=_worker_monitor(0.05), gauge_max_age=60)
+
+    assert 'cag_requests_total{endpoint="cag",status="success"} 20' in text
+    assert 'cag_http_requests_in_flight{endpoint="/cag"} 2' in text
+
+
+def test_snapshots_of_exited_processes_are_pruned(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    snapshot = _worker_monitor(0.1).export_snapshot()
+    store.write(snapshot)
+    for stale in (f"{2 ** 22 + 1}-gone", f"{os.getpid()}-earlier-run"):
+        store.write(dict(snapshot, worker_id=stale))
+
+    snapshots = store.read_all()
+
+    assert [s["worker_id"] for s in snapshots] == [worker_id()]
+    assert sorted(os.listdir(tmp_path)) == [f"worker_{worker_id()}.json"]
+
+
+def test_stale_gauges_are_dropped_but_counters_kept():
+    snapshot = _worker_monitor(0.1).export_snapshot()
+    snapshot["timestamp"] = time.time() - 3600
+
+    merged = merge_snapshots([snapshot], gauge_max_age=30)
+
+    assert merged["counts"]["endpoint_cag"] == 10
+    assert not merged["gauges"]
+    assert "cag_http_requests_in_flight" not in render_prometheus(merged)
+
+
+def test_metrics_endpoint(test_client):
+    response = test_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "cag_requests_total" in response.text
+
+
+def test_unknown_paths_share_one_in_flight_label(test_client):
+    for i in range(3):
+        test_client.get(f"/no-such-page-{i}")
+    test_client.get("/health")
+
+    labels = monitor.get_gauges()["http_requests_in_flight"]
+    assert "other" in labels and "/health" in labels
+    assert not any(label.startswith("/no-such-page") for label in labels)
@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from common.retry import CallPolicy, call_with_retries
+
+POLICY = CallPolicy(timeout=0.05, max_retries=2, retry_base_delay=0.001, retry_max_delay=0.002)
+
+
+def _calls(*outcomes):
+    """Factory returning (or raising) the next outcome per call, and the list of calls made."""
+    calls = []
+
+    def factory():
+        outcome = outcomes[len(calls)]
+        calls.append(outcome)
+
+        async def run():
+            if outcome == "hang":
+                await asyncio.sleep(1)
+            if isinstance(outcome, BaseException):
+                raise outcome
+            return outcome
+        return run()
+    return factory, calls
+
+
+@pytest.mark.asyncio
+async def test_timeouts_and_connection_errors_are_retried():
+    factory, calls = _calls("hang", ConnectionError("reset"), "answer")
+
+    assert await call_with_retries(factory, POLICY) == "answer"
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_errors_and_exhausted_retries_are_raised():
+    factory, calls = _calls(ValueError("bad request"))
+    with pytest.raises(ValueError):
+        await call_with_retries(factory, POLICY)
+    assert len(calls) == 1
+
+    factory, calls = _calls(*[ConnectionError("down")] * 3)
+    with pytest.raises(ConnectionError):
+        await call_with_retries(factory, POLICY)
+    assert len(calls) == 3
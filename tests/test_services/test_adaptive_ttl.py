@@ -0,0 +1,52 @@
+from app.services.adaptive_ttl import CHANGE_HISTORY_HORIZON, TTLPolicy, update_change_stats
+
+DAY = 86400
+
+
+def _history(interval, crawls, changing):
+    stats, now = {}, 0.0
+    for i in range(crawls):
+        stats = update_change_stats(stats, f"hash{i}" if changing else "same", now)
+        now += interval
+    return stats
+
+
+def test_first_crawl_gets_default_ttl():
+    policy = TTLPolicy(default_ttl=7200, min_ttl=300, max_ttl=7 * DAY)
+
+    assert policy.ttl_for("example.com", update_change_stats({}, "h", 0.0)) == 7200
+
+
+def test_stable_pages_grow_and_volatile_pages_shrink_within_bounds():
+    policy = TTLPolicy(default_ttl=7200, min_ttl=300, max_ttl=7 * DAY, factor=0.5)
+
+    stable = _history(7200, 50, changing=False)
+    volatile = _history(600, 50, changing=True)
+
+    assert 7200 < policy.ttl_for("example.com", stable) <= 7 * DAY
+    assert policy.ttl_for("example.com", _history(7200, 500, changing=False)) == 7 * DAY
+    assert 300 <= policy.ttl_for("example.com", volatile) < 600
+    assert policy.ttl_for("example.com", _history(60, 50, changing=True)) == 300
+
+
+def test_old_history_is_scaled_to_the_horizon():
+    stats = _history(DAY, 60, changing=True)
+
+    assert stats["observed"] == CHANGE_HISTORY_HORIZON
+    assert stats["changes"] < 31
+    assert stats["crawls"] == 60
+
+
+def test_domain_overrides_apply_to_subdomains():
+    policy = TTLPolicy(domain_overrides={"example.com": {"min": 60, "max": 900}, "docs.example.com": {"ttl": 86400}})
+    stats = _history(7200, 50, changing=False)
+
+    assert policy.ttl_for("www.example.com", stats) == 900
+    assert policy.ttl_for("docs.example.com", stats) == 86400
+    assert policy.ttl_for("other.org", stats) > 900
+
+
+def test_non_adaptive_policy_uses_default():
+    policy = TTLPolicy(adaptive=False, default_ttl=7200)
+
+    assert policy.ttl_for("example.com", _history(600, 50, changing=True)) == 7200
@@ -0,0 +1,102 @@
+import pytest
+
+from app.services.cache_warmer import WARM_LOCK, CacheWarmer
+from app.services.simple_caching import ACCESS_LAST_KEY, LOCK_PREFIX
+
+WARMER_SETTINGS = dict(
+    cache_warm_interval=60,
+    cache_warm_top_urls=10,
+    cache_warm_refresh_before=300,
+    cache_warm_concurrency=2,
+    cache_warm_idle_after=3600,
+    cache_warm_decay=0.5,
+    cache_warm_max_tracked=2,
+)
+
+
+class FakeCrawler:
+    """Stores a crawl in the cache, counting concurrent crawls on a probe."""
+
+    def __init__(self, cache, probe):
+        self.cache = cache
+        self.probe = probe
+        self.crawled = []
+
+    async def crawl_with_metadata(self, url, use_cache=True, record_access=True):
+        async with self.probe.call():
+            self.crawled.append(url)
+        await self.cache.set_crawled_data(url, {"markdown": f"content of {url}", "timestamp": 1})
+        return {}
+
+
+@pytest.fixture
+def make_warmer(cache_service, make_settings, concurrency_probe):
+    def build(**overrides) -> CacheWarmer:
+        settings = make_settings(**{**WARMER_SETTINGS, **overrides})
+        return CacheWarmer(settings, cache_service, FakeCrawler(cache_service, concurrency_probe))
+    return build
+
+
+@pytest.mark.asyncio
+async def test_access_counts_rank_and_decay(cache_service):
+    await cache_service.record_access("https://example.com/a", "https://example.com/b")
+    await cache_service.record_access("https://EXAMPLE.com/b", "https://example.com/c")
+    await cache_service.record_access("https://example.com/b")
+
+    hot = await cache_service.hot_urls(10)
+    assert hot[0] == ("https://example.com/b", 3.0)
+
+    await cache_service.decay_access(0.5, keep=2)
+
+    hot = await cache_service.hot_urls(10)
+    assert len(hot) == 2
+    assert hot[0] == ("https://example.com/b", 1.5)
+    assert await cache_service.redis_client.zcard(ACCESS_LAST_KEY) == 2
+
+
+@pytest.mark.asyncio
+async def test_hot_urls_expiring_soon_are_due(cache_service, make_warmer):
+    warmer = make_warmer()
+    await cache_service.record_access("https://example.com/fresh", "https://example.com/expiring", "https://example.com/gone")
+    await cache_service.set_crawled_data("https://example.com/fresh", {"markdown": "fresh"}, ttl=7200)
+    await cache_service.set_crawled_data("https://example.com/expiring", {"markdown": "old"}, ttl=60)
+
+    assert sorted(await warmer.due()) == ["https://example.com/expiring", "https://example.com/gone"]
+
+
+@pytest.mark.asyncio
+async def test_run_once_refreshes_with_bounded_concurrency_under_a_lock(cache_service, make_warmer, concurrency_probe):
+    warmer = make_warmer(cache_warm_max_tracked=10)
+    urls = [f"https://example.com/{i}" for i in range(5)]
+    await cache_service.record_access(*urls)
+
+    result = await warmer.run_once()
+
+    assert result == {"refreshed": 5, "failed": 0}
+    assert concurrency_probe.peak <= 2
+    assert all(ttl > 300 for ttl in await cache_service.crawl_ttls(urls))
+    # The cycle lock is released, but another worker in the same interval skips the cycle
+    assert not await cache_service.redis_client.exists(LOCK_PREFIX + WARM_LOCK)
+    assert await make_warmer().run_once() == {}
+
+
+@pytest.mark.asyncio
+async def test_cycles_do_not_overlap_and_locks_are_released_by_their_owner(cache_service, make_warmer):
+    await cache_service.record_access("https://example.com/a")
+
+    async with cache_service.hold_lock(WARM_LOCK) as held:
+        assert held
+        # A cycle still running blocks the next one without using up its interval
+        assert await make_warmer().run_once() == {}
+        assert not await cache_service.release_lock(WARM_LOCK, "someone-else")
+    assert await make_warmer().run_once() == {"refreshed": 1, "failed": 0}
+
+
+@pytest.mark.asyncio
+async def test_register_marks_urls_hot_and_precrawls(cache_service, make_warmer):
+    warmer = make_warmer()
+
+    await (await warmer.register(["https://example.com/new"]))
+
+    assert warmer.crawler.crawled == ["https://example.com/new"]
+    assert await cache_service.hot_urls(10) == [("https://example.com/new", 1.0)]
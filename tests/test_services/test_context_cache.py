@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+from app.services.context_cache import LocalContextCache, PageContextCache
+from app.services.llm_provider import LocalLLMProvider
+from app.services.llm_router import Backend, BackendConfig
+from app.services.resilience import CallPolicy, ResilientCaller, ResilientLLMProvider
+
+PAGE = "# Big page\n" + "content " * 1000
+QUESTION = "User Query: What is this page about?"
+
+
+@pytest.fixture
+def page_context(cache_service, make_settings):
+    settings = make_settings(llm_context_cache_enabled=True, llm_context_cache_min_tokens=1000)
+    return PageContextCache(cache_service, settings)
+
+
+def _backend(context_cache=None, policy=None) -> Backend:
+    provider = LocalLLMProvider("local-echo")
+    if policy is not None:
+        provider = ResilientLLMProvider(provider, ResilientCaller(policy, name="llm.test"))
+    return Backend(
+        BackendConfig(name="local", model="local-echo", provider="local"),
+        provider,
+        context_cache=context_cache or LocalContextCache("local-echo"),
+    )
+
+
+def _slow_upload(backend, delay):
+    create = backend.context_cache.create
+
+    async def slow(content, display_name):
+        await asyncio.sleep(delay)
+        return await create(content, display_name)
+
+    backend.context_cache.create = slow
+
+
+@pytest.mark.asyncio
+async def test_page_is_uploaded_once_and_reused(page_context, cache_service):
+    backend = _backend()
+
+    first = await page_context.generate(backend, "hash1", PAGE, QUESTION)
+    second = await page_context.generate(backend, "hash1", PAGE, QUESTION)
+
+    assert first == second
+    assert "What is this page about?" in first
+    assert f"cached context: {len(PAGE)} characters" in first
+    assert backend.context_cache.uploaded_characters == len(PAGE)
+    handle = await cache_service.get_context_handle("hash1", "local-echo")
+    assert handle["name"].startswith("cachedContents/local-")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_upload(page_context):
+    backend = _backend()
+
+    await asyncio.gather(*(page_context.generate(backend, "hash1", PAGE, QUESTION) for _ in range(5)))
+
+    assert backend.context_cache.uploaded_characters == len(PAGE)
+
+
+@pytest.mark.asyncio
+async def test_unknown_handle_is_recreated(page_context):
+    # Another worker's local context is not known here, like an expired provider context
+    await page_context.generate(_backend(), "hash1", PAGE, QUESTION)
+    backend = _backend()
+
+    text = await page_context.generate(backend, "hash1", PAGE, QUESTION)
+
+    assert text is not None
+    assert backend.context_cache.uploaded_characters == len(PAGE)
+
+
+@pytest.mark.asyncio
+async def test_small_pages_and_unsupported_backends_are_sent_inline(page_context):
+    backend = _backend()
+
+    assert page_context.applies(backend, PAGE)
+    assert not page_context.applies(backend, "# Small page")
+    backend.context_cache = None
+    assert not page_context.applies(backend, PAGE)
+
+
+@pytest.mark.asyncio
+async def test_failed_upload_falls_back_to_full_prompt(page_context):
+    backend = _backend()
+
+    async def fail(content, display_name):
+        raise RuntimeError("content too small for caching")
+
+    backend.context_cache.create = fail
+
+    assert await page_context.generate(backend, "hash1", PAGE, QUESTION) is None
+
+
+@pytest.mark.asyncio
+async def test_hung_upload_times_out_and_falls_back(page_context):
+    backend = _backend(policy=CallPolicy(timeout=0.05, max_retries=0))
+    _slow_upload(backend, 10)
+
+    text = await asyncio.wait_for(page_context.generate(backend, "hash1", PAGE, QUESTION), 1)
+
+    assert text is None
+    assert backend.stats.error_rate() > 0
+    assert backend.provider.caller.breaker.snapshot()["consecutive_failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_timed_out_upload_is_not_retried(page_context):
+    backend = _backend(policy=CallPolicy(timeout=0.05, max_retries=2, retry_base_delay=0.001))
+    uploads = []
+    create = backend.context_cache.create
+
+    async def slow(content, display_name):
+        uploads.append(display_name)
+        await asyncio.sleep(10)
+        return await create(content, display_name)
+
+    backend.context_cache.create = slow
+
+    assert await asyncio.wait_for(page_context.generate(backend, "hash1", PAGE, QUESTION), 1) is None
+    assert len(uploads) == 1
+
+
+@pytest.mark.asyncio
+async def test_gemini_context_finished_after_timeout_is_deleted():
+    import time
+    from types import SimpleNamespace
+    from unittest.mock import MagicMock, patch
+    from app.services.context_cache import GeminiContextCache, _orphan_deletions
+
+    cached = MagicMock()
+    cached.name = "cachedContents/late"
+
+    def create(**kwargs):
+        time.sleep(0.1)
+        return cached
+
+    genai = SimpleNamespace(caching=SimpleNamespace(CachedContent=SimpleNamespace(create=create)))
+    with patch("app.services.llm_provider.load_genai", return_value=genai):
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(GeminiContextCache("gemini-test").create(PAGE, "page"), 0.01)
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if cached.delete.called and not _orphan_deletions:
+                break
+
+    cached.delete.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_upload_time_is_not_counted_as_model_latency(page_context):
+    backend = _backend(policy=CallPolicy(timeout=1, max_retries=0))
+    _slow_upload(backend, 0.2)
+
+    assert await page_context.generate(backend, "hash1", PAGE, QUESTION) is not None
+
+    assert backend.stats.samples == 1
+    assert backend.stats.latency < 0.1
@@ -0,0 +1,238 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.crawl_scheduler import (
+    NEGATIVE_TTL,
+    CrawlDisallowedError,
+    CrawlScheduler,
+    DNSCache,
+    HostResolutionError,
+    RobotsCache,
+)
+
+ROBOTS = """
+User-agent: *
+Disallow: /private
+Crawl-delay: 2
+"""
+
+SCHEDULER_SETTINGS = dict(
+    crawl_max_concurrency=8,
+    crawl_per_host_concurrency=2,
+    crawl_per_host_delay=0.0,
+    crawl_max_crawl_delay=30.0,
+)
+
+
+class FakeRobots(RobotsCache):
+    """Serves robots.txt from a dict of origin -> (status, body) and counts fetches."""
+
+    def __init__(self, files, **kwargs):
+        super().__init__(**kwargs)
+        self.files = files
+        self.fetches = 0
+
+    async def fetch(self, origin):
+        self.fetches += 1
+        response = self.files.get(origin, (404, ""))
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class FakeDNS(DNSCache):
+    def __init__(self, hosts, **kwargs):
+        super().__init__(**kwargs)
+        self.hosts = hosts
+        self.lookups = 0
+
+    async def lookup(self, host):
+        self.lookups += 1
+        return self.hosts.get(host, [])
+
+
+@pytest.fixture
+def scheduler_settings(make_settings):
+    def build(**overrides):
+        return make_settings(**{**SCHEDULER_SETTINGS, **overrides})
+    return build
+
+
+async def _crawl(scheduler, url, log, hold=0.02):
+    async with scheduler.slot(url):
+        log.append(("start", url, time.monotonic()))
+        await asyncio.sleep(hold)
+        log.append(("end", url, time.monotonic()))
+
+
+def _peak(log, host):
+    active = peak = 0
+    for event, url, _ in log:
+        if host in url:
+            active += 1 if event == "start" else -1
+            peak = max(peak, active)
+    return peak
+
+
+@pytest.mark.asyncio
+async def test_per_host_concurrency_is_limited_per_host(scheduler_settings):
+    scheduler = CrawlScheduler(scheduler_settings(crawl_per_host_concurrency=1))
+    log = []
+
+    await asyncio.gather(*(_crawl(scheduler, f"https://{host}.com/{i}", log) for host in "ab" for i in range(3)))
+
+    assert _peak(log, "a.com") == 1 and _peak(log, "b.com") == 1
+    # The two hosts were crawled side by side
+    first_ends = min(t for event, _, t in log if event == "end")
+    assert sum(1 for event, _, t in log if event == "start" and t < first_ends) == 2
+    assert scheduler.active == 0 and scheduler.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_crawl_starts_on_a_host_are_spaced_by_the_delay(scheduler_settings):
+    scheduler = CrawlScheduler(scheduler_settings(crawl_per_host_delay=0.05))
+    log = []
+
+    await asyncio.gather(*(_crawl(scheduler, f"https://a.com/{i}", log, hold=0) for i in range(3)))
+
+    starts = [t for event, _, t in log if event == "start"]
+    assert all(later - earlier >= 0.045 for earlier, later in zip(starts, starts[1:]))
+
+
+@pytest.mark.asyncio
+async def test_free_slots_rotate_between_hosts(scheduler_settings):
+    scheduler = CrawlScheduler(scheduler_settings(crawl_max_concurrency=1))
+    order = []
+
+    async def crawl(url):
+        async with scheduler.slot(url):
+            order.append(url)
+            await asyncio.sleep(0.01)
+
+    first = asyncio.ensure_future(crawl("https://a.com/1"))
+    await asyncio.sleep(0)
+    queued = [asyncio.ensure_future(crawl(url)) for url in ("https://a.com/2", "https://a.com/3", "https://b.com/1")]
+    await asyncio.gather(first, *queued)
+
+    assert order == ["https://a.com/1", "https://a.com/2", "https://b.com/1", "https://a.com/3"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_a_slot(scheduler_settings):
+    scheduler = CrawlScheduler(scheduler_settings(crawl_max_concurrency=1))
+    log = []
+
+    holder = asyncio.ensure_future(_crawl(scheduler, "https://a.com/1", log, hold=0.02))
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(_crawl(scheduler, "https://b.com/1", log))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await holder
+
+    await asyncio.wait_for(_crawl(scheduler, "https://c.com/1", log, hold=0), 1)
+    assert scheduler.active == 0
+    assert not any("b.com" in url for _, url, _ in log)
+
+
+@pytest.mark.asyncio
+async def test_idle_hosts_are_swept_once_their_delay_passes(scheduler_settings, clock, monkeypatch):
+    monkeypatch.setattr("app.services.crawl_scheduler.HOST_SWEEP_THRESHOLD", 2)
+    scheduler = CrawlScheduler(scheduler_settings(crawl_per_host_delay=5.0), clock=clock)
+
+    for host in ("a", "b"):
+        async with scheduler.slot(f"https://{host}.com/"):
+            pass
+    # Still inside their delay, so the hosts are kept
+    assert set(scheduler._hosts) == {"a.com", "b.com"}
+
+    clock.now += 5
+    async with scheduler.slot("https://c.com/"):
+        pass
+    assert set(scheduler._hosts) == {"c.com"}
+
+
+@pytest.mark.asyncio
+async def test_robots_rules_are_cached_and_enforced(scheduler_settings):
+    robots = FakeRobots({"https://a.com": (200, ROBOTS)})
+    scheduler = CrawlScheduler(scheduler_settings(crawl_per_host_delay=0.5, crawl_max_crawl_delay=1.5), robots=robots)
+
+    async with scheduler.slot("https://a.com/page"):
+        assert scheduler._hosts["a.com"].delay == 1.5
+    with pytest.raises(CrawlDisallowedError):
+        async with scheduler.slot("https://a.com/private/page"):
+            pass
+
+    assert robots.fetches == 1
+    assert scheduler.active == 0
+
+
+@pytest.mark.asyncio
+async def test_missing_or_unreachable_robots_allows_everything(clock):
+    robots = FakeRobots({"https://down.com": ConnectionError("refused")}, ttl=3600, clock=clock)
+
+    assert await robots.allowed("https://missing.com/private")
+    assert await robots.allowed("https://down.com/private")
+    assert await robots.crawl_delay("https://missing.com/") is None
+
+    clock.now += NEGATIVE_TTL + 1
+    await robots.allowed("https://missing.com/")
+    await robots.allowed("https://down.com/")
+    # Only the failed fetch is retried before the TTL
+    assert robots.fetches == 3
+
+
+@pytest.mark.asyncio
+async def test_robots_redirects_are_validated(monkeypatch):
+    import httpx
+
+    routes = {
+        "https://a.com/robots.txt": httpx.Response(301, headers={"location": "https://www.a.com/robots.txt"}),
+        "https://www.a.com/robots.txt": httpx.Response(200, text=ROBOTS),
+        "https://evil.com/robots.txt": httpx.Response(302, headers={"location": "http://169.254.169.254/latest"}),
+    }
+    seen = []
+
+    def handler(request):
+        seen.append(str(request.url))
+        return routes[str(request.url)]
+
+    client = httpx.AsyncClient
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: client(transport=httpx.MockTransport(handler), **kwargs))
+    robots = RobotsCache()
+
+    assert await robots.fetch("https://a.com") == (200, ROBOTS)
+    with pytest.raises(ValueError):
+        await robots.fetch("https://evil.com")
+    assert "http://169.254.169.254/latest" not in seen
+
+
+@pytest.mark.asyncio
+async def test_dns_answers_are_cached_for_their_ttl(clock):
+    dns = FakeDNS({"a.com": ["192.0.2.1"]}, ttl=300, clock=clock)
+
+    assert await dns.resolve("a.com") == ["192.0.2.1"]
+    assert await dns.resolve("a.com") == ["192.0.2.1"]
+    with pytest.raises(HostResolutionError):
+        await dns.resolve("missing.invalid")
+    with pytest.raises(HostResolutionError):
+        await dns.resolve("missing.invalid")
+    assert dns.lookups == 2
+
+    clock.now += 301
+    await dns.resolve("a.com")
+    with pytest.raises(HostResolutionError):
+        await dns.resolve("missing.invalid")
+    assert dns.lookups == 4
+
+
+@pytest.mark.asyncio
+async def test_unresolvable_host_fails_before_taking_a_slot(scheduler_settings):
+    scheduler = CrawlScheduler(scheduler_settings(), dns=FakeDNS({}))
+
+    with pytest.raises(HostResolutionError):
+        async with scheduler.slot("https://missing.invalid/"):
+            pass
+
+    assert scheduler.active == 0 and scheduler.waiting == 0
@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import AsyncMock, patch, ANY
+from unittest.mock import AsyncMock, MagicMock, patch, ANY
 from app.services.crawler import CrawlerService
 
 
@@ -11,3 +11,28 @@ async def test_crawl(mock_run):
     markdown = await crawler.crawl("https://example.com")
     assert markdown == "test markdown"
     mock_run.assert_called_once_with("https://example.com", config=ANY)
+
+
+@pytest.mark.asyncio
+@patch("crawl4ai.async_webcrawler.AsyncWebCrawler.arun")
+async def test_fresh_crawl_schedules_digest(mock_run):
+    mock_run.return_value = AsyncMock(markdown="# Long page", status_code=200, success=True, title="")
+    digester = MagicMock()
+    crawler = CrawlerService(digester=digester)
+
+    data = await crawler.crawl_with_metadata("https://example.com")
+
+    digester.schedule.assert_called_once_with("https://example.com", data["content_hash"], "# Long page")
+
+
+@pytest.mark.asyncio
+@patch("crawl4ai.async_webcrawler.AsyncWebCrawler.arun")
+async def test_crawl_waits_for_a_scheduler_slot(mock_run):
+    mock_run.return_value = AsyncMock(markdown="page", status_code=200, success=True, title="")
+    scheduler = MagicMock()
+    crawler = CrawlerService(scheduler=scheduler)
+
+    await crawler.crawl_with_metadata("https://example.com")
+
+    scheduler.slot.assert_called_once_with("https://example.com")
+    scheduler.slot.return_value.__aenter__.assert_awaited_once()
@@ -0,0 +1,108 @@
+import pytest
+
+from app.services.digest import PageDigester, build_digest_prompt, relevant_sections, split_sections
+from app.services.llm_router import LLMRouter
+
+PAGE = "\n\n".join(
+    f"## {topic}\n\n" + f"Details about {topic.lower()} and related facts. " * 40
+    for topic in ("Installation", "Configuration", "Pricing", "Troubleshooting")
+)
+
+
+DIGEST_SETTINGS = dict(
+    page_digest_enabled=True,
+    page_digest_min_tokens=100,
+    page_digest_section_tokens=125,
+    page_digest_concurrency=2,
+    page_digest_ttl=3600,
+)
+
+
+class CountingProvider:
+    """Summarises instantly, counting concurrent calls on a probe."""
+
+    model_name = "counting"
+
+    def __init__(self, probe):
+        self.probe = probe
+
+    async def generate_content(self, prompt):
+        async with self.probe.call():
+            return f"summary {self.probe.calls}"
+
+
+@pytest.fixture
+def digester(cache_service, make_settings, concurrency_probe):
+    provider = CountingProvider(concurrency_probe)
+    return PageDigester(make_settings(**DIGEST_SETTINGS), cache_service, LLMRouter.single(provider, "counting"))
+
+
+def test_sections_follow_headings_and_respect_size():
+    sections = split_sections(PAGE, 2000)
+
+    assert [s["title"] for s in sections] == ["Installation", "Configuration", "Pricing", "Troubleshooting"]
+    assert all(s["end"] - s["start"] <= 2000 for s in sections)
+    assert sections[0]["start"] == 0 and sections[-1]["end"] == len(PAGE)
+
+    small = split_sections(PAGE, 500)
+    assert len(small) > 4
+    assert all(s["end"] - s["start"] <= 500 for s in small)
+    assert "".join(PAGE[s["start"]:s["end"]] for s in small) == PAGE
+
+
+def test_short_sections_are_merged():
+    sections = split_sections("# A\n\nshort\n\n# B\n\nshort too", 1000)
+
+    assert len(sections) == 1
+    assert sections[0]["title"] == "A"
+
+
+def test_relevant_sections_match_query_terms():
+    sections = split_sections(PAGE, 2000)
+
+    chosen = relevant_sections(PAGE, sections, "How much does pricing cost?", 1)
+
+    assert [s["title"] for s in chosen] == ["Pricing"]
+    assert relevant_sections(PAGE, sections, "unrelated words", 2) == []
+
+
+@pytest.mark.asyncio
+async def test_digest_is_built_with_bounded_concurrency_and_stored(cache_service, digester, concurrency_probe):
+
+    digest = await digester.digest("https://example.com", "hash1", PAGE)
+
+    assert concurrency_probe.peak <= 2
+    assert len(digest["sections"]) > 4
+    assert all(s["summary"].startswith("summary") for s in digest["sections"])
+    assert digest["summary"].startswith("summary")
+    assert await cache_service.get_page_digest("hash1") == digest
+
+    calls = concurrency_probe.calls
+    await digester.digest("https://example.com", "hash1", PAGE)
+    assert concurrency_probe.calls == calls
+
+
+@pytest.mark.asyncio
+async def test_schedule_skips_small_pages_and_deduplicates(cache_service, digester):
+
+    assert digester.schedule("https://example.com", "small", "# Small page") is None
+    first = digester.schedule("https://example.com", "hash1", PAGE)
+    assert digester.schedule("https://example.com", "hash1", PAGE) is first
+    await first
+
+    assert await cache_service.get_page_digest("hash1") is not None
+
+
+def test_digest_prompt_contains_summaries_and_relevant_raw_section():
+    sections = split_sections(PAGE, 2000)
+    for section in sections:
+        section["summary"] = f"about {section['title'].lower()}"
+    digest = {"summary": "A product manual.", "sections": sections}
+
+    prompt = build_digest_prompt("https://example.com", PAGE, digest, "What is the pricing?", 1)
+
+    assert "A product manual." in prompt
+    assert "- Installation: about installation" in prompt
+    assert "Details about pricing" in prompt
+    assert "Details about installation" not in prompt
+    assert len(prompt) < len(PAGE)
@@ -21,3 +21,23 @@ async def test_history_service(mock_from_url, settings):
 
     await history_service.clear_history("test_user")
     mock_redis.delete.assert_called_once_with("history:test_user")
+
+
+@pytest.mark.asyncio
+@patch("redis.asyncio.client.Redis.from_url")
+async def test_history_is_skipped_while_redis_breaker_is_open(mock_from_url, settings):
+    from redis.exceptions import ConnectionError as RedisConnectionError
+
+    mock_redis = AsyncMock()
+    mock_redis.lrange.side_effect = RedisConnectionError("down")
+    mock_from_url.return_value = mock_redis
+    history_service = HistoryService(settings)
+    history_service.breaker.failure_threshold = 1
+
+    assert await history_service.get_history("test_user") == []
+    assert history_service.breaker.state == "open"
+
+    await history_service.add_turn("test_user", "test_message", "user")
+    assert await history_service.get_history("test_user") == []
+    mock_redis.rpush.assert_not_called()
+    assert mock_redis.lrange.await_count == 1
@@ -0,0 +1,111 @@
+import pytest
+
+from app.services.llm_provider import LocalLLMProvider
+from app.services.llm_router import Backend, BackendConfig, BackendStats, LLMRouter, estimate_tokens
+from app.services.resilience import LLMUnavailableError
+
+
+class DownProvider:
+    model_name = "down"
+    calls = 0
+
+    async def generate_content(self, prompt):
+        self.calls += 1
+        raise LLMUnavailableError("overloaded")
+
+
+def _backend(name, provider=None, clock=None, **config) -> Backend:
+    return Backend(
+        BackendConfig(name=name, model=f"model-{name}", **config),
+        provider or LocalLLMProvider(f"model-{name}"),
+        BackendStats(clock=clock) if clock else BackendStats(),
+    )
+
+
+def test_routes_by_prompt_size_and_endpoint():
+    router = LLMRouter([
+        _backend("lite", max_prompt_tokens=100),
+        _backend("chat", endpoints=["generate"]),
+        _backend("large"),
+    ])
+
+    assert router.select("short prompt", "cag").name == "lite"
+    assert router.select("x" * 4000, "generate").name == "chat"
+    assert router.select("x" * 4000, "cag").name == "large"
+
+
+def test_oversized_prompt_goes_to_largest_backend():
+    router = LLMRouter([_backend("small", max_prompt_tokens=10), _backend("medium", max_prompt_tokens=100)])
+
+    assert router.select("x" * 4000).name == "medium"
+    assert estimate_tokens("x" * 4000) > 100
+
+
+def test_slow_backend_is_skipped():
+    fast, slow = _backend("fast"), _backend("slow")
+    router = LLMRouter([slow, fast], slow_factor=3.0)
+    for _ in range(5):
+        slow.stats.record(2.0, ok=True)
+        fast.stats.record(0.1, ok=True)
+
+    assert [b.name for b in router.candidates("prompt")] == ["fast", "slow"]
+
+
+def test_slow_backend_recovers_after_demotion(clock):
+    fast, slow = _backend("fast", clock=clock), _backend("slow", clock=clock)
+    router = LLMRouter([slow, fast], slow_factor=3.0)
+    slow.stats.record(5.0, ok=True)
+    fast.stats.record(0.5, ok=True)
+    assert router.select("prompt").name == "fast"
+
+    # Without new samples the slow record fades, so the backend is tried again
+    clock.now = 120
+    assert router.select("prompt").name == "slow"
+
+    # A fast sample then outweighs the stale slow one
+    slow.stats.record(0.6, ok=True)
+    assert slow.stats.latency < 1.0
+    assert router.select("prompt").name == "slow"
+
+
+def test_local_backend_does_not_set_reference_latency():
+    gemini = _backend("gemini")
+    local = Backend(BackendConfig(name="local", model="local-echo", provider="local"), LocalLLMProvider("local-echo"))
+    router = LLMRouter([gemini, local])
+    gemini.stats.record(2.0, ok=True)
+    local.stats.record(0.001, ok=True)
+
+    assert router.select("prompt").name == "gemini"
+
+
+@pytest.mark.asyncio
+async def test_failover_records_errors_and_shifts_traffic(clock):
+    down = DownProvider()
+    router = LLMRouter([_backend("primary", down, clock), _backend("backup", clock=clock)], error_threshold=0.1)
+
+    text, used = await router.generate("User Query: what is cached?", "cag")
+    assert used.name == "backup"
+    assert text.startswith("[model-backup] User Query: what is cached?")
+    assert router.select("prompt").name == "backup"
+
+    # The error record decays, so the primary is tried again later
+    clock.now = 120
+    assert router.select("prompt").name == "primary"
+
+
+@pytest.mark.asyncio
+async def test_all_backends_unavailable_raises():
+    router = LLMRouter([_backend("a", DownProvider()), _backend("b", DownProvider())])
+
+    with pytest.raises(LLMUnavailableError):
+        await router.generate("prompt")
+
+
+def test_router_from_settings_builds_local_backend():
+    from app.core.config import Settings
+
+    settings = Settings(llm_backends=[{"name": "local", "provider": "local", "model": "local-echo"}])
+    router = LLMRouter.from_settings(settings)
+
+    assert router.model_name == "local-echo"
+    assert isinstance(router.backends[0].provider.provider, LocalLLMProvider)
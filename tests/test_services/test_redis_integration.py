@@ -0,0 +1,46 @@
+import httpx
+import pytest
+from app.services.redis_integration import RedisServerClient
+
+
+@pytest.fixture
+def client_settings(make_settings):
+    def build(**overrides):
+        values = dict(
+            redis_server_url="http://redis-server",
+            redis_server_enabled=True,
+            redis_server_max_connections=10,
+            redis_server_max_keepalive_connections=5,
+        )
+        values.update(overrides)
+        return make_settings(**values)
+    return build
+
+
+@pytest.mark.asyncio
+async def test_client_is_reused_across_calls(client_settings):
+    seen_paths = []
+
+    def handler(request):
+        seen_paths.append(request.url.path)
+        return httpx.Response(200, json={"status": "ok"})
+
+    redis_client = RedisServerClient(client_settings())
+    pooled = redis_client.client
+    pooled._transport = httpx.MockTransport(handler)
+
+    async with redis_client:
+        assert await redis_client.health_check() == {"status": "ok"}
+        await redis_client.get_cache_stats()
+        assert redis_client.client is pooled
+
+    assert seen_paths == ["/health/status", "/cache/stats"]
+    assert pooled.is_closed
+    assert redis_client._client is None
+
+
+@pytest.mark.asyncio
+async def test_disabled_client_makes_no_requests(client_settings):
+    redis_client = RedisServerClient(client_settings(redis_server_enabled=False))
+    assert (await redis_client.health_check())["status"] == "disabled"
+    assert redis_client._client is None
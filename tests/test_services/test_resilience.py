@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+
+from app.services.resilience import (
+    CallPolicy,
+    CircuitBreaker,
+    CircuitOpenError,
+    LLMUnavailableError,
+    ResilientCaller,
+    is_retryable,
+)
+
+
+class UpstreamError(Exception):
+    def __init__(self, code):
+        super().__init__(f"status {code}")
+        self.code = code
+
+
+def _caller(**policy) -> ResilientCaller:
+    defaults = dict(timeout=0.2, max_retries=2, retry_base_delay=0.001, retry_max_delay=0.002)
+    defaults.update(policy)
+    return ResilientCaller(CallPolicy(**defaults), name="test_llm")
+
+
+def _flaky(results):
+    """Factory returning (or raising) the next item of ``results`` per call."""
+    calls = []
+
+    def factory():
+        calls.append(None)
+        outcome = results[len(calls) - 1]
+
+        async def run():
+            if isinstance(outcome, BaseException):
+                raise outcome
+            return outcome
+        return run()
+    return factory, calls
+
+
+def test_retryable_errors():
+    assert is_retryable(asyncio.TimeoutError())
+    assert is_retryable(UpstreamError(429))
+    assert is_retryable(UpstreamError(503))
+    assert not is_retryable(UpstreamError(400))
+    assert not is_retryable(ValueError("bad prompt"))
+
+
+@pytest.mark.asyncio
+async def test_retries_retryable_errors_then_succeeds():
+    factory, calls = _flaky([UpstreamError(503), UpstreamError(429), "answer"])
+
+    assert await _caller().call(factory) == "answer"
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_errors_are_raised_unchanged():
+    factory, calls = _flaky([UpstreamError(400)])
+
+    with pytest.raises(UpstreamError):
+        await _caller().call(factory)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_deadline_exhausts_retries():
+    async def stuck():
+        await asyncio.sleep(10)
+
+    with pytest.raises(LLMUnavailableError):
+        await _caller(timeout=0.01, max_retries=1).call(stuck)
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_and_probes_after_reset_timeout(clock):
+    caller = _caller(max_retries=0)
+    caller.breaker = CircuitBreaker("test_llm", failure_threshold=2, reset_timeout=30, clock=clock)
+    factory, calls = _flaky([UpstreamError(503), UpstreamError(503), "recovered"])
+
+    for _ in range(2):
+        with pytest.raises(LLMUnavailableError):
+            await caller.call(factory)
+    assert caller.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        await caller.call(factory)
+    assert len(calls) == 2
+
+    clock.now = 30
+    assert caller.breaker.state == "half_open"
+    assert await caller.call(factory) == "recovered"
+    assert caller.breaker.state == "closed"
+
+
+def test_half_open_allows_a_single_probe(clock):
+    breaker = CircuitBreaker("probe", failure_threshold=1, reset_timeout=5, clock=clock)
+    breaker.record_failure()
+    clock.now = 5
+
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+@pytest.mark.asyncio
+async def test_hedge_answers_when_the_first_attempt_is_slow():
+    calls = []
+
+    def factory():
+        calls.append(None)
+        delay = 1.0 if len(calls) == 1 else 0.0
+
+        async def run():
+            await asyncio.sleep(delay)
+            return f"attempt {len(calls)}"
+        return run()
+
+    caller = _caller(timeout=2, hedge_enabled=True, hedge_min_delay=0.01)
+
+    assert await asyncio.wait_for(caller.call(factory), timeout=0.5) == "attempt 2"
+    assert len(calls) == 2
+
+
+def test_hedge_delay_follows_observed_latency():
+    caller = _caller(hedge_enabled=True, hedge_min_delay=0.05)
+    assert caller.hedge_delay() == 0.05
+
+    for _ in range(100):
+        caller._record_latency(0.2)
+
+    assert caller.hedge_delay() == pytest.approx(0.2, rel=0.05)
+
+
+def test_guard_counts_only_listed_failures(clock):
+    breaker = CircuitBreaker("guarded", failure_threshold=1, reset_timeout=5, clock=clock)
+
+    with pytest.raises(ValueError):
+        with breaker.guard((ConnectionError,)):
+            raise ValueError("bad command")
+    assert breaker.state == "closed"
+
+    with pytest.raises(ConnectionError):
+        with breaker.guard((ConnectionError,)):
+            raise ConnectionError("down")
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        with breaker.guard((ConnectionError,)):
+            pass
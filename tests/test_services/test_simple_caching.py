@@ -0,0 +1,191 @@
+import pytest
+
+
+async def _crawl_and_answer(cache, url, prompt):
+    await cache.set_crawled_data(url, {"markdown": f"content of {url}", "timestamp": 1})
+    await cache.set_llm_response(prompt, "answer", source_url=url)
+
+
+@pytest.mark.asyncio
+async def test_llm_and_crawl_round_trip(cache_service):
+    await _crawl_and_answer(cache_service, "https://example.com/a", "prompt a")
+    assert (await cache_service.get_crawled_data("https://example.com/a"))["markdown"] == "content of https://example.com/a"
+    assert await cache_service.get_llm_response("prompt a") == "answer"
+
+
+@pytest.mark.asyncio
+async def test_invalidate_url_cascades_to_llm_responses(cache_service):
+    await _crawl_and_answer(cache_service, "https://example.com/a", "prompt a")
+    await _crawl_and_answer(cache_service, "https://example.com/b", "prompt b")
+
+    result = await cache_service.invalidate_url("https://example.com/a")
+
+    assert result == {"urls": 1, "crawl_entries": 1, "llm_entries": 1}
+    assert await cache_service.get_crawled_data("https://example.com/a") is None
+    assert await cache_service.get_llm_response("prompt a") is None
+    assert await cache_service.get_llm_response("prompt b") == "answer"
+
+
+@pytest.mark.asyncio
+async def test_invalidate_domain_and_prefix(cache_service):
+    await _crawl_and_answer(cache_service, "https://example.com/docs/1", "prompt 1")
+    await _crawl_and_answer(cache_service, "https://example.com/blog/2", "prompt 2")
+    await _crawl_and_answer(cache_service, "https://other.org/", "prompt 3")
+
+    prefix_result = await cache_service.invalidate_prefix("https://example.com/docs/")
+    assert prefix_result["urls"] == 1
+    assert await cache_service.get_llm_response("prompt 1") is None
+    assert await cache_service.get_llm_response("prompt 2") == "answer"
+
+    domain_result = await cache_service.invalidate_domain("Example.com")
+    assert domain_result["urls"] == 1
+    assert await cache_service.get_llm_response("prompt 2") is None
+    assert await cache_service.get_llm_response("prompt 3") == "answer"
+
+
+@pytest.mark.asyncio
+async def test_invalidate_prefix_requires_host(cache_service):
+    with pytest.raises(ValueError):
+        await cache_service.invalidate_prefix("/docs/")
+
+
+@pytest.mark.asyncio
+async def test_url_variants_share_one_crawl_entry(cache_service):
+    await cache_service.set_crawled_data("https://example.com/a/?utm_source=news", {"markdown": "page", "timestamp": 1})
+
+    cached = await cache_service.get_crawled_data("http://Example.com/a#top")
+
+    assert cached["markdown"] == "page"
+    assert cached["canonical_url"] == "https://example.com/a"
+
+
+@pytest.mark.asyncio
+async def test_identical_pages_share_a_content_blob(cache_service):
+    redis_client = cache_service.redis_client
+    await cache_service.set_crawled_data("https://example.com/a", {"markdown": "same page"})
+    await cache_service.set_crawled_data("https://mirror.example.org/a", {"markdown": "same page"})
+
+    blobs = [key async for key in redis_client.scan_iter("blob:*") if not key.endswith(":refs")]
+    assert len(blobs) == 1
+
+    # The blob survives while any URL still references it
+    await cache_service.invalidate_url("https://example.com/a")
+    assert (await cache_service.get_crawled_data("https://mirror.example.org/a"))["markdown"] == "same page"
+
+    await cache_service.invalidate_url("https://mirror.example.org/a")
+    assert [key async for key in redis_client.scan_iter("blob:*")] == []
+
+
+@pytest.mark.asyncio
+async def test_recrawl_with_new_content_releases_old_blob(cache_service):
+    await cache_service.set_crawled_data("https://example.com/a", {"markdown": "v1"})
+    await cache_service.set_crawled_data("https://example.com/a", {"markdown": "v2"})
+
+    blobs = [key async for key in cache_service.redis_client.scan_iter("blob:*") if not key.endswith(":refs")]
+    assert len(blobs) == 1
+    assert (await cache_service.get_crawled_data("https://example.com/a"))["markdown"] == "v2"
+
+
+@pytest.mark.asyncio
+async def test_explicit_llm_cache_key(cache_service):
+    await cache_service.set_llm_response("prompt", "answer", cache_key="llm:abc")
+
+    assert await cache_service.get_llm_response("another prompt", cache_key="llm:abc") == "answer"
+    assert await cache_service.get_llm_response("prompt") is None
+
+
+@pytest.mark.asyncio
+async def test_llm_entry_does_not_copy_the_prompt(cache_service):
+    page_prompt = "Context: " + "page markdown " * 1000
+    await cache_service.set_llm_response(page_prompt, "answer")
+
+    stored = await cache_service.redis_client.get(cache_service._hash_key(page_prompt, "llm"))
+    assert "page markdown" not in stored
+    assert await cache_service.get_llm_response(page_prompt) == "answer"
+
+
+@pytest.mark.asyncio
+async def test_expired_llm_response_is_kept_as_stale_fallback(cache_service):
+    cache_service.llm_stale_ttl = 60
+    await cache_service.set_llm_response("prompt", "old answer", ttl=0)
+
+    assert await cache_service.get_llm_response("prompt") is None
+    assert await cache_service.get_stale_llm_response("prompt") == "old answer"
+    assert 0 < await cache_service.redis_client.ttl(cache_service._hash_key("prompt", "llm")) <= 60
+
+
+@pytest.mark.asyncio
+async def test_open_redis_breaker_serves_local_copies(cache_service):
+    from redis.exceptions import ConnectionError as RedisConnectionError
+    from unittest.mock import AsyncMock
+
+    await cache_service.set_crawled_data("https://example.com/a", {"markdown": "# A", "timestamp": 1})
+    await cache_service.set_llm_response("prompt", "answer")
+    cache_service.breaker.failure_threshold = 1
+    cache_service.redis_client.get = AsyncMock(side_effect=RedisConnectionError("down"))
+
+    assert (await cache_service.get_crawled_data("https://example.com/a"))["markdown"] == "# A"
+    assert cache_service.breaker.state == "open"
+    assert await cache_service.get_llm_response("prompt") == "answer"
+    assert cache_service.redis_client.get.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_open_redis_breaker_skips_access_tracking_calls(cache_service):
+    from unittest.mock import MagicMock
+
+    cache_service.breaker.failure_threshold = 1
+    cache_service.breaker.record_failure()
+    cache_service.redis_client = MagicMock(side_effect=AssertionError("Redis called"))
+
+    assert await cache_service.hot_urls(10) == []
+    assert await cache_service.crawl_ttls(["https://example.com/a"]) == []
+    assert await cache_service.unique_users(["https://example.com/a"]) == []
+    assert await cache_service.acquire_lock("cache_warm", 60) is None
+    await cache_service.decay_access(0.5, 10)
+    assert (await cache_service.get_change_stats("https://example.com/a"))["ttl"] == cache_service.ttl_policy.default_ttl
+    assert not cache_service.redis_client.method_calls
+
+
+@pytest.mark.asyncio
+async def test_invalidation_fails_fast_while_redis_breaker_is_open(cache_service):
+    from unittest.mock import MagicMock
+    from app.services.resilience import CircuitOpenError
+
+    cache_service.breaker.failure_threshold = 1
+    cache_service.breaker.record_failure()
+    cache_service.redis_client = MagicMock(side_effect=AssertionError("Redis called"))
+
+    for invalidate, target in (
+        (cache_service.invalidate_url, "https://example.com/a"),
+        (cache_service.invalidate_domain, "example.com"),
+        (cache_service.invalidate_prefix, "https://example.com/docs/"),
+    ):
+        with pytest.raises(CircuitOpenError):
+            await invalidate(target)
+    assert not cache_service.redis_client.method_calls
+
+
+@pytest.mark.asyncio
+async def test_unique_users_per_url(cache_service):
+    for user in ("alice", "bob", "alice"):
+        await cache_service.record_unique_user("https://example.com/a", user)
+    await cache_service.record_unique_user("https://EXAMPLE.com/a/", "carol")
+
+    assert await cache_service.unique_users(["https://example.com/a", "https://example.com/b"]) == [3, 0]
+
+
+@pytest.mark.asyncio
+async def test_crawl_ttl_follows_observed_changes(cache_service):
+    url = "https://example.com/news"
+
+    first = await cache_service.set_crawled_data(url, {"markdown": "v1", "timestamp": 1})
+    second = await cache_service.set_crawled_data(url, {"markdown": "v2", "timestamp": 2})
+
+    assert first == cache_service.ttl_policy.default_ttl
+    assert second < first
+    assert 0 < await cache_service.redis_client.ttl(cache_service._crawl_key(url)) <= second
+    stats = await cache_service.get_change_stats(url)
+    assert stats["changes"] == 1 and stats["crawls"] == 2
+    assert stats["ttl"] == second
+    assert (await cache_service.get_crawled_data(url))["ttl"] == second
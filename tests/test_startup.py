@@ -0,0 +1,22 @@
+from app.core.startup import import_profile, parse_importtime
+
+
+def test_parse_importtime():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   encodings.utf_8\n"
+        "import time:      2000 |       5000 | app.main\n"
+    )
+
+    modules = parse_importtime(stderr)
+
+    assert modules == [
+        {"module": "encodings.utf_8", "depth": 1, "self_us": 120, "cumulative_us": 120},
+        {"module": "app.main", "depth": 0, "self_us": 2000, "cumulative_us": 5000},
+    ]
+
+
+def test_lazy_startup_does_not_import_heavy_modules():
+    profile = import_profile("app.main", top=5, mode="lazy")
+
+    assert not any(profile["heavy_modules_loaded"].values())
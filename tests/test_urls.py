@@ -0,0 +1,22 @@
+import pytest
+from app.core.urls import canonicalize_url
+
+
+@pytest.mark.parametrize("url,expected", [
+    ("https://example.com/docs/", "https://example.com/docs"),
+    ("HTTPS://Example.COM:443/docs#intro", "https://example.com/docs"),
+    ("http://example.com/docs", "https://example.com/docs"),
+    ("https://example.com", "https://example.com/"),
+    ("https://example.com/a?b=2&utm_source=x&a=1&fbclid=y", "https://example.com/a?a=1&b=2"),
+    ("https://example.com:8443/a/", "https://example.com:8443/a"),
+])
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+def test_canonicalize_url_keeps_scheme_when_not_merging():
+    assert canonicalize_url("http://example.com/a/", merge_schemes=False) == "http://example.com/a"
+
+
+def test_canonicalize_url_leaves_relative_input_alone():
+    assert canonicalize_url(" /docs/ ") == "/docs/"